@@ -1,30 +1,121 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+
 from .models import Post, Comment, Like
 
+
+def estimated_rows(queryset):
+    """The planner's row estimate for ``queryset``'s table (PostgreSQL only), or None."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # -1 (or 0) until the table is first analyzed
+    return int(row[0]) if row and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator that never counts a whole large table.
+
+    Counts stop at ``ADMIN_COUNT_LIMIT`` rows (a COUNT over a LIMITed
+    subquery). Beyond that an unfiltered changelist shows PostgreSQL's row
+    estimate, anything else shows the limit.
+    """
+
+    @cached_property
+    def count(self):
+        limit = getattr(settings, 'ADMIN_COUNT_LIMIT', 10000)
+        counted = self.object_list[:limit + 1].count()
+        if counted <= limit:
+            return counted
+        if not self.object_list.query.has_filters():
+            return max(estimated_rows(self.object_list) or 0, limit)
+        return limit
+
+
+def change_link(model, pk):
+    """Link to the admin page of ``model`` ``pk`` without loading the row."""
+    if pk is None:
+        return '-'
+    url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_change', args=[pk])
+    return format_html('<a href="{}">#{}</a>', url, pk)
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """
+    Changelists whose query count does not grow with the page or the table:
+    related posts and comments are shown as links built from their ids,
+    users are joined, counts are bounded (EstimatedCountPaginator) and no
+    second full-table count is run for filtered lists.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ScalableAdmin):
     list_display = ['id', 'author', 'content_preview', 'created_at', 'like_count']
+    list_select_related = ['author']
     list_filter = ['created_at']
     search_fields = ['content', 'author__username']
-    
+    autocomplete_fields = ['author']
+
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_preview.short_description = 'Content'
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
-    list_display = ['id', 'author', 'post', 'parent', 'content_preview', 'created_at', 'like_count']
+class CommentAdmin(ScalableAdmin):
+    list_display = ['id', 'author', 'post_link', 'parent_link', 'content_preview', 'created_at', 'like_count']
+    list_select_related = ['author']
     list_filter = ['created_at']
     search_fields = ['content', 'author__username']
-    
+    # Newest first by primary key, the cheapest index to walk backwards
+    ordering = ['-id']
+    autocomplete_fields = ['author']
+    raw_id_fields = ['post', 'parent']
+
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_preview.short_description = 'Content'
 
+    @admin.display(description='Post', ordering='post')
+    def post_link(self, obj):
+        return change_link(Post, obj.post_id)
+
+    @admin.display(description='Parent', ordering='parent')
+    def parent_link(self, obj):
+        return change_link(Comment, obj.parent_id)
+
 
 @admin.register(Like)
-class LikeAdmin(admin.ModelAdmin):
-    list_display = ['id', 'user', 'post', 'comment', 'created_at']
+class LikeAdmin(ScalableAdmin):
+    list_display = ['id', 'user', 'post_link', 'comment_link', 'created_at']
+    list_select_related = ['user']
     list_filter = ['created_at']
-    search_fields = ['user__username']
+    # Exact match: the unique username index finds the user, then their likes
+    search_fields = ['user__username__exact']
+    search_help_text = 'Exact username'
+    ordering = ['-id']
+    autocomplete_fields = ['user']
+    raw_id_fields = ['post', 'comment']
+
+    @admin.display(description='Post', ordering='post')
+    def post_link(self, obj):
+        return change_link(Post, obj.post_id)
+
+    @admin.display(description='Comment', ordering='comment')
+    def comment_link(self, obj):
+        return change_link(Comment, obj.comment_id)
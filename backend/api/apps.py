@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from .authentication import invalidate_cached_user
+
+        # Cached JWT users must not outlive changes to the user row
+        post_save.connect(invalidate_cached_user, sender=settings.AUTH_USER_MODEL)
+        post_delete.connect(invalidate_cached_user, sender=settings.AUTH_USER_MODEL)
@@ -0,0 +1,85 @@
+"""
+JWT authentication with a cached user lookup.
+
+``JWTAuthentication`` validates the token (signature, expiry, type) without
+touching the database, then loads the ``User`` row, which is often the only
+query of a read request. ``CachedJWTAuthentication`` keeps the token
+validation as is and caches the resolved user per ``user_id`` claim for
+``AUTH_USER_CACHE_TTL`` seconds. Only ``id``, ``username``, ``is_active`` and
+``is_staff`` are cached (plus, with ``CHECK_REVOKE_TOKEN``, the password digest
+tokens already carry), never the password hash; a cache hit rebuilds a user
+with the other fields deferred, so reading one loads the row. Saving or deleting a user drops the entry
+(see ``ApiConfig.ready``), so deactivation and password changes apply on the
+next request; changes made with ``QuerySet.update()`` apply within the TTL.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+CACHED_USER_FIELDS = ['id', 'username', 'is_active', 'is_staff']
+
+
+def user_cache_key(user_id):
+    return f'auth:userinfo:{user_id}'
+
+
+def cached_user_record(user):
+    """What the cache keeps of ``user``."""
+    record = {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+    if api_settings.CHECK_REVOKE_TOKEN:
+        record['revoke_hash'] = get_md5_hash_password(user.password)
+    return record
+
+
+def user_from_record(record):
+    """A user with the cached fields loaded and every other field deferred."""
+    # from_db() takes the values in the model's field order, not field_names'
+    fields = [
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.attname in CACHED_USER_FIELDS
+    ]
+    return get_user_model().from_db(DEFAULT_DB_ALIAS, fields, [record[field] for field in fields])
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    """``post_save`` / ``post_delete`` receiver for the user model."""
+    cache.delete(user_cache_key(getattr(instance, api_settings.USER_ID_FIELD)))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves users from the cache when it can.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            # Let the parent raise its usual InvalidToken
+            return super().get_user(validated_token)
+
+        key = user_cache_key(user_id)
+        record = cache.get(key)
+        if record is None:
+            user = super().get_user(validated_token)
+            cache.set(key, cached_user_record(user), timeout=getattr(settings, 'AUTH_USER_CACHE_TTL', 60))
+            return user
+        return self.check_cached_user(record, validated_token)
+
+    def check_cached_user(self, record, validated_token):
+        # Same per-user checks as JWTAuthentication.get_user
+        if api_settings.CHECK_USER_IS_ACTIVE and not record['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != record.get('revoke_hash'):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code='password_changed'
+            )
+        return user_from_record(record)
@@ -0,0 +1,245 @@
+"""
+In-memory comment tree assembly.
+
+Comments are stored as an adjacency list (``Comment.parent``), so walking a
+thread through the ORM costs one query per level. Instead we fetch every
+comment of a page of posts in a single query and link parents to children in
+Python. The linked children are stored in Django's prefetch cache, so
+``comment.replies.all()`` never hits the database again, whatever the thread
+depth. Subtrees of individual comments are fetched with one prefix query on
+the materialized ``Comment.path``; a single post's thread is read one page of
+top-level comments at a time, each with its subtree down to the depth limit.
+The feed only shows a preview: the top few top-level comments per post,
+fetched with one window function query.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, Exists, F, OuterRef, Q, Window
+from django.db.models.functions import Length, RowNumber
+
+from .models import Comment
+
+
+def _cache_related(instance, name, objects):
+    """Store ``objects`` as the prefetched result of ``instance.<name>.all()``."""
+    queryset = getattr(instance, name).get_queryset()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    if not hasattr(instance, '_prefetched_objects_cache'):
+        instance._prefetched_objects_cache = {}
+    instance._prefetched_objects_cache[name] = queryset
+
+
+def set_replies(comment, replies):
+    """Mark ``comment`` as loaded with the given direct replies."""
+    _cache_related(comment, 'replies', replies)
+
+
+def replies_loaded(comment):
+    return 'replies' in getattr(comment, '_prefetched_objects_cache', {})
+
+
+def comment_queryset():
+    """Base queryset for tree loading: comments with their authors."""
+    return Comment.objects.select_related('author')
+
+
+def link_comments(comments):
+    """
+    Link a flat list of comments into trees.
+
+    Every comment gets its direct replies cached in creation order.
+    Returns a mapping of post id to that post's top-level comments.
+    """
+    comments = sorted(comments, key=lambda c: (c.created_at, c.id))
+    by_id = {comment.id: comment for comment in comments}
+    children = defaultdict(list)
+    roots = defaultdict(list)
+
+    for comment in comments:
+        parent = by_id.get(comment.parent_id)
+        if parent is None:
+            roots[comment.post_id].append(comment)
+        else:
+            # Avoid a lazy load if anything touches comment.parent
+            Comment.parent.field.set_cached_value(comment, parent)
+            children[parent.id].append(comment)
+
+    for comment in comments:
+        set_replies(comment, children[comment.id])
+
+    return roots
+
+
+def load_comment_trees(posts):
+    """
+    Fetch all comments for ``posts`` in one query and attach them as trees.
+
+    After this call ``get_root_comments(post)`` and every
+    ``comment.replies.all()`` below it are served from memory.
+    """
+    posts = [post for post in posts if not hasattr(post, '_comment_roots')]
+    if not posts:
+        return
+
+    comments = comment_queryset().filter(post__in=[post.id for post in posts])
+    roots = link_comments(comments)
+
+    for post in posts:
+        set_root_comments(post, roots.get(post.id, []))
+
+
+def preview_queryset(post_ids, limit):
+    """
+    The top ``limit`` top-level comments of each post in ``top`` order, in
+    one query. Each row also carries ``siblings`` (the post's number of
+    top-level comments) and ``has_replies``; the replies themselves are not
+    fetched.
+    """
+    order = [F('like_count').desc(), F('created_at').asc(), F('id').asc()]
+    return comment_queryset().filter(post__in=post_ids, parent__isnull=True).annotate(
+        position=Window(RowNumber(), partition_by=[F('post_id')], order_by=order),
+        siblings=Window(Count('id'), partition_by=[F('post_id')]),
+        has_replies=Exists(Comment.objects.filter(parent=OuterRef('pk'))),
+    ).filter(position__lte=limit)
+
+
+def load_comment_previews(posts, limit):
+    """Attach a comment preview (see get_comment_preview) to each of ``posts``."""
+    posts = [post for post in posts if not hasattr(post, '_comment_preview')]
+    if not posts:
+        return
+
+    previews = defaultdict(list)
+    for comment in preview_queryset([post.id for post in posts], limit):
+        # Replies are left to the comment's more_replies cursor
+        set_replies(comment, [])
+        previews[comment.post_id].append(comment)
+    for post in posts:
+        preview = sorted(previews[post.id], key=lambda c: c.position)
+        post._comment_preview = (preview, preview[0].siblings if preview else 0)
+
+
+def get_comment_preview(post):
+    """``(comments, top_level_count)`` attached by load_comment_previews."""
+    return post._comment_preview
+
+
+def set_root_comments(post, roots):
+    """Mark ``post`` as loaded with the given top-level comments."""
+    post._comment_roots = list(roots)
+
+
+def root_comments_loaded(post):
+    return hasattr(post, '_comment_roots')
+
+
+def get_root_comments(post):
+    """Top-level comments of ``post``, loading the whole tree if needed."""
+    if not root_comments_loaded(post):
+        load_comment_trees([post])
+    return post._comment_roots
+
+
+# Top-level comment order per sort, as sort_comments orders siblings
+ROOT_ORDERINGS = {
+    'old': ('created_at', 'id'),
+    'new': ('-created_at', '-id'),
+    'top': ('-like_count', 'created_at', 'id'),
+}
+
+
+def root_comment_page(post_id, sort='old', offset=0, limit=10):
+    """
+    One page of a post's top-level comments in ``sort`` order, in one query
+    that reads one extra row to know whether more follow. Replies are not
+    loaded (see load_reply_trees). Returns ``(page, next_offset)`` like
+    page_comments.
+    """
+    rows = list(
+        comment_queryset().filter(post_id=post_id, parent__isnull=True)
+        .order_by(*ROOT_ORDERINGS[sort])[offset:offset + limit + 1]
+    )
+    next_offset = offset + limit if len(rows) > limit else None
+    return rows[:limit], next_offset
+
+
+# Subtrees fetched by one load_reply_trees query
+SUBTREES_PER_QUERY = 200
+
+
+def load_reply_trees(comments, depth=None):
+    """
+    Attach reply subtrees to arbitrary ``comments`` (e.g. a page of the
+    comment list) with one query per ``SUBTREES_PER_QUERY`` of their
+    materialized path prefixes. With ``depth``, only that many levels of
+    replies are read below each comment, and the deepest of them are left
+    with their own replies unloaded.
+    """
+    comments = [comment for comment in comments if not replies_loaded(comment)]
+    if not comments:
+        return
+
+    paths = sorted({comment.path for comment in comments})
+    segment = Comment.PATH_SEGMENT_WIDTH + 1
+    queryset = comment_queryset()
+    if depth is None:
+        # Nested comments are covered by their ancestor's prefix
+        prefixes = []
+        for path in paths:
+            if not prefixes or not path.startswith(prefixes[-1]):
+                prefixes.append(path)
+    else:
+        prefixes = paths
+        queryset = queryset.annotate(path_length=Length('path'))
+    linked = {}
+    # Bounded ORs: SQLite rejects expressions nested over 1000 deep
+    for start in range(0, len(prefixes), SUBTREES_PER_QUERY):
+        query = Q()
+        for prefix in prefixes[start:start + SUBTREES_PER_QUERY]:
+            subtree = Comment.subtree_filter(prefix)
+            if depth is not None:
+                subtree &= Q(path_length__lte=len(prefix) + depth * segment)
+            query |= subtree
+        linked.update((comment.id, comment) for comment in queryset.filter(query))
+    link_comments(linked.values())
+
+    if depth is not None:
+        requested = set(paths)
+        for node in linked.values():
+            # Depth below the nearest requested ancestor (or the node itself)
+            below = next(
+                (len(node.path) - end) // segment
+                for end in range(len(node.path), 0, -segment) if node.path[:end] in requested
+            )
+            if below == depth:
+                # Its replies were not read; a later caller loads them
+                node._prefetched_objects_cache.pop('replies', None)
+
+    for comment in comments:
+        node = linked.get(comment.id)
+        set_replies(comment, node.replies.all() if node else [])
+
+
+REPLY_SORTS = ('old', 'new', 'top')
+
+
+def sort_comments(comments, sort='old'):
+    """Order sibling comments: ``old``/``new`` by time, ``top`` by likes."""
+    if sort == 'new':
+        return sorted(comments, key=lambda c: (c.created_at, c.id), reverse=True)
+    if sort == 'top':
+        return sorted(comments, key=lambda c: (-c.like_count, c.created_at, c.id))
+    return sorted(comments, key=lambda c: (c.created_at, c.id))
+
+
+def page_comments(comments, sort='old', offset=0, limit=10):
+    """
+    One page of sibling comments in ``sort`` order.
+
+    Returns ``(page, next_offset)`` where ``next_offset`` is None on the last page.
+    """
+    ordered = sort_comments(comments, sort)
+    page = ordered[offset:offset + limit]
+    next_offset = offset + limit if offset + limit < len(ordered) else None
+    return page, next_offset
@@ -0,0 +1,132 @@
+"""
+Streaming NDJSON exports for analytics.
+
+``export_lines()`` yields one JSON object per line for every post, comment or
+like, read with ``QuerySet.iterator(chunk_size=...)``: only one chunk of rows
+is held at a time, so memory stays flat whatever the table size. Rows are
+flat ``values()`` dicts (foreign keys as ids, plus the author's username), so
+no model instance or serializer is built per row.
+
+Incremental exports pass the watermark of the previous run: ``after_id``
+(rows with a larger id; the next watermark is the last line's ``id``) or the
+keyset ``since`` + ``after_id`` (rows after that ``(created_at, id)`` pair,
+in that order; the next watermark is the last line's ``created_at`` and
+``id``). ``since`` alone starts at that time, inclusive. The id breaks ties
+between rows created in the same microsecond, which a plain ``created_at >
+since`` would skip. Rows younger than
+``EXPORT_SETTLE_SECONDS`` are left for the next run: a transaction that took
+a lower id but commits later, or a replica still catching up, would otherwise
+land behind a watermark that has already passed it.
+
+Exports read from a replica when there are any (routers.py). Served by
+``GET /api/export/`` (staff only) and ``manage.py export_ndjson``. Under ASGI
+the view streams ``aexport_lines()``: Django would read a synchronous
+iterator to the end before sending anything there.
+"""
+import json
+import random
+from datetime import timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Like, Post
+from .renderers import orjson
+from .routers import replica_lag
+
+# kind: (model, fields, renamed fields)
+EXPORTS = {
+    'posts': (Post, ['id', 'author_id', 'content', 'like_count', 'created_at'],
+              {'author_username': F('author__username')}),
+    'comments': (Comment, ['id', 'post_id', 'parent_id', 'author_id', 'content', 'like_count',
+                           'created_at'],
+                 {'author_username': F('author__username')}),
+    'likes': (Like, ['id', 'user_id', 'post_id', 'comment_id', 'created_at'], {}),
+}
+
+
+def chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def settled_before():
+    """Rows created after this are held back until the next export."""
+    settle = max(getattr(settings, 'EXPORT_SETTLE_SECONDS', 30), replica_lag())
+    return timezone.now() - timedelta(seconds=settle)
+
+
+def parse_watermarks(after_id=None, since=None):
+    """``(after_id, since)`` from their string forms; ValueError when malformed."""
+    if after_id not in (None, ''):
+        after_id = int(after_id)
+        if after_id < 0:
+            raise ValueError('after_id must not be negative.')
+    else:
+        after_id = None
+    if since not in (None, ''):
+        parsed = parse_datetime(since)
+        if parsed is None:
+            raise ValueError('since must be an ISO 8601 datetime.')
+        since = parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+    else:
+        since = None
+    return after_id, since
+
+
+def export_database():
+    replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+    return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+
+def export_rows(kind, after_id=None, since=None, using=None):
+    """Row dicts of ``kind`` in watermark order, streamed from the database."""
+    model, fields, renamed = EXPORTS[kind]
+    rows = model.objects.using(using or export_database()).filter(created_at__lt=settled_before())
+    if since is not None:
+        if after_id is not None:
+            after = Q(created_at__gt=since) | Q(created_at=since, pk__gt=after_id)
+        else:
+            after = Q(created_at__gte=since)
+        rows = rows.filter(after).order_by('created_at', 'id')
+    else:
+        if after_id is not None:
+            rows = rows.filter(pk__gt=after_id)
+        rows = rows.order_by('id')
+    return rows.values(*fields, **renamed).iterator(chunk_size=chunk_size())
+
+
+def encode_row(row):
+    row['created_at'] = row['created_at'].isoformat()
+    if orjson is not None:
+        return orjson.dumps(row) + b'\n'
+    return json.dumps(row, ensure_ascii=False, separators=(',', ':')).encode() + b'\n'
+
+
+def export_lines(kind, after_id=None, since=None, using=None):
+    """NDJSON of ``kind``, one bytes chunk per ``EXPORT_CHUNK_SIZE`` rows."""
+    rows = export_rows(kind, after_id, since, using)
+    while True:
+        chunk = b''.join(encode_row(row) for row in islice(rows, chunk_size()))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def aexport_lines(kind, after_id=None, since=None, using=None):
+    """``export_lines`` for ASGI responses, each chunk read on the sync thread."""
+    lines = export_lines(kind, after_id, since, using)
+    # Thread sensitive: every chunk comes from the thread holding the cursor
+    next_chunk = sync_to_async(next)
+    try:
+        while True:
+            chunk = await next_chunk(lines, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        await sync_to_async(lines.close)()
@@ -0,0 +1,78 @@
+"""
+Karma accounting for the 24h leaderboard.
+
+Every like adds points to the liked content's author in a per-hour
+``KarmaBucket``. The leaderboard is the sum of each user's last 24 buckets,
+so its cost depends on how many users were active in the window rather than
+on the total number of likes ever written. Post and comment karma never meet
+in a join: each like is credited once, when it is written.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import KarmaBucket
+
+POST_LIKE_KARMA = 5
+COMMENT_LIKE_KARMA = 1
+WINDOW_HOURS = 24
+
+
+def bucket_hour(moment):
+    """Truncate ``moment`` to the start of its hour."""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def window_start(now=None):
+    """First bucket included in the leaderboard: the current hour and the 23 before it."""
+    return bucket_hour(now or timezone.now()) - timedelta(hours=WINDOW_HOURS - 1)
+
+
+def record_karma(user_id, points, at=None):
+    """
+    Add ``points`` to ``user_id``'s bucket for the hour of ``at``.
+
+    Safe under concurrency: the UPDATE is atomic via F(), and a losing
+    INSERT race falls back to the UPDATE.
+    """
+    hour = bucket_hour(at or timezone.now())
+    bucket = KarmaBucket.objects.filter(user_id=user_id, hour=hour)
+
+    if bucket.update(karma=F('karma') + points):
+        return
+    try:
+        with transaction.atomic():
+            KarmaBucket.objects.create(user_id=user_id, hour=hour, karma=points)
+    except IntegrityError:
+        # Another request created the bucket first
+        bucket.update(karma=F('karma') + points)
+
+
+def top_users(limit=5, now=None):
+    """Top ``limit`` users by karma over the last 24 hourly buckets."""
+    return (
+        KarmaBucket.objects.filter(hour__gte=window_start(now))
+        .values('user_id', 'user__username')
+        .annotate(karma=Sum('karma'))
+        .filter(karma__gt=0)
+        .order_by('-karma', 'user_id')[:limit]
+    )
+
+
+def user_karma(user_id, now=None):
+    """``user_id``'s karma over the window: an index lookup on their own buckets."""
+    buckets = KarmaBucket.objects.filter(user_id=user_id, hour__gte=window_start(now))
+    return buckets.aggregate(total=Sum('karma'))['total'] or 0
+
+
+def users_ahead(karma, now=None):
+    """How many users have more than ``karma`` over the window (one aggregate pass)."""
+    return (
+        KarmaBucket.objects.filter(hour__gte=window_start(now))
+        .values('user_id')
+        .annotate(total=Sum('karma'))
+        .filter(total__gt=karma)
+        .count()
+    )
@@ -0,0 +1,192 @@
+"""
+Cached 24h leaderboard.
+
+The leaderboard is polled by every open tab, so the computed rows are kept in
+Django's cache. An entry is fresh while it is younger than
+``LEADERBOARD_CACHE_TTL`` and was computed at the current *generation*; every
+new like sets the generation to ``time.time_ns()``, which marks the entry
+stale without dropping it. Rebuilding is single-flight: the first request to
+see a stale entry takes a short cache lock and recomputes, while concurrent
+requests keep getting the stale rows.
+
+Each entry also records ``changed_at`` (``time.time_ns()`` of the last rebuild
+that changed the rows), the version stamp behind the view's ETag.
+
+The entry holds the top ``LEADERBOARD_MAX_LIMIT`` rows and callers slice it,
+so every ``?limit=`` shares one cache entry. A user's own rank comes from
+those rows when they are in them. Otherwise it is their own bucket sum placed
+among the rows, with one count of the users ahead of them only when they rank
+below all of the rows; that result is kept in a small per-user entry that
+follows the same generation rules.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .karma import top_users, user_karma, users_ahead
+
+DEFAULT_LIMIT = 5
+
+CACHE_KEY = 'leaderboard:top'
+GENERATION_KEY = 'leaderboard:generation'
+LOCK_KEY = 'leaderboard:lock'
+
+# How long a request waits for another one to fill an empty cache
+COLD_WAIT_SECONDS = 1.0
+COLD_POLL_SECONDS = 0.05
+
+
+def _ttl():
+    return getattr(settings, 'LEADERBOARD_CACHE_TTL', 30)
+
+
+def _stale_ttl():
+    # Stale rows are kept around long enough to be served during a rebuild
+    return max(getattr(settings, 'LEADERBOARD_CACHE_STALE_TTL', 300), _ttl())
+
+
+def _lock_timeout():
+    return getattr(settings, 'LEADERBOARD_CACHE_LOCK_TIMEOUT', 10)
+
+
+def max_limit():
+    return getattr(settings, 'LEADERBOARD_MAX_LIMIT', 50)
+
+
+def _user_key(user_id):
+    return f'leaderboard:user:{user_id}'
+
+
+def invalidate_leaderboard():
+    """Mark the cached leaderboard stale; the next request rebuilds it."""
+    # The generation is the time of the last like, so it doubles as a version stamp
+    cache.set(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def compute_leaderboard():
+    rows = []
+    for position, row in enumerate(top_users(limit=max_limit()), start=1):
+        # Competition ranking: ties share the rank of the first of them
+        tied = rows and rows[-1]['karma'] == row['karma']
+        rows.append({
+            'username': row['user__username'],
+            'karma': row['karma'],
+            'rank': rows[-1]['rank'] if tied else position,
+        })
+    return rows
+
+
+def _is_fresh(entry, generation):
+    return entry['generation'] == generation and entry['expires_at'] > time.time()
+
+
+def _rebuild(generation, previous):
+    rows = compute_leaderboard()
+    if previous is not None and previous['rows'] == rows and 'changed_at' in previous:
+        changed_at = previous['changed_at']
+    else:
+        changed_at = time.time_ns()
+    entry = {
+        'rows': rows,
+        'generation': generation,
+        'expires_at': time.time() + _ttl(),
+        'changed_at': changed_at,
+    }
+    cache.set(CACHE_KEY, entry, timeout=_stale_ttl())
+    return entry
+
+
+def get_leaderboard_entry():
+    """The cache entry (``rows``, ``changed_at``), rebuilt by a single request."""
+    values = cache.get_many([CACHE_KEY, GENERATION_KEY])
+    entry = values.get(CACHE_KEY)
+    generation = values.get(GENERATION_KEY, 0)
+
+    if entry is not None and _is_fresh(entry, generation):
+        return entry
+
+    if cache.add(LOCK_KEY, 1, timeout=_lock_timeout()):
+        try:
+            return _rebuild(generation, entry)
+        finally:
+            cache.delete(LOCK_KEY)
+
+    if entry is not None:
+        # Someone else is rebuilding: serve the stale rows meanwhile
+        return entry
+
+    # Cold cache and another request is already computing: wait for it
+    deadline = time.monotonic() + COLD_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(COLD_POLL_SECONDS)
+        entry = cache.get(CACHE_KEY)
+        if entry is not None:
+            return entry
+    return {'rows': compute_leaderboard(), 'changed_at': time.time_ns()}
+
+
+def get_leaderboard(limit=DEFAULT_LIMIT):
+    """Top ``limit`` rows, served from cache and rebuilt by a single request."""
+    return get_leaderboard_entry()['rows'][:limit]
+
+
+def leaderboard_stamp(top, generation, user):
+    """
+    Version stamp of the leaderboard as ``user`` sees it. A caller outside the
+    top rows can move with any like, so their stamp is the last like's time.
+    """
+    if not user.is_authenticated or _rank_in_top(top, user) is not None:
+        return top['changed_at']
+    return max(top['changed_at'], generation)
+
+
+def get_leaderboard_stamp(user):
+    return leaderboard_stamp(get_leaderboard_entry(), cache.get(GENERATION_KEY, 0), user)
+
+
+def compute_user_rank(user, top):
+    """``(rank, karma)`` of ``user``, placed among the ``top`` rows where possible."""
+    karma = user_karma(user.pk)
+    if not karma:
+        return None, 0
+    rows = top['rows']
+    if len(rows) < max_limit() or karma >= rows[-1]['karma']:
+        # Everyone ahead of the user is in the rows
+        return 1 + sum(row['karma'] > karma for row in rows), karma
+    return users_ahead(karma) + 1, karma
+
+
+def get_user_rank(user, top=None):
+    """
+    ``{'rank', 'karma'}`` for ``user`` (rank None without karma).
+    Free when the user is in the cached top rows.
+    """
+    top = top or get_leaderboard_entry()
+    rank = _rank_in_top(top, user)
+    if rank is not None:
+        return rank
+
+    key = _user_key(user.pk)
+    values = cache.get_many([key, GENERATION_KEY])
+    entry = values.get(key)
+    generation = values.get(GENERATION_KEY, 0)
+    if entry is not None and _is_fresh(entry, generation):
+        return entry
+
+    rank, karma = compute_user_rank(user, top)
+    entry = {
+        'rank': rank,
+        'karma': karma,
+        'generation': generation,
+        'expires_at': time.time() + _ttl(),
+    }
+    cache.set(key, entry, timeout=_stale_ttl())
+    return entry
+
+
+def _rank_in_top(top, user):
+    for row in top['rows']:
+        if row['username'] == user.username:
+            return {'rank': row['rank'], 'karma': row['karma']}
+    return None
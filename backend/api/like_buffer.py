@@ -0,0 +1,396 @@
+"""
+Optional write-behind buffer for likes (``LIKE_WRITE_BEHIND = True``).
+
+When a post goes viral, one transaction per like means lock contention on
+the post's counter row and a round trip per request. In write-behind mode
+``LikeCreateView`` only records the like intent here and answers 202. The
+buffer de-duplicates intents per ``(user, target)`` and flushes them through
+``likes.insert_likes`` as one bulk INSERT, on whichever comes first of
+``LIKE_BUFFER_MAX_SIZE`` pending likes or ``LIKE_BUFFER_FLUSH_INTERVAL``
+seconds.
+
+Durability: every accepted intent is appended to a spool file of its own
+buffer (``likes-<pid>-<random>.jsonl``, so a restarted worker that gets a
+dead worker's pid never reopens its file) before the request returns, and
+the file is rewritten after each flush. The buffer holds an ``flock`` on its
+spool for its whole life. Pending likes are flushed at interpreter exit; if
+the process dies instead, the lock is released, and the next buffer to start
+(or ``manage.py replay_like_spool``) claims the file and writes its likes.
+Where ``fcntl`` is missing, a spool counts as orphaned once its pid is gone.
+
+A failing flush never blocks the intents behind it: a batch rejected by the
+database for one of its rows (a deleted user, say) is split until the
+failing intents are found, and the rest are written. Failed intents are
+retried with later flushes; after ``LIKE_BUFFER_MAX_ATTEMPTS`` failures they
+are logged and moved to ``dead-likes.jsonl`` in the spool directory. Only
+such row errors count as attempts: when the database is unreachable the
+whole batch stays pending and the flush is retried with a growing delay (up
+to ``MAX_RETRY_DELAY`` seconds), however long the outage lasts.
+``manage.py replay_like_spool --leftovers`` writes the dead-lettered likes,
+and spools claimed by an interrupted replay, once their cause is fixed.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DataError, DatabaseError, IntegrityError, close_old_connections
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .likes import insert_likes
+from .models import Like
+from .writes import write_transaction
+
+logger = logging.getLogger(__name__)
+
+SPOOL_PREFIX = 'likes-'
+CLAIMED_PREFIX = 'claimed-'
+DEAD_LETTER_NAME = 'dead-likes.jsonl'
+# Longest wait between flushes while the database is unreachable
+MAX_RETRY_DELAY = 60
+
+
+def _spool_path(spool_dir):
+    # The random part keeps a reused pid from adopting a dead process's file
+    return Path(spool_dir) / f'{SPOOL_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:12]}.jsonl'
+
+
+def _spool_pid(path):
+    """Pid from ``likes-<pid>-<random>.jsonl`` (or the older ``likes-<pid>.jsonl``)."""
+    try:
+        return int(path.stem[len(SPOOL_PREFIX):].split('-')[0])
+    except ValueError:
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _lock_spool(spool):
+    """Try to take ``spool``'s owner lock; False while a live buffer holds it."""
+    try:
+        fcntl.flock(spool, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _read_spool(path):
+    entries = {}
+    with open(path) as spool:
+        for line in spool:
+            try:
+                # Dead letters carry the error as a fourth item
+                user_id, kind, pk = json.loads(line)[:3]
+            except ValueError:
+                # Torn final line from a crash mid-write
+                continue
+            entries.setdefault((user_id, kind, pk), None)
+    return entries
+
+
+def _claimed_name(path):
+    name = path.name
+    if name.startswith(CLAIMED_PREFIX):
+        # claimed-<pid>-<random>-<original name>
+        name = name.split('-', 3)[3]
+    return path.with_name(f'{CLAIMED_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:12]}-{name}')
+
+
+def _take(path):
+    """Claim a file no buffer writes to, by renaming it; None if already taken."""
+    target = _claimed_name(path)
+    try:
+        path.rename(target)
+    except FileNotFoundError:
+        return None
+    return target
+
+
+def _claim(path):
+    """Rename an orphaned spool to a claimed name; None if it is live or taken."""
+    target = _claimed_name(path)
+    if fcntl is None:
+        pid = _spool_pid(path)
+        if pid is None or _pid_alive(pid):
+            return None
+        try:
+            path.rename(target)
+        except FileNotFoundError:
+            return None
+        return target
+    try:
+        spool = open(path, 'a')
+    except FileNotFoundError:
+        return None
+    with spool:
+        # Closing the file releases the lock
+        if not _lock_spool(spool):
+            return None
+        try:
+            path.rename(target)
+        except FileNotFoundError:
+            # Claimed by another process between our open and lock
+            return None
+    return target
+
+
+def claim_orphaned_spools(spool_dir, leftovers=False):
+    """
+    Take over spool files whose buffer is gone.
+
+    A spool is orphaned once nobody holds its lock (or, without ``fcntl``,
+    once its pid is gone). Each file is claimed with an atomic rename, so two
+    processes starting at once never replay the same file. With
+    ``leftovers``, files claimed by a replay that never finished and the
+    dead-letter file are taken as well; only pass it when no replay is
+    running. Returns ``(entries, claimed_paths)``.
+    """
+    entries = {}
+    claimed = []
+    directory = Path(spool_dir)
+    if not directory.is_dir():
+        return entries, claimed
+
+    # Listed up front: claiming adds claimed-* files to the directory
+    paths = [(path, _claim) for path in directory.glob(f'{SPOOL_PREFIX}*.jsonl')]
+    if leftovers:
+        paths += [(path, _take) for path in directory.glob(f'{CLAIMED_PREFIX}*.jsonl')]
+        paths.append((directory / DEAD_LETTER_NAME, _take))
+    for path, claim in paths:
+        target = claim(path)
+        if target is None:
+            continue
+        for key in _read_spool(target):
+            entries.setdefault(key, None)
+        claimed.append(target)
+    return entries, claimed
+
+
+def write_like_intents(keys):
+    """Insert ``(user_id, kind, target_id)`` like intents in one transaction."""
+    likes = [Like(user_id=user_id, **{f'{kind}_id': pk}) for user_id, kind, pk in keys]
+    with write_transaction():
+        return insert_likes(likes)
+
+
+def write_like_intents_isolated(keys):
+    """
+    ``write_like_intents`` that isolates failing intents.
+
+    When the database rejects a batch for one of its rows (IntegrityError,
+    DataError) the batch is split in halves until the failing intents are
+    found, so all others are still written. Any other error (database
+    unreachable) is raised: it says nothing about the intents. Returns
+    ``(statuses, failed)`` with ``failed`` mapping each key rejected by the
+    database to its exception.
+    """
+    keys = list(keys)
+    if not keys:
+        return {}, {}
+    try:
+        return write_like_intents(keys), {}
+    except (IntegrityError, DataError) as exc:
+        if len(keys) == 1:
+            return {}, {keys[0]: exc}
+        middle = len(keys) // 2
+        statuses, failed = write_like_intents_isolated(keys[:middle])
+        more_statuses, more_failed = write_like_intents_isolated(keys[middle:])
+        statuses.update(more_statuses)
+        failed.update(more_failed)
+        return statuses, failed
+
+
+def dead_letter(spool_dir, failed):
+    """Log and set aside intents that will not be retried (``{key: exception}``)."""
+    with open(Path(spool_dir) / DEAD_LETTER_NAME, 'a') as dead:
+        for key, exc in failed.items():
+            logger.error('Giving up on buffered like %s: %r', key, exc)
+            dead.write(json.dumps([*key, repr(exc)]) + '\n')
+
+
+class LikeBuffer:
+    """Process-local write-behind buffer; see module docstring."""
+
+    def __init__(self, max_size, flush_interval, spool_dir, max_attempts=5):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.spool_dir = spool_dir
+        self._pending = {}
+        # Failed writes per intent, for the ones still pending
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        # Seconds before the next flush while the database is unreachable
+        self._retry_delay = 0
+
+        Path(spool_dir).mkdir(parents=True, exist_ok=True)
+        self._spool_path = _spool_path(spool_dir)
+        self._spool = open(self._spool_path, 'a')
+        if fcntl is not None:
+            # Held until the process exits: marks the spool as live
+            _lock_spool(self._spool)
+
+        # Adopt likes left behind by crashed workers
+        orphaned, claimed = claim_orphaned_spools(spool_dir)
+        for key in orphaned:
+            self._accept(key)
+        for path in claimed:
+            path.unlink()
+
+        self._thread = threading.Thread(target=self._run, name='like-buffer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _accept(self, key):
+        if key in self._pending:
+            return False
+        # dict as an insertion-ordered set
+        self._pending[key] = None
+        self._spool.write(json.dumps(key) + '\n')
+        self._spool.flush()
+        return True
+
+    def add(self, user_id, kind, pk):
+        """Queue a like intent. Returns False if it was already pending."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Like buffer is closed')
+            queued = self._accept((user_id, kind, pk))
+            full = len(self._pending) >= self.max_size
+        if full:
+            self._wakeup.set()
+        return queued
+
+    def flush(self):
+        """Write all pending likes now. Returns the number of intents flushed."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            try:
+                statuses, failed = write_like_intents_isolated(batch)
+            except Exception:
+                # Not the intents' fault: retry all of them, without counting
+                with self._lock:
+                    self._pending = {**batch, **self._pending}
+                    self._rewrite_spool()
+                raise
+            given_up = {}
+            if failed:
+                logger.warning(
+                    'Flushing %d of %d buffered likes failed: %r',
+                    len(failed), len(batch), next(iter(failed.values())),
+                )
+            with self._lock:
+                for key in batch:
+                    if key not in failed:
+                        self._attempts.pop(key, None)
+                        continue
+                    attempts = self._attempts.get(key, 0) + 1
+                    if attempts >= self.max_attempts:
+                        self._attempts.pop(key, None)
+                        given_up[key] = failed[key]
+                    else:
+                        # The spool still has them, for the next attempt
+                        self._attempts[key] = attempts
+                        self._pending.setdefault(key, None)
+                self._rewrite_spool()
+            if given_up:
+                dead_letter(self.spool_dir, given_up)
+            return len(statuses)
+
+    def _rewrite_spool(self):
+        # Only intents that arrived during the flush (or are to be retried) remain
+        self._spool.seek(0)
+        self._spool.truncate()
+        for key in self._pending:
+            self._spool.write(json.dumps(key) + '\n')
+        self._spool.flush()
+
+    def _run(self):
+        while not self._closed:
+            if self._retry_delay:
+                # A full buffer does not cut the back-off short; close() does
+                deadline = time.monotonic() + self._retry_delay
+                while not self._closed and time.monotonic() < deadline:
+                    self._wakeup.wait(deadline - time.monotonic())
+                    self._wakeup.clear()
+            else:
+                self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                self._retry_delay = 0
+            except DatabaseError as exc:
+                self._retry_delay = min(
+                    max(self._retry_delay * 2, self.flush_interval), MAX_RETRY_DELAY
+                )
+                logger.warning(
+                    'Database unavailable, retrying %d buffered likes in %.1fs: %r',
+                    len(self._pending), self._retry_delay, exc,
+                )
+            except Exception:
+                logger.exception('Like buffer flush loop error')
+            finally:
+                close_old_connections()
+
+    def close(self):
+        """Stop the flush thread and write whatever is pending."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wakeup.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        try:
+            self.flush()
+        except Exception:
+            # The spool keeps them for the next buffer or replay_like_spool
+            logger.exception('Could not flush %d buffered likes at exit', len(self._pending))
+        self._spool.close()
+        if not self._pending:
+            self._spool_path.unlink(missing_ok=True)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_like_buffer():
+    """The process-wide buffer, created on first use."""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = LikeBuffer(
+                    max_size=getattr(settings, 'LIKE_BUFFER_MAX_SIZE', 500),
+                    flush_interval=getattr(settings, 'LIKE_BUFFER_FLUSH_INTERVAL', 1.0),
+                    spool_dir=getattr(settings, 'LIKE_BUFFER_SPOOL_DIR', 'like_spool'),
+                    max_attempts=getattr(settings, 'LIKE_BUFFER_MAX_ATTEMPTS', 5),
+                )
+    return _buffer
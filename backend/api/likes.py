@@ -0,0 +1,160 @@
+"""
+Bookkeeping shared by every path that inserts likes.
+
+A new Like must also bump the target's denormalized ``like_count``, credit
+the target's author in their hourly karma bucket, and (after commit)
+invalidate the cached leaderboard, bump the liked posts' version stamps and
+notify stream subscribers. Work is
+grouped per target and per author, so a batch of N likes on one hot post
+costs one counter UPDATE, not N.
+"""
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+
+from .karma import COMMENT_LIKE_KARMA, POST_LIKE_KARMA, bucket_hour, record_karma
+from .leaderboard import invalidate_leaderboard
+from .models import Comment, Like, Post
+from .stream import publish_likes
+from .versions import bump_posts_on_commit
+
+
+def target_of(like):
+    """``('post', id)`` or ``('comment', id)`` for a like."""
+    if like.post_id:
+        return 'post', like.post_id
+    return 'comment', like.comment_id
+
+
+def like_key(like):
+    """``(user_id, kind, target_id)``: identifies a like for de-duplication."""
+    return (like.user_id,) + target_of(like)
+
+
+def target_authors(targets):
+    """Map ``(kind, id)`` targets to their author ids with one query per kind."""
+    authors = {}
+    for kind, model in (('post', Post), ('comment', Comment)):
+        ids = [pk for target_kind, pk in targets if target_kind == kind]
+        if ids:
+            for pk, author_id in model.objects.filter(pk__in=ids).values_list('id', 'author_id'):
+                authors[(kind, pk)] = author_id
+    return authors
+
+
+def _bump_like_counts(model, counts):
+    # Targets that gained the same number of likes share one UPDATE
+    by_delta = defaultdict(list)
+    for pk, delta in counts.items():
+        by_delta[delta].append(pk)
+    for delta, ids in by_delta.items():
+        model.objects.filter(pk__in=ids).update(like_count=F('like_count') + delta)
+
+
+def apply_new_likes(likes, authors=None):
+    """
+    Run the side effects of freshly inserted ``likes``.
+
+    Must be called inside the transaction that inserted them. ``authors``
+    may map ``(kind, id)`` targets to author ids when the caller already
+    loaded them.
+    """
+    likes = list(likes)
+    if not likes:
+        return
+
+    targets = Counter(target_of(like) for like in likes)
+    if authors is None:
+        authors = target_authors(targets)
+
+    _bump_like_counts(Post, {pk: n for (kind, pk), n in targets.items() if kind == 'post'})
+    _bump_like_counts(Comment, {pk: n for (kind, pk), n in targets.items() if kind == 'comment'})
+
+    karma = defaultdict(int)
+    for like in likes:
+        kind, pk = target_of(like)
+        author_id = authors.get((kind, pk))
+        if author_id is None:
+            # Target deleted since the like was accepted
+            continue
+        points = POST_LIKE_KARMA if kind == 'post' else COMMENT_LIKE_KARMA
+        karma[(author_id, bucket_hour(like.created_at))] += points
+    for (author_id, hour), points in karma.items():
+        record_karma(author_id, points, at=hour)
+
+    comment_ids = [pk for kind, pk in targets if kind == 'comment']
+    post_ids = {pk for kind, pk in targets if kind == 'post'}
+    if comment_ids:
+        post_ids.update(
+            Comment.objects.filter(pk__in=comment_ids).values_list('post_id', flat=True)
+        )
+    bump_posts_on_commit(post_ids)
+    transaction.on_commit(invalidate_leaderboard)
+    transaction.on_commit(lambda: publish_likes(likes))
+
+
+def lock_likers(user_ids):
+    """
+    Lock the users' rows, in a stable order, until the transaction ends, and
+    return the ids that exist.
+
+    Every like writer (LikeCreateView, insert_likes) takes this lock before
+    checking whether a like is new, so two concurrent writers can never both
+    see the same like as new: otherwise the loser's insert would be silently
+    skipped by the unique constraint while its counter and karma updates
+    still ran.
+    """
+    return set(
+        User.objects.select_for_update().filter(pk__in=sorted(user_ids)).order_by('pk')
+        .values_list('pk', flat=True)
+    )
+
+
+def insert_likes(likes):
+    """
+    Insert unsaved ``likes`` with one bulk INSERT and run their side effects.
+
+    Duplicates (within ``likes`` or already stored) and likes on missing
+    targets or by missing users are skipped. Returns ``{like_key: status}``
+    with status one of ``created``, ``already_liked`` or ``not_found``. Must
+    be called inside a transaction.
+    """
+    unique = {}
+    for like in likes:
+        unique.setdefault(like_key(like), like)
+    if not unique:
+        return {}
+
+    user_ids = sorted({key[0] for key in unique})
+    users = lock_likers(user_ids)
+
+    authors = target_authors({key[1:] for key in unique})
+    existing = set()
+    for kind in ('post', 'comment'):
+        ids = {pk for _, key_kind, pk in unique if key_kind == kind and (kind, pk) in authors}
+        if ids:
+            field = f'{kind}_id'
+            existing.update(
+                (user_id, kind, pk) for user_id, pk in Like.objects.filter(
+                    user_id__in=user_ids, **{f'{field}__in': ids}
+                ).values_list('user_id', field)
+            )
+
+    statuses = {}
+    new_likes = []
+    for key, like in unique.items():
+        if key[1:] not in authors or key[0] not in users:
+            # Target or liker deleted (e.g. before a spool replay)
+            statuses[key] = 'not_found'
+        elif key in existing:
+            statuses[key] = 'already_liked'
+        else:
+            statuses[key] = 'created'
+            new_likes.append(like)
+
+    # ignore_conflicts leans on the unique like constraints as a last resort
+    Like.objects.bulk_create(new_likes, ignore_conflicts=True)
+    apply_new_likes(new_likes, authors=authors)
+    return statuses
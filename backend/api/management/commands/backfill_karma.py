@@ -0,0 +1,67 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from api.karma import COMMENT_LIKE_KARMA, POST_LIKE_KARMA, bucket_hour
+from api.models import KarmaBucket, Like
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the hourly KarmaBucket rollup from existing Like rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=None,
+            help='Only rebuild buckets for the last N hours (default: full history).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk insert.',
+        )
+
+    def handle(self, *args, **options):
+        likes = Like.objects.all()
+        buckets = KarmaBucket.objects.all()
+        if options['hours']:
+            since = bucket_hour(timezone.now()) - timedelta(hours=options['hours'] - 1)
+            likes = likes.filter(created_at__gte=since)
+            buckets = buckets.filter(hour__gte=since)
+
+        # Karma goes to the author of the liked post or comment
+        totals = defaultdict(int)
+        for author_field, points in (
+            ('post__author_id', POST_LIKE_KARMA),
+            ('comment__author_id', COMMENT_LIKE_KARMA),
+        ):
+            rows = (
+                likes.filter(**{f'{author_field}__isnull': False})
+                .annotate(hour=TruncHour('created_at'))
+                .order_by()
+                .values(author_field, 'hour')
+                .annotate(total=Count('id'))
+            )
+            for row in rows.iterator():
+                totals[(row[author_field], row['hour'])] += row['total'] * points
+
+        with transaction.atomic():
+            deleted, _ = buckets.delete()
+            KarmaBucket.objects.bulk_create(
+                (
+                    KarmaBucket(user_id=user_id, hour=hour, karma=karma)
+                    for (user_id, hour), karma in totals.items()
+                ),
+                batch_size=options['batch_size'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Replaced {deleted} karma buckets with {len(totals)} rebuilt from likes.'
+        ))
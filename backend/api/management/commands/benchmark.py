@@ -0,0 +1,215 @@
+import json
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+)
+from rest_framework.test import APIClient
+
+from api.models import Comment, Like, Post
+from api.thread_cache import local_cache
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def seed_dataset(posts, comments_per_post, likes_per_post, seed):
+    """Fill the (empty) database through ``manage.py seed`` and return its row counts."""
+    call_command(
+        'seed', users=max(10, posts // 5), posts=posts, comments_per_post=comments_per_post,
+        likes_per_post=likes_per_post, seed=seed, stdout=StringIO(),
+    )
+    return {
+        'users': User.objects.count(),
+        'posts': Post.objects.count(),
+        'comments': Comment.objects.count(),
+        'likes': Like.objects.count(),
+    }
+
+
+def git_revision():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, cwd=settings.BASE_DIR, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed throwaway test databases of increasing size and report p50/p95 latency, '
+        'SQL queries and peak memory per API endpoint. Results are appended to a JSON '
+        'lines file so runs can be compared over time. Never touches the real database '
+        'or cache (needs permission to create a test database).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='100,1000',
+            help='Comma separated dataset sizes, in posts (default: 100,1000).',
+        )
+        parser.add_argument('--requests', type=int, default=30, help='Measured requests per endpoint.')
+        parser.add_argument('--comments-per-post', type=float, default=8)
+        parser.add_argument('--likes-per-post', type=float, default=5)
+        parser.add_argument('--seed', type=int, default=1, help='RNG seed for data and request order.')
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Clear all caches before every request instead of measuring warm caches.',
+        )
+        parser.add_argument(
+            '--output',
+            default='benchmark_results.jsonl',
+            help='JSON lines file the run is appended to.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma separated list of integers')
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1')
+
+        record = {
+            'started_at': datetime.now(dt_timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'database': connection.vendor,
+            'options': {
+                key: options[key]
+                for key in ('requests', 'comments_per_post', 'likes_per_post', 'seed', 'cold')
+            },
+            'results': [],
+        }
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # Private cache and in-process events, so clearing them is harmless
+            with override_settings(
+                CACHES={'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'benchmark',
+                }},
+                STREAM_BACKEND='api.stream.LocalBackend',
+            ):
+                for size in sizes:
+                    record['results'].extend(self.run_dataset(size, options))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        with open(options['output'], 'a') as output:
+            output.write(json.dumps(record) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'Results appended to {options["output"]}'))
+
+    def run_dataset(self, size, options):
+        call_command('flush', interactive=False, verbosity=0)
+        self.clear_caches()
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        dataset = seed_dataset(
+            size, options['comments_per_post'], options['likes_per_post'], options['seed']
+        )
+        self.stdout.write(
+            f'\nDataset: {dataset["posts"]} posts, {dataset["comments"]} comments, '
+            f'{dataset["likes"]} likes, {dataset["users"]} users '
+            f'(seeded in {time.perf_counter() - started:.1f}s)'
+        )
+        self.stdout.write(
+            f'{"endpoint":<14}{"p50 ms":>9}{"p95 ms":>9}{"queries":>9}{"peak KiB":>10}  statuses'
+        )
+
+        results = []
+        for name, send in self.endpoints(rng):
+            result = self.measure(send, options['requests'], options['cold'])
+            results.append({'dataset': dataset, 'endpoint': name, **result})
+            self.stdout.write(
+                f'{name:<14}{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}'
+                f'{result["queries_p50"]:>9}{result["peak_kib"]:>10.0f}  {result["statuses"]}'
+            )
+        return results
+
+    def endpoints(self, rng):
+        """``(name, send)`` pairs; each ``send()`` performs one request as a random user."""
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        users = list(User.objects.all())
+        client = APIClient()
+
+        def request(method, path_func, data_func=None):
+            def send():
+                client.force_authenticate(rng.choice(users))
+                data = data_func() if data_func else None
+                return getattr(client, method)(path_func(), data, format='json')
+            return send
+
+        return [
+            ('post_list', request('get', lambda: '/api/posts/')),
+            ('post_detail', request('get', lambda: f'/api/posts/{rng.choice(post_ids)}/')),
+            ('comment_list', request('get', lambda: '/api/comments/')),
+            ('like_create', request(
+                'post', lambda: '/api/likes/', lambda: {'post': rng.choice(post_ids)}
+            )),
+            ('leaderboard', request('get', lambda: '/api/leaderboard/')),
+        ]
+
+    def clear_caches(self):
+        cache.clear()
+        local_cache().clear()
+
+    def measure(self, send, count, cold):
+        if not cold:
+            send()  # warm up caches and lazy imports
+
+        timings, queries, statuses = [], [], {}
+        for _ in range(count):
+            if cold:
+                self.clear_caches()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = send()
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        # Tracing allocations slows requests down, so memory gets its own request
+        if cold:
+            self.clear_caches()
+        tracemalloc.start()
+        try:
+            send()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'requests': count,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries_p50': percentile(queries, 50),
+            'queries_max': max(queries),
+            'peak_kib': round(peak / 1024, 1),
+            'statuses': {str(code): n for code, n in sorted(statuses.items())},
+        }
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .benchmark import git_revision, percentile
+
+
+class Client:
+    """
+    Minimal HTTP/1.1 keep-alive client over asyncio streams (reconnects on
+    close). With ``conditional`` it revalidates like a polling browser tab:
+    each path's last ETag is sent back as ``If-None-Match``.
+    """
+
+    def __init__(self, host, port, headers, conditional=False):
+        self.host = host
+        self.port = port
+        self.headers = headers
+        self.etags = {} if conditional else None
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        headers = list(self.headers)
+        if self.etags is not None and path in self.etags:
+            headers.append(f'If-None-Match: {self.etags[path]}')
+        lines = [f'GET {path} HTTP/1.1', f'Host: {self.host}:{self.port}', *headers, '', '']
+        self.writer.write('\r\n'.join(lines).encode('latin-1'))
+
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        headers = {}
+        for line in filter(None, header_lines):
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in headers:
+            await self.reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif int(status_line.split()[1]) not in (204, 304):
+            await self.reader.read()
+            headers['connection'] = 'close'
+
+        if self.etags is not None and 'etag' in headers:
+            self.etags[path] = headers['etag']
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return int(status_line.split()[1])
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+
+class Command(BaseCommand):
+    help = (
+        'Hold N concurrent keep-alive connections against a running server for a fixed '
+        'time and report throughput and latency per path. Compare deployments (WSGI vs '
+        'ASGI) by pointing it at each in turn with the same options.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Server base URL, e.g. http://127.0.0.1:8000')
+        parser.add_argument(
+            '--paths',
+            default='/api/posts/,/api/leaderboard/',
+            help='Comma separated paths; each connection cycles through them.',
+        )
+        parser.add_argument(
+            '--concurrency', default='10,100,500',
+            help='Comma separated connection counts, one run each.',
+        )
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per run.')
+        parser.add_argument('--timeout', type=float, default=30, help='Per request timeout.')
+        parser.add_argument('--user', help='Send a JWT for this username (needs the same database).')
+        parser.add_argument(
+            '--conditional', action='store_true',
+            help='Revalidate with If-None-Match like polling clients do.',
+        )
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Extra connections that trickle each request in over --slow-seconds, '
+                 'like clients on bad mobile links. They are not included in the results.',
+        )
+        parser.add_argument('--slow-seconds', type=float, default=2)
+        parser.add_argument('--label', default='', help='Free text stored with the results.')
+        parser.add_argument('--output', default='benchmark_results.jsonl')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('url must look like http://host:port')
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency must be a comma separated list of integers')
+
+        headers = ['Accept: application/json']
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {options["user"]}')
+            headers.append(f'Authorization: Bearer {AccessToken.for_user(user)}')
+
+        paths = options['paths'].split(',')
+        record = {
+            'started_at': datetime.now(dt_timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'kind': 'loadtest',
+            'label': options['label'],
+            'conditional': options['conditional'],
+            'slow_clients': options['slow_clients'],
+            'url': options['url'],
+            'paths': paths,
+            'results': [],
+        }
+        self.stdout.write(
+            f'{"conns":>6}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"errors":>8}  statuses'
+        )
+        for level in levels:
+            result = asyncio.run(self.run(
+                url.hostname, url.port or 80, headers, paths, level,
+                options['duration'], options['timeout'], options['conditional'],
+                options['slow_clients'], options['slow_seconds'],
+            ))
+            record['results'].append(result)
+            self.stdout.write(
+                f'{level:>6}{result["rps"]:>9.0f}{result["p50_ms"]:>9.1f}{result["p95_ms"]:>9.1f}'
+                f'{result["p99_ms"]:>9.1f}{result["errors"]:>8}  {result["statuses"]}'
+            )
+
+        with open(options['output'], 'a') as output:
+            output.write(json.dumps(record) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'Results appended to {options["output"]}'))
+
+    async def run(self, host, port, headers, paths, connections, duration, timeout, conditional,
+                  slow_clients, slow_seconds):
+        timings, statuses, errors = [], {}, []
+        started = time.perf_counter()
+        deadline = started + duration
+
+        async def slow_connection():
+            lines = [f'GET {paths[0]} HTTP/1.1', f'Host: {host}:{port}', *headers, 'Connection: close']
+            while time.perf_counter() < deadline:
+                try:
+                    reader, writer = await asyncio.open_connection(host, port)
+                    for line in lines:
+                        writer.write(f'{line}\r\n'.encode('latin-1'))
+                        await writer.drain()
+                        await asyncio.sleep(slow_seconds / len(lines))
+                    writer.write(b'\r\n')
+                    await asyncio.wait_for(reader.read(), timeout)
+                    writer.close()
+                except (OSError, asyncio.TimeoutError):
+                    pass
+
+        async def connection(offset):
+            client = Client(host, port, headers, conditional)
+            n = offset
+            try:
+                while time.perf_counter() < deadline:
+                    sent = time.perf_counter()
+                    try:
+                        status = await asyncio.wait_for(client.get(paths[n % len(paths)]), timeout)
+                    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as exc:
+                        errors.append(type(exc).__name__)
+                        await client.close()
+                        continue
+                    timings.append((time.perf_counter() - sent) * 1000)
+                    statuses[status] = statuses.get(status, 0) + 1
+                    n += 1
+            finally:
+                await client.close()
+
+        slow = [asyncio.ensure_future(slow_connection()) for _ in range(slow_clients)]
+        await asyncio.gather(*(connection(offset) for offset in range(connections)))
+        elapsed = time.perf_counter() - started
+        for task in slow:
+            task.cancel()
+        await asyncio.gather(*slow, return_exceptions=True)
+        if not timings:
+            timings = [0.0]
+        return {
+            'connections': connections,
+            'seconds': round(elapsed, 2),
+            'requests': sum(statuses.values()),
+            'rps': round(sum(statuses.values()) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'mean_ms': round(statistics.fmean(timings), 2),
+            'errors': len(errors),
+            'statuses': {str(code): n for code, n in sorted(statuses.items())},
+        }
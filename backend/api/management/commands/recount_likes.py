@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from api.models import Post, Comment, Like
+from api.versions import bump_posts_on_commit
+
+
+def actual_like_count(field):
+    """Subquery counting the Like rows that point at the outer row via ``field``."""
+    likes = (
+        Like.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Coalesce(Subquery(likes), Value(0))
+
+
+class Command(BaseCommand):
+    help = 'Recount Post.like_count and Comment.like_count from the Like table and fix drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report rows whose stored count has drifted.',
+        )
+
+    def handle(self, *args, **options):
+        for model, field in ((Post, 'post'), (Comment, 'comment')):
+            with transaction.atomic():
+                drifted = (
+                    model.objects.select_for_update()
+                    .annotate(actual=actual_like_count(field))
+                    .exclude(like_count=F('actual'))
+                    .values_list('pk', flat=True)
+                )
+                drifted_ids = list(drifted)
+                if drifted_ids and not options['dry_run']:
+                    model.objects.filter(pk__in=drifted_ids).update(
+                        like_count=actual_like_count(field)
+                    )
+                    post_ids = drifted_ids
+                    if model is Comment:
+                        post_ids = model.objects.filter(pk__in=drifted_ids).values_list(
+                            'post_id', flat=True
+                        )
+                    bump_posts_on_commit(post_ids)
+
+            verb = 'would fix' if options['dry_run'] else 'fixed'
+            self.stdout.write(
+                f'{model.__name__}: {verb} {len(drifted_ids)} drifted like counts'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Like counts checked.'))
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from api.like_buffer import (
+    DEAD_LETTER_NAME, claim_orphaned_spools, dead_letter, write_like_intents_isolated
+)
+
+
+class Command(BaseCommand):
+    help = 'Write likes left in the write-behind spool by processes that exited without flushing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--spool-dir',
+            default=getattr(settings, 'LIKE_BUFFER_SPOOL_DIR', 'like_spool'),
+            help='Directory holding the like buffer spool files.',
+        )
+        parser.add_argument(
+            '--leftovers',
+            action='store_true',
+            help=(
+                f'Also write the likes in {DEAD_LETTER_NAME} and in claimed-* files left by '
+                'an interrupted replay. Do not run two replays with this option at once.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        entries, claimed = claim_orphaned_spools(options['spool_dir'], options['leftovers'])
+        try:
+            statuses, failed = write_like_intents_isolated(entries)
+        except DatabaseError as exc:
+            raise CommandError(
+                f'Could not write {len(entries)} likes ({exc}); the spool files were kept '
+                'as claimed-*, rerun with --leftovers.'
+            )
+        if failed:
+            dead_letter(options['spool_dir'], failed)
+        for path in claimed:
+            path.unlink()
+
+        created = sum(1 for status in statuses.values() if status == 'created')
+        self.stdout.write(self.style.SUCCESS(
+            f'Replayed {len(claimed)} spool files: {created} likes created, '
+            f'{len(statuses) - created} duplicates or missing targets skipped.'
+        ))
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f'{len(failed)} likes failed and were moved to {DEAD_LETTER_NAME}.'
+            ))
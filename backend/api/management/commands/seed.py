@@ -0,0 +1,227 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, reset_queries, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from api.leaderboard import invalidate_leaderboard
+from api.models import Comment, Like, Post
+from api.versions import bump_posts
+
+DAY = timedelta(days=1)
+
+
+def next_id(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+def heavy_tailed(rng, mean, cap):
+    """
+    Non-negative integer with the given mean and a long tail (Pareto, alpha
+    1.5): most posts get a little activity, a few go viral.
+    """
+    if mean <= 0:
+        return 0
+    return min(cap, int((rng.paretovariate(1.5) - 1) * mean / 2))
+
+
+def random_time(rng, start, end):
+    return start + (end - start) * rng.random()
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Keep the ``created_at`` values we generate; ``auto_now_add`` would overwrite them."""
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a synthetic dataset: users, posts, deep comment threads and likes spread '
+        'over time. Rows are generated and bulk inserted one chunk of posts at a time, so '
+        'memory stays flat at any size. Run it against an idle database: ids are assigned '
+        'up front (like loaddata) so comment paths can be written in the same INSERT.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument(
+            '--comments-per-post', type=float, default=10,
+            help='Mean comments per post (long-tailed distribution).',
+        )
+        parser.add_argument(
+            '--reply-ratio', type=float, default=0.7,
+            help='Share of comments that reply to another comment rather than the post.',
+        )
+        parser.add_argument('--max-depth', type=int, default=8, help='Deepest reply level.')
+        parser.add_argument(
+            '--likes-per-post', type=float, default=20,
+            help='Mean likes per post (long-tailed distribution).',
+        )
+        parser.add_argument('--likes-per-comment', type=float, default=1, help='Mean likes per comment.')
+        parser.add_argument(
+            '--recent-likes', type=float, default=0.2,
+            help='Fraction of likes placed in the last 24 hours (the leaderboard window).',
+        )
+        parser.add_argument('--days', type=int, default=30, help='Spread posts over the last N days.')
+        parser.add_argument('--seed', type=int, default=42, help='RNG seed; same seed, same dataset.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Posts generated per chunk.')
+        parser.add_argument('--prefix', default='seed', help='Usernames are <prefix>_<n>.')
+        parser.add_argument(
+            '--password',
+            default=None,
+            help='Password for every generated user (default: unusable password).',
+        )
+
+    def handle(self, *args, **options):
+        max_depth_limit = Comment.PATH_MAX_LENGTH // (Comment.PATH_SEGMENT_WIDTH + 1)
+        if options['users'] < 1 or options['posts'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--users and --batch-size must be positive, --posts non-negative')
+        if not 0 < options['max_depth'] <= max_depth_limit:
+            raise CommandError(f'--max-depth must be between 1 and {max_depth_limit}')
+        if not 0 <= options['recent_likes'] <= 1 or not 0 <= options['reply_ratio'] <= 1:
+            raise CommandError('--recent-likes and --reply-ratio must be between 0 and 1')
+        if User.objects.filter(username__startswith=f'{options["prefix"]}_').exists():
+            raise CommandError(f'Users named {options["prefix"]}_* already exist; pick another --prefix')
+
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+
+        totals = {'posts': 0, 'comments': 0, 'likes': 0}
+        with explicit_timestamps(Post, Comment, Like):
+            self.first_user = self.create_users()
+            self.next_post = next_id(Post)
+            self.next_comment = next_id(Comment)
+            for offset in range(0, options['posts'], options['batch_size']):
+                size = min(options['batch_size'], options['posts'] - offset)
+                with transaction.atomic():
+                    counts = self.create_chunk(size)
+                for key, count in counts.items():
+                    totals[key] += count
+                # With DEBUG on, the logged INSERTs would otherwise pile up
+                reset_queries()
+                self.stdout.write(
+                    f'{offset + size}/{options["posts"]} posts, {totals["comments"]} comments, '
+                    f'{totals["likes"]} likes'
+                )
+
+        self.reset_sequences()
+        call_command('backfill_karma', hours=24, stdout=self.stdout)
+        invalidate_leaderboard()
+        bump_posts(())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {options["users"]} users, {totals["posts"]} posts, '
+            f'{totals["comments"]} comments and {totals["likes"]} likes.'
+        ))
+
+    def create_users(self):
+        first = next_id(User)
+        password = make_password(self.options['password'])
+        prefix = self.options['prefix']
+        batch = []
+        for n in range(self.options['users']):
+            batch.append(User(
+                id=first + n, username=f'{prefix}_{n}', email=f'{prefix}_{n}@example.com',
+                password=password, date_joined=self.start,
+            ))
+            if len(batch) == self.options['batch_size']:
+                User.objects.bulk_create(batch)
+                batch = []
+        User.objects.bulk_create(batch)
+        return first
+
+    def random_user(self):
+        return self.first_user + self.rng.randrange(self.options['users'])
+
+    def likers(self, mean):
+        count = heavy_tailed(self.rng, mean, self.options['users'])
+        return self.rng.sample(range(self.first_user, self.first_user + self.options['users']), count)
+
+    def like_time(self, created_at):
+        # Likes come after their target; `recent_likes` of them fall in the last 24h
+        window_start = self.now - DAY
+        if created_at >= window_start:
+            return random_time(self.rng, created_at, self.now)
+        if self.rng.random() < self.options['recent_likes']:
+            return random_time(self.rng, window_start, self.now)
+        return random_time(self.rng, created_at, window_start)
+
+    def create_chunk(self, size):
+        posts, comments, likes = [], [], []
+        for _ in range(size):
+            post = Post(
+                id=self.next_post, author_id=self.random_user(), content=f'Post {self.next_post}',
+                created_at=random_time(self.rng, self.start, self.now),
+            )
+            self.next_post += 1
+            post_likes = [
+                Like(user_id=user_id, post_id=post.id, created_at=self.like_time(post.created_at))
+                for user_id in self.likers(self.options['likes_per_post'])
+            ]
+            post.like_count = len(post_likes)
+            posts.append(post)
+            likes.extend(post_likes)
+
+            for comment in self.thread(post):
+                comment_likes = [
+                    Like(user_id=user_id, comment_id=comment.id, created_at=self.like_time(comment.created_at))
+                    for user_id in self.likers(self.options['likes_per_comment'])
+                ]
+                comment.like_count = len(comment_likes)
+                comments.append(comment)
+                likes.extend(comment_likes)
+
+        # Posts before comments before likes, so every foreign key already exists
+        Post.objects.bulk_create(posts)
+        Comment.objects.bulk_create(comments, batch_size=self.options['batch_size'])
+        Like.objects.bulk_create(likes, batch_size=self.options['batch_size'])
+        return {'posts': len(posts), 'comments': len(comments), 'likes': len(likes)}
+
+    def thread(self, post):
+        """Comments of one post with ids, paths and timestamps; parents come before replies."""
+        mean = self.options['comments_per_post']
+        count = heavy_tailed(self.rng, mean, int(mean * 100))
+        thread, depths = [], []
+        for _ in range(count):
+            parent = None
+            if thread and self.rng.random() < self.options['reply_ratio']:
+                # Favour recent comments so conversations form deep chains
+                index = len(thread) - 1 - min(len(thread) - 1, int(self.rng.expovariate(0.5)))
+                if depths[index] < self.options['max_depth']:
+                    parent = thread[index]
+            comment = Comment(
+                id=self.next_comment, post_id=post.id, author_id=self.random_user(),
+                parent_id=parent.id if parent else None, content=f'Comment {self.next_comment}',
+                created_at=random_time(self.rng, parent.created_at if parent else post.created_at, self.now),
+            )
+            self.next_comment += 1
+            comment.path = (parent.path if parent else '') + Comment.path_segment(comment.id)
+            thread.append(comment)
+            depths.append(depths[index] + 1 if parent else 1)
+        return thread
+
+    def reset_sequences(self):
+        # Explicit ids leave PostgreSQL sequences behind (as after loaddata)
+        statements = connection.ops.sequence_reset_sql(no_style(), [User, Post, Comment])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
@@ -0,0 +1,167 @@
+import json
+import multiprocessing
+import random
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.models import Post
+from api.serializers import PostSerializer, post_queryset
+from api.views import LikeCreateView
+
+from .benchmark import git_revision, percentile
+
+
+def like_loop(user_ids, post_ids, deadline, seed):
+    """Like random posts as random users through LikeCreateView until ``deadline``."""
+    rng = random.Random(seed)
+    users = {user.id: user for user in User.objects.filter(pk__in=user_ids)}
+    factory = APIRequestFactory()
+    view = LikeCreateView.as_view()
+    statuses, errors, timings = {}, {}, []
+    while time.perf_counter() < deadline:
+        request = factory.post('/api/likes/', {'post': rng.choice(post_ids)}, format='json')
+        force_authenticate(request, users[rng.choice(user_ids)])
+        started = time.perf_counter()
+        try:
+            status = view(request).status_code
+        except Exception as exc:
+            key = f'{type(exc).__name__}: {exc}'[:80]
+            errors[key] = errors.get(key, 0) + 1
+            continue
+        timings.append((time.perf_counter() - started) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+    return statuses, errors, timings
+
+
+def read_loop(deadline):
+    """Serialize the first feed page over and over, like the feed endpoint does."""
+    errors, timings = {}, []
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        context = {'request': None, 'resource': 'post'}
+        try:
+            posts = post_queryset(context).order_by('-created_at', '-id')[:20]
+            PostSerializer(posts, many=True, context=context).data
+        except Exception as exc:
+            key = f'{type(exc).__name__}: {exc}'[:80]
+            errors[key] = errors.get(key, 0) + 1
+            continue
+        timings.append((time.perf_counter() - started) * 1000)
+    return errors, timings
+
+
+def run_worker(args):
+    """One process: ``writers`` like threads and ``readers`` feed threads."""
+    user_ids, post_ids, writers, readers, duration, seed = args
+    deadline = time.perf_counter() + duration
+    results = []
+
+    def run(target, *target_args):
+        try:
+            results.append((target.__name__, target(*target_args)))
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=run, args=(like_loop, user_ids, post_ids, deadline, seed * 1000 + n))
+        for n in range(writers)
+    ] + [threading.Thread(target=run, args=(read_loop, deadline)) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer the like path from several processes and threads, with feed readers '
+        'alongside, and report like throughput, lock errors and read latency. Runs '
+        'LikeCreateView directly against the configured database and WRITES REAL LIKES: '
+        'point it at a scratch database (e.g. one filled by manage.py seed).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4, help='Like threads per process.')
+        parser.add_argument('--readers', type=int, default=2, help='Feed reader threads per process.')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds to run.')
+        parser.add_argument('--users', type=int, default=500, help='Users to like as.')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--label', default='', help='Free text stored with the results.')
+        parser.add_argument('--output', default='benchmark_results.jsonl')
+
+    def handle(self, *args, **options):
+        user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True)[:options['users']])
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        if not user_ids or not post_ids:
+            raise CommandError('Needs users and posts; fill the database with manage.py seed first.')
+
+        # Children must not inherit open connections
+        connections.close_all()
+        work = [
+            (user_ids, post_ids, options['writers'], options['readers'], options['duration'],
+             options['seed'] + n)
+            for n in range(options['processes'])
+        ]
+        started = time.perf_counter()
+        with multiprocessing.get_context('fork').Pool(options['processes']) as pool:
+            outcomes = pool.map(run_worker, work)
+        elapsed = time.perf_counter() - started
+
+        statuses, errors, read_errors, like_ms, read_ms = {}, {}, {}, [], []
+        for name, result in (item for outcome in outcomes for item in outcome):
+            if name == 'read_loop':
+                for error, n in result[0].items():
+                    read_errors[error] = read_errors.get(error, 0) + n
+                read_ms.extend(result[1])
+                continue
+            for status, n in result[0].items():
+                statuses[status] = statuses.get(status, 0) + n
+            for error, n in result[1].items():
+                errors[error] = errors.get(error, 0) + n
+            like_ms.extend(result[2])
+
+        likes = sum(statuses.values())
+        result = {
+            'likes_per_second': round(likes / elapsed, 1),
+            'likes': likes,
+            'created': statuses.get(201, 0),
+            'statuses': {str(code): n for code, n in sorted(statuses.items())},
+            'errors': errors,
+            'like_p50_ms': round(percentile(like_ms or [0.0], 50), 2),
+            'like_p99_ms': round(percentile(like_ms or [0.0], 99), 2),
+            'reads': len(read_ms),
+            'read_errors': read_errors,
+            'read_p50_ms': round(percentile(read_ms or [0.0], 50), 2),
+            'read_p99_ms': round(percentile(read_ms or [0.0], 99), 2),
+        }
+        for key, value in result.items():
+            self.stdout.write(f'{key:>18}  {value}')
+
+        record = {
+            'started_at': datetime.now(dt_timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'kind': 'stress_likes',
+            'label': options['label'],
+            'vendor': connection.vendor,
+            'engine': connection.settings_dict['ENGINE'],
+            'processes': options['processes'],
+            'writers': options['writers'],
+            'readers': options['readers'],
+            'seconds': round(elapsed, 2),
+            'result': result,
+        }
+        with open(options['output'], 'a') as output:
+            output.write(json.dumps(record) + '\n')
+        if errors or read_errors:
+            self.stdout.write(self.style.WARNING(
+                f'{sum(errors.values())} likes and {sum(read_errors.values())} reads failed'
+            ))
+        self.stdout.write(self.style.SUCCESS(f'Results appended to {options["output"]}'))
@@ -0,0 +1,55 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the SQLite primary database into every SQLite replica (DATABASE_REPLICA_URLS) '
+        'with the online backup API, once or every --interval seconds. Stands in for '
+        'replication when trying replica routing locally; real replicas (e.g. PostgreSQL '
+        'streaming replication) replicate themselves.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep copying, this many seconds apart (simulates replication lag).',
+        )
+
+    def handle(self, *args, **options):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas:
+            raise CommandError('No replicas configured; set DATABASE_REPLICA_URLS.')
+        databases = [DEFAULT_DB_ALIAS, *replicas]
+        for alias in databases:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'{alias} is not SQLite; only SQLite files can be copied.')
+            if connections[alias].is_in_memory_db():
+                raise CommandError(f'{alias} is an in-memory database.')
+
+        primary = str(connections[DEFAULT_DB_ALIAS].settings_dict['NAME'])
+        while True:
+            started = time.perf_counter()
+            for alias in replicas:
+                self.copy(primary, str(connections[alias].settings_dict['NAME']))
+            self.stdout.write(
+                f'Copied {primary} to {len(replicas)} replica(s) in '
+                f'{(time.perf_counter() - started) * 1000:.0f} ms'
+            )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def copy(self, source_path, target_path):
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path)
+        try:
+            # One consistent snapshot; readers of the target see old or new pages, never a mix
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
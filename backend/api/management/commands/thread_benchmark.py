@@ -0,0 +1,122 @@
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.comment_tree import link_comments, set_root_comments
+from api.models import Comment, Post
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import MAX_REPLIES_PER_NODE, MAX_TREE_DEPTH, PostSerializer
+
+from .benchmark import git_revision
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def build_thread(comments, depth, seed):
+    """An unsaved post with ``comments`` linked comments nested up to ``depth`` levels."""
+    rng = random.Random(seed)
+    users = [User(id=n, username=f'user{n}') for n in range(1, 51)]
+    started = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+    post = Post(id=1, author=users[0], content='A post everyone argues about. ' * 4,
+                created_at=started, like_count=rng.randint(0, 500))
+    nodes, open_parents = [], [None]
+    for pk in range(1, comments + 1):
+        parent = rng.choice(open_parents)
+        comment = Comment(
+            id=pk, post=post, author=rng.choice(users), parent=parent,
+            content=' '.join(rng.choice(['yes', 'no', 'actually', 'source?', 'this', 'well'])
+                             for _ in range(rng.randint(5, 40))),
+            created_at=started + timedelta(seconds=pk), like_count=rng.randint(0, 50),
+        )
+        comment.path = (parent.path if parent else '') + Comment.path_segment(pk)
+        nodes.append(comment)
+        if comment.path.count('/') < depth:
+            open_parents.append(comment)
+    set_root_comments(post, link_comments(nodes)[post.id])
+    post.comment_count = comments
+    return post
+
+
+def timed(func, repeat):
+    """``(median ms, last result)`` of ``repeat`` calls."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+class Command(BaseCommand):
+    help = (
+        'Serialize one large synthetic comment thread and report serialization and '
+        'JSON encoding time (DRF JSONRenderer vs FastJSONRenderer) and the bytes sent '
+        'plain, gzipped and brotli compressed. Needs no database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--depth', type=int, default=MAX_TREE_DEPTH, help='Thread depth.')
+        parser.add_argument(
+            '--replies', type=int, default=MAX_REPLIES_PER_NODE,
+            help='Replies rendered per node (?replies=).',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', default='benchmark_results.jsonl')
+
+    def handle(self, *args, **options):
+        post = build_thread(options['comments'], options['depth'], options['seed'])
+        request = Request(APIRequestFactory().get(
+            '/api/posts/1/', {'depth': options['depth'], 'replies': options['replies']}
+        ))
+        repeat = options['repeat']
+
+        serialize_ms, data = timed(
+            lambda: PostSerializer(post, context={'request': request}).data, repeat
+        )
+        drf_ms, drf_body = timed(lambda: JSONRenderer().render(data), repeat)
+        fast_ms, fast_body = timed(lambda: FastJSONRenderer().render(data), repeat)
+        gzip_ms, gzipped = timed(lambda: compress_string(fast_body), repeat)
+        result = {
+            'comments': options['comments'],
+            'serialize_ms': round(serialize_ms, 2),
+            'encode_drf_ms': round(drf_ms, 2),
+            'encode_fast_ms': round(fast_ms, 2),
+            'fast_renderer': 'orjson' if orjson is not None else 'json',
+            'same_bytes': drf_body == fast_body,
+            'bytes': len(fast_body),
+            'gzip_bytes': len(gzipped),
+            'gzip_ms': round(gzip_ms, 2),
+        }
+        if brotli is not None:
+            quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+            brotli_ms, compressed = timed(lambda: brotli.compress(fast_body, quality=quality), repeat)
+            result.update({'brotli_bytes': len(compressed), 'brotli_ms': round(brotli_ms, 2)})
+
+        for key, value in result.items():
+            self.stdout.write(f'{key:>16}  {value}')
+        record = {
+            'started_at': datetime.now(dt_timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'kind': 'thread_render',
+            'depth': options['depth'],
+            'replies': options['replies'],
+            'result': result,
+        }
+        with open(options['output'], 'a') as output:
+            output.write(json.dumps(record) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'Results appended to {options["output"]}'))
@@ -1,5 +1,29 @@
+import hashlib
+import heapq
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.cache import patch_vary_headers
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from .routers import apin_user, end_route, pin_user, start_route
+from .thread_cache import LRUCache
+
+logger = logging.getLogger(__name__)
 
 
 class DevelopmentAuthMiddleware:
@@ -41,3 +65,309 @@ class DisableCSRFMiddleware(MiddlewareMixin):
         # Disable CSRF for all API endpoints
         if request.path.startswith('/api/'):
             setattr(request, '_dont_enforce_csrf_checks', True)
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware that can also run on the event loop.
+
+    WhiteNoise 6 is sync only, and a sync middleware makes Django run it and
+    everything below it through one shared worker thread, which would
+    serialize every request under ASGI. Matching a static file is a dict
+    lookup (a stat in DEBUG), so it is safe to do on the loop directly.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class QueryRecorder:
+    """
+    ``connection.execute_wrapper`` that counts statements, sums their time
+    and keeps the N slowest. Works with DEBUG off, unlike connection.queries.
+    """
+    def __init__(self, keep):
+        self.keep = keep
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = []
+        # Time spent in this wrapper's own bookkeeping
+        self.overhead = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            finished = time.perf_counter()
+            elapsed = finished - started
+            self.count += 1
+            self.duration += elapsed
+            if self.keep:
+                entry = (elapsed, self.count, sql)
+                if len(self.slowest) < self.keep:
+                    heapq.heappush(self.slowest, entry)
+                elif elapsed > self.slowest[0][0]:
+                    heapq.heapreplace(self.slowest, entry)
+            self.overhead += time.perf_counter() - finished
+
+
+# The QueryRecorder of the request being served. Context variables follow a
+# request into sync_to_async threads, where the async ORM runs its queries on
+# that thread's own connection.
+_current_recorder = ContextVar('request_timing_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Permanent execute wrapper; hands statements to the current request's recorder."""
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection, **kwargs):
+    """``connection_created`` receiver: route ``connection`` through record_query once."""
+    if record_query not in connection.execute_wrappers:
+        # First, so execute_wrapper() blocks opened later still pop their own
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class RequestTimingMiddleware:
+    """
+    Per-request SQL and timing instrumentation.
+
+    Adds a ``Server-Timing`` header (``db``: statement count and total SQL
+    time, ``app``: the rest of the view, ``timing``: this middleware's own
+    cost) and logs one JSON line to ``api.middleware`` for requests slower
+    than ``REQUEST_TIMING_SLOW_MS`` or running more than
+    ``REQUEST_TIMING_SLOW_QUERIES`` statements, with the slowest statements
+    (SQL text only, never parameters).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = getattr(settings, 'REQUEST_TIMING_HEADER', True)
+        self.slow_ms = getattr(settings, 'REQUEST_TIMING_SLOW_MS', 500)
+        self.slow_queries = getattr(settings, 'REQUEST_TIMING_SLOW_QUERIES', 50)
+        self.keep = getattr(settings, 'REQUEST_TIMING_SLOWEST', 3)
+        connection_created.connect(install_query_recorder, dispatch_uid='api.request_timing')
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        recorder, token = self.install()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self.finish(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        recorder, token = self.install()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self.finish(request, response, recorder, started)
+
+    def install(self):
+        # Connections opened before the receiver was connected (same thread)
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        recorder = QueryRecorder(self.keep)
+        return recorder, _current_recorder.set(recorder)
+
+    def finish(self, request, response, recorder, started):
+        finishing = time.perf_counter()
+        total_ms = (finishing - started) * 1000
+        db_ms = recorder.duration * 1000
+
+        if self.header:
+            overhead_ms = recorder.overhead * 1000 + (time.perf_counter() - finishing) * 1000
+            response['Server-Timing'] = (
+                f'db;desc="{recorder.count} queries";dur={db_ms:.2f}, '
+                f'app;dur={max(total_ms - db_ms, 0):.2f}, '
+                f'timing;dur={overhead_ms:.2f}'
+            )
+
+        if total_ms >= self.slow_ms or recorder.count >= self.slow_queries:
+            record = {
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 2),
+                'db_ms': round(db_ms, 2),
+                'queries': recorder.count,
+                'slowest': [
+                    {'ms': round(elapsed * 1000, 2), 'sql': sql[:300]}
+                    for elapsed, _, sql in sorted(recorder.slowest, reverse=True)
+                ],
+            }
+            logger.warning(json.dumps(record), extra={'request_timing': record})
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Opens each request's read routing state for ReplicaRouter (routers.py)
+    and, after a successful write, keeps the writer's reads on the primary
+    for ``DATABASE_REPLICA_LAG`` seconds.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = start_route(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            end_route(token)
+        writer = self.writer(request, response)
+        if writer is not None:
+            pin_user(writer)
+        return response
+
+    async def __acall__(self, request):
+        token = start_route(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_route(token)
+        writer = self.writer(request, response)
+        if writer is not None:
+            await apin_user(writer)
+        return response
+
+    def writer(self, request, response):
+        """Id of the user whose write ``response`` reports success for, if any."""
+        if request.method in ('GET', 'HEAD', 'OPTIONS') or response.status_code >= 400:
+            return None
+        # The DRF-authenticated user by now
+        user = getattr(request, 'user', None)
+        return user.pk if user is not None and user.is_authenticated else None
+
+
+def accepted_encodings(header):
+    """``{coding: q}`` from an ``Accept-Encoding`` header."""
+    encodings = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding.strip():
+            encodings[coding.strip().lower()] = quality
+    return encodings
+
+
+class CompressionMiddleware:
+    """
+    Brotli or gzip for JSON reads of at least ``COMPRESSION_MIN_BYTES``.
+
+    The coding is negotiated from ``Accept-Encoding``: brotli when the
+    ``brotli`` package is installed and the client prefers it at least as
+    much as gzip, gzip otherwise. Only GET/HEAD responses are compressed, so
+    bodies holding tokens (login, register) never are (BREACH). Streaming
+    responses and WhiteNoise's pre-compressed files pass through untouched.
+
+    Compressing a big thread costs more than serving it from the thread
+    cache, so compressed bodies are kept in a process LRU of
+    ``COMPRESSION_CACHE_BYTES`` keyed by coding and body digest: every
+    client of a hot thread after the first gets the same bytes for one md5.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_bytes = getattr(settings, 'COMPRESSION_MIN_BYTES', 1024)
+        # About gzip -6 in time and size on comment threads; higher levels cost far more
+        self.brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+        self.cache = LRUCache(getattr(settings, 'COMPRESSION_CACHE_BYTES', 16 * 1024 * 1024))
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if (
+            request.method not in ('GET', 'HEAD') or response.status_code != 200
+            or response.streaming or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith('application/json')
+            or len(response.content) < self.min_bytes
+        ):
+            return response
+
+        patch_vary_headers(response, ['Accept-Encoding'])
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        br = accepted.get('br', accepted.get('*', 0))
+        gzip = accepted.get('gzip', accepted.get('*', 0))
+        if brotli is not None and br > 0 and br >= gzip:
+            coding = 'br'
+        elif gzip > 0:
+            coding = 'gzip'
+        else:
+            return response
+
+        key = (coding, hashlib.md5(response.content).digest())
+        body = self.cache.get(key)
+        if body is None:
+            if coding == 'br':
+                body = brotli.compress(response.content, quality=self.brotli_quality)
+            else:
+                body = compress_string(response.content)
+            self.cache.set(key, body)
+        if len(body) >= len(response.content):
+            return response
+
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = coding
+        # The bytes differ per coding, so the ETag is only weakly the same
+        if response.get('ETag', '').startswith('"'):
+            response['ETag'] = 'W/' + response['ETag']
+        return response
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0003_like_count_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KarmaBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(help_text='Start of the hour (UTC) this bucket covers.')),
+                ('karma', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='karma_buckets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='karma_bucket_hour_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='karmabucket',
+            constraint=models.UniqueConstraint(fields=('user', 'hour'), name='unique_user_karma_hour'),
+        ),
+    ]
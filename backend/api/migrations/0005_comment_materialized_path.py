@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:06
+
+from django.db import migrations, models
+
+SEGMENT_WIDTH = 10
+
+
+def backfill_paths(apps, schema_editor):
+    Comment = apps.get_model('api', 'Comment')
+    parents = dict(Comment.objects.values_list('id', 'parent_id').iterator())
+    paths = {}
+
+    def path_of(pk):
+        # Iterative walk up the ancestors, so deep threads cannot hit the recursion limit
+        chain = []
+        while pk is not None and pk not in paths:
+            chain.append(pk)
+            pk = parents[pk]
+        prefix = paths[pk] if pk is not None else ''
+        for node in reversed(chain):
+            prefix += f'{node:0{SEGMENT_WIDTH}d}/'
+            paths[node] = prefix
+        return paths[chain[0]] if chain else prefix
+
+    batch = []
+    for pk in parents:
+        batch.append(Comment(pk=pk, path=path_of(pk)))
+        if len(batch) >= 1000:
+            Comment.objects.bulk_update(batch, ['path'])
+            batch = []
+    Comment.objects.bulk_update(batch, ['path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_karma_buckets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1024),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['path'], name='comment_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
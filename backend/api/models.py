@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import connection, models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Concat, Substr
+
+from .versions import bump_posts_on_commit
 
 
 class Post(models.Model):
@@ -8,35 +11,119 @@ class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Denormalized, kept in sync by LikeCreateView (see recount_likes)
+    like_count = models.PositiveIntegerField(default=0)
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Keyset pagination of the feed walks (created_at, id) backwards
+            models.Index(fields=['-created_at', '-id'], name='post_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"Post by {self.author.username}: {self.content[:50]}"
 
-    @property
-    def like_count(self):
-        return self.likes.count()
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        bump_posts_on_commit([self.pk])
+
+    def delete(self, *args, **kwargs):
+        bump_posts_on_commit([self.pk])
+        return super().delete(*args, **kwargs)
 
 
 class Comment(models.Model):
-    """Comment model with threading support via parent self-reference."""
+    """
+    Comment model with threading support via parent self-reference.
+
+    ``path`` is a materialized path: the zero-padded ids of the root comment
+    down to this one (``0000000012/0000000040/``). Sorting by path gives
+    thread order, and a subtree is a single indexed prefix query
+    (``subtree_filter``).
+    """
+    PATH_SEGMENT_WIDTH = 10
+    PATH_MAX_LENGTH = 1024
+
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Denormalized, kept in sync by LikeCreateView (see recount_likes)
+    like_count = models.PositiveIntegerField(default=0)
+    # Maintained by save(); see class docstring
+    path = models.CharField(max_length=PATH_MAX_LENGTH, blank=True, default='', editable=False)
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # varchar_pattern_ops lets PostgreSQL use the index for LIKE 'prefix%'
+            models.Index(fields=['path'], name='comment_path_idx', opclasses=['varchar_pattern_ops']),
+            # Default ordering and ?since= exports walk (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='comment_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.id}"
 
-    @property
-    def like_count(self):
-        return self.likes.count()
+    @classmethod
+    def path_segment(cls, pk):
+        return f'{pk:0{cls.PATH_SEGMENT_WIDTH}d}/'
+
+    @classmethod
+    def subtree_filter(cls, path):
+        """
+        Q for the comments whose path starts with ``path`` (ends with '/'),
+        in a form ``comment_path_idx`` can answer. PostgreSQL's index serves
+        ``LIKE 'prefix%'`` (varchar_pattern_ops), but SQLite never uses an
+        index for Django's ``LIKE ... ESCAPE``, so there it is the
+        equivalent range: up to ``path`` with its final '/' replaced by '0',
+        the next character (paths are compared bytewise).
+        """
+        if connection.vendor == 'postgresql':
+            return models.Q(path__startswith=path)
+        return models.Q(path__gte=path, path__lt=path[:-1] + '0')
+
+    def path_matches_parent(self):
+        """True if ``path`` ends with this comment under its current parent (no query)."""
+        expected_tail = self.path_segment(self.pk)
+        if self.parent_id:
+            expected_tail = self.path_segment(self.parent_id) + expected_tail
+            return self.path.endswith(expected_tail)
+        return self.path == expected_tail
+
+    def build_path(self):
+        parent_path = self.parent.path if self.parent_id else ''
+        return parent_path + self.path_segment(self.pk)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        bump_posts_on_commit([self.post_id])
+        if self.path and self.path_matches_parent():
+            return
+        # New comment (id only known now) or moved to another parent
+        old_path, self.path = self.path, self.build_path()
+        Comment.objects.filter(pk=self.pk).update(path=self.path)
+        if old_path:
+            # Re-root the moved subtree under the new path
+            Comment.objects.filter(self.subtree_filter(old_path)).exclude(pk=self.pk).update(
+                path=Concat(models.Value(self.path), Substr('path', len(old_path) + 1))
+            )
+
+    def delete(self, *args, **kwargs):
+        bump_posts_on_commit([self.post_id])
+        if not self.path:
+            return super().delete(*args, **kwargs)
+        # Collect the whole subtree with one prefix query instead of level by level
+        return Comment.objects.filter(self.subtree_filter(self.path)).delete()
+
+    def subtree(self):
+        """This comment and all of its descendants, in thread order."""
+        return Comment.objects.filter(self.subtree_filter(self.path)).order_by('path')
+
+    def descendants(self):
+        return self.subtree().exclude(pk=self.pk)
 
 
 class Like(models.Model):
@@ -50,6 +137,10 @@ class Like(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        indexes = [
+            # Time-window scans (backfill_karma --hours, recent activity)
+            models.Index(fields=['created_at'], name='like_created_idx'),
+        ]
         # Prevent duplicate likes on the same post or comment
         constraints = [
             models.UniqueConstraint(
@@ -79,3 +170,25 @@ class Like(models.Model):
     def save(self, *args, **kwargs):
         self.clean()
         super().save(*args, **kwargs)
+
+
+class KarmaBucket(models.Model):
+    """
+    Hourly karma rollup per user, incremented whenever one of their posts or
+    comments is liked. The 24h leaderboard sums the last 24 buckets instead of
+    scanning the Like table.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='karma_buckets')
+    hour = models.DateTimeField(help_text='Start of the hour (UTC) this bucket covers.')
+    karma = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'hour'], name='unique_user_karma_hour'),
+        ]
+        indexes = [
+            models.Index(fields=['hour'], name='karma_bucket_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.karma} karma @ {self.hour:%Y-%m-%d %H:00}"
@@ -0,0 +1,115 @@
+"""
+Cursor pagination helpers.
+
+The post feed and the comment list use keyset pagination: pages are addressed by the
+``(created_at, id)`` of the last post on the previous page instead of an
+OFFSET, so fetching page 1000 costs the same index range scan as page 1.
+
+A post's top-level comments and a comment's replies are paged by position
+in a sort order (``old``, ``new``, ``top``), so their cursors are simply an
+opaque ``(offset, sort)`` pair.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination ordered by ``-created_at, -id``.
+
+    Responses look like ``{"next": <url or null>, "results": [...]}``.
+    Matches the ``post_created_id_idx`` composite index on Post and
+    ``comment_created_id_idx`` on Comment.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+
+        queryset = queryset.order_by('-created_at', '-id')
+        position = self.decode_cursor(request)
+        if position is not None:
+            created_at, pk = position
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+        # Fetch one extra row to know whether there is a next page
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(last)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def encode_cursor(self, instance):
+        raw = f'{instance.created_at.isoformat()}|{instance.id}'
+        return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            created_at, pk = raw.rsplit('|', 1)
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+
+def encode_reply_cursor(offset, sort):
+    raw = json.dumps({'offset': offset, 'sort': sort}, separators=(',', ':'))
+    # Without '=' padding the cursor can be used in a URL as-is
+    return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_reply_cursor(encoded):
+    """``(offset, sort)`` from a ``more_replies`` cursor; raises NotFound if malformed."""
+    try:
+        padded = encoded + '=' * (-len(encoded) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return max(int(raw['offset']), 0), str(raw['sort'])
+    except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+        raise NotFound(KeysetPagination.invalid_cursor_message)
@@ -0,0 +1,53 @@
+"""
+Fast JSON rendering.
+
+Encoding a large comment tree with the stdlib ``json`` module (DRF's
+``JSONRenderer``) costs about as much as serializing it. ``FastJSONRenderer``
+encodes with orjson when it is installed and falls back to DRF's pure-Python
+encoder otherwise, or for anything orjson cannot encode (``?indent``,
+ASCII-only output, integers over 64 bits, ...).
+
+For the API's payloads (strings, integers, booleans, dates, no floats) the
+bytes are the same as ``JSONRenderer``'s; tests/test_renderers.py checks
+this. Floats decode to the same values but may be spelled differently
+(``1e+20`` vs ``1e20``).
+"""
+import json
+
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Dates go through DRF's encoder for its exact format; dict keys may be ints
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` that encodes with orjson when available."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same strict JavaScript subset as JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+def parse_json(body):
+    """Decode a body rendered by FastJSONRenderer (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
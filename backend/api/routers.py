@@ -0,0 +1,115 @@
+"""
+Read replica routing.
+
+With ``DATABASE_REPLICA_URLS`` set, the databases after ``default`` are
+replicas of it (``DATABASE_REPLICAS``). ``ReplicaRouter`` sends reads to a
+replica (one per request) only while the request has opted in, so anything
+outside a request (management commands, the like buffer thread) and every
+write stays on the primary. ``ReplicaRoutingMiddleware`` (middleware.py)
+opts in GETs of the post, comment and leaderboard endpoints, decided at
+their first query once the caller is authenticated, unless:
+
+- the caller wrote something in the last ``DATABASE_REPLICA_LAG`` seconds,
+  so they always read their own writes
+- the resource's version stamp (versions.py) is younger than that, so a
+  lagging replica can never be rendered and cached under the new stamp
+- the query runs inside a transaction on the primary
+
+Reads of the user model always go to the primary: authentication must see
+accounts created a moment ago.
+"""
+import math
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+# URL names whose GETs may read from a replica
+REPLICA_READ_VIEWS = {
+    'post-list', 'post-detail', 'post-comments',
+    'comment-list', 'comment-detail', 'comment-replies',
+    'leaderboard',
+}
+
+# Per request: {'request': ..., 'replica': None (undecided) or bool}, shared
+# with the threads the request's sync code runs on
+_read_route = ContextVar('read_route', default=None)
+
+
+def replica_lag():
+    return getattr(settings, 'DATABASE_REPLICA_LAG', 2)
+
+
+def pin_key(user_id):
+    return f'replica:pin:{user_id}'
+
+
+def pin_user(user_id):
+    """Keep ``user_id``'s reads on the primary until replicas have their writes."""
+    cache.set(pin_key(user_id), True, timeout=max(1, math.ceil(replica_lag())))
+
+
+async def apin_user(user_id):
+    await cache.aset(pin_key(user_id), True, timeout=max(1, math.ceil(replica_lag())))
+
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(pin_key(user_id)) is not None
+
+
+def start_route(request):
+    """Open the routing state of ``request``; returns the token for end_route."""
+    return _read_route.set({'request': request, 'replica': None})
+
+
+def end_route(token):
+    _read_route.reset(token)
+
+
+def replica_allowed(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    match = getattr(request, 'resolver_match', None)
+    if match is None or match.url_name not in REPLICA_READ_VIEWS:
+        return False
+    user = getattr(request, 'user', None)
+    return not (user is not None and user.is_authenticated and is_pinned(user.pk))
+
+
+def primary_if_fresh(stamp):
+    """Keep this request on the primary if version ``stamp`` (ns) is within the lag."""
+    route = _read_route.get()
+    if route is not None and time.time_ns() - stamp < replica_lag() * 1_000_000_000:
+        route['replica'] = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        route = _read_route.get()
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas or route is None or route['replica'] is False:
+            return DEFAULT_DB_ALIAS
+        if model is get_user_model() or transaction.get_connection().in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if route['replica'] is None:
+            route['replica'] = replica_allowed(route['request'])
+            if not route['replica']:
+                return DEFAULT_DB_ALIAS
+            # One replica per request, so a response never mixes replication positions
+            route['alias'] = random.choice(replicas)
+        return route['alias']
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return db == DEFAULT_DB_ALIAS
@@ -1,6 +1,19 @@
+import hashlib
+
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from django.conf import settings
+from django.db import models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from .models import Post, Comment, Like
+from .comment_tree import (
+    REPLY_SORTS, get_comment_preview, get_root_comments, load_comment_previews,
+    load_comment_trees, load_reply_trees, page_comments, replies_loaded, root_comment_page,
+    root_comments_loaded, set_replies, set_root_comments
+)
+from .pagination import encode_reply_cursor
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -10,63 +23,356 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username']
 
 
-class RecursiveField(serializers.Serializer):
-    """Custom field for recursive serialization of comments."""
-    def to_representation(self, value):
-        serializer = self.parent.parent.__class__(value, context=self.context)
-        return serializer.data
+MAX_TREE_DEPTH = 10
+MAX_REPLIES_PER_NODE = 50
+
+
+def _bounded_param(params, name, default, maximum):
+    try:
+        value = int(params[name])
+    except (KeyError, ValueError):
+        return default
+    return max(1, min(value, maximum))
+
+
+def tree_options(context):
+    """
+    Depth limit, replies per node and sort order for comment trees.
+    Read once per response from ``?depth=``, ``?replies=`` and ``?sort=``.
+    """
+    if '_comment_tree_options' not in context:
+        request = context.get('request')
+        params = request.query_params if request is not None else {}
+        sort = params.get('sort')
+        context['_comment_tree_options'] = {
+            'max_depth': _bounded_param(
+                params, 'depth', getattr(settings, 'COMMENT_TREE_DEPTH', 4), MAX_TREE_DEPTH
+            ),
+            'limit': _bounded_param(
+                params, 'replies', getattr(settings, 'COMMENT_REPLIES_PER_NODE', 10),
+                MAX_REPLIES_PER_NODE
+            ),
+            'sort': sort if sort in REPLY_SORTS else 'old',
+        }
+    return context['_comment_tree_options']
+
+
+def _names(value):
+    return frozenset(name.strip() for name in value.split(',') if name.strip())
+
+
+def field_options(context):
+    """
+    Sparse fieldsets, read once per response:
+
+    - ``?fields=a,b`` picks the fields of the endpoint's own resource
+      (``context['resource']``, ``post`` or ``comment``)
+    - ``?fields[post]=...`` and ``?fields[comment]=...`` pick them per type,
+      which also reaches comments nested in posts
+    - ``?expand=comments`` replaces the feed's comment preview with full trees
+
+    Only reads are affected; writes always return the full representation.
+    """
+    if '_field_options' not in context:
+        request = context.get('request')
+        params = {}
+        if request is not None and request.method in SAFE_METHODS:
+            params = request.query_params
+        options = {'expand': _names(params.get('expand', ''))}
+        for resource in ('post', 'comment'):
+            value = params.get(f'fields[{resource}]')
+            if not value and context.get('resource') == resource:
+                value = params.get('fields')
+            options[resource] = _names(value) if value else None
+        context['_field_options'] = options
+    return context['_field_options']
+
+
+def field_wanted(context, resource, name):
+    requested = field_options(context)[resource]
+    return requested is None or name in requested
+
+
+def representation_key(context):
+    """Short digest of every option that shapes a rendered post (thread cache keys)."""
+    options = field_options(context)
+    raw = repr((
+        sorted(tree_options(context).items()),
+        sorted(options['post'] or ()), sorted(options['comment'] or ()), sorted(options['expand']),
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()[:16]
+
+
+def preview_limit():
+    return getattr(settings, 'FEED_PREVIEW_COMMENTS', 3)
+
+
+def post_comment_mode(context, many):
+    """How posts render ``comments``: ``preview`` (feed default), ``tree`` or None."""
+    if not field_wanted(context, 'post', 'comments'):
+        return None
+    if many and 'comments' not in field_options(context)['expand']:
+        return 'preview'
+    return 'tree'
+
+
+def post_queryset(context):
+    """Posts joined and annotated with only what the response will render."""
+    queryset = Post.objects.all()
+    if field_wanted(context, 'post', 'author'):
+        queryset = queryset.select_related('author')
+    if field_wanted(context, 'post', 'comment_count'):
+        counts = Comment.objects.filter(post=OuterRef('pk')).order_by().values('post')
+        queryset = queryset.annotate(comment_count=Coalesce(
+            Subquery(counts.annotate(count=Count('pk')).values('count')), 0
+        ))
+    return queryset
+
+
+def load_post_comments(posts, context, many=False):
+    """Fetch the comments ``posts`` will render, in one query (none if not requested)."""
+    mode = post_comment_mode(context, many)
+    if mode == 'preview':
+        load_comment_previews(posts, preview_limit())
+    elif mode == 'tree':
+        load_comment_trees(posts)
+
+
+def like_targets(data, context, resource):
+    """
+    ``{'post': [...], 'comment': [...]}``: the rendered objects in ``data``
+    (one object, a list, or a page with ``results``) that get a
+    ``liked_by_me`` flag, nested comments and replies included.
+    """
+    if isinstance(data, dict) and 'results' in data:
+        data = data['results']
+    targets = {'post': [], 'comment': []}
+    stack = [(item, resource) for item in (data if isinstance(data, list) else [data])]
+    while stack:
+        item, kind = stack.pop()
+        if 'id' in item and field_wanted(context, kind, 'liked_by_me'):
+            targets[kind].append(item)
+        children = item.get('comments' if kind == 'post' else 'replies') or []
+        stack.extend((child, 'comment') for child in children)
+    return targets
+
+
+def liked_query(user, targets):
+    """
+    The viewer's likes among ``targets``, as ``(post_id, comment_id)`` rows.
+    One query: a UNION ALL of a post and a comment lookup, each a probe of
+    its unique (user, post/comment) index rather than a scan of every like
+    the viewer ever made.
+    """
+    likes = Like.objects.filter(user=user).values_list('post_id', 'comment_id').order_by()
+    posts = likes.filter(post_id__in=[item['id'] for item in targets['post']])
+    comments = likes.filter(comment_id__in=[item['id'] for item in targets['comment']])
+    if not targets['comment']:
+        return posts
+    if not targets['post']:
+        return comments
+    return posts.union(comments, all=True)
+
+
+def set_liked(targets, likes):
+    liked_posts = {post_id for post_id, _ in likes}
+    liked_comments = {comment_id for _, comment_id in likes}
+    for item in targets['post']:
+        item['liked_by_me'] = item['id'] in liked_posts
+    for item in targets['comment']:
+        item['liked_by_me'] = item['id'] in liked_comments
+
+
+def mark_liked(data, context, resource, user=None):
+    """
+    Flag every post and comment of a rendered read with whether ``user``
+    liked it, using one Like query for the whole response (none without a
+    signed-in user). Runs on serialized data, after the thread cache: cached
+    bodies are shared, so they are stored with ``user=None`` (all false).
+    Returns True if anything was flagged as liked.
+    """
+    targets = like_targets(data, context, resource)
+    likes = []
+    if user is not None and user.is_authenticated and (targets['post'] or targets['comment']):
+        likes = list(liked_query(user, targets))
+    set_liked(targets, likes)
+    return bool(likes)
+
+
+def comment_page(comments, context, depth, offset=0, sort=None):
+    """
+    Serialize one page of sibling comments sitting at tree ``depth``
+    (top-level comments are depth 1).
+
+    Returns ``(data, more_cursor)``. Below the depth limit nothing is
+    serialized and the cursor points at the first page of the siblings.
+    """
+    options = tree_options(context)
+    sort = sort if sort in REPLY_SORTS else options['sort']
+    comments = list(comments)
+    if not comments:
+        return [], None
+    if depth > options['max_depth']:
+        return [], encode_reply_cursor(0, sort)
+
+    page, next_offset = page_comments(comments, sort, offset, options['limit'])
+    data = CommentSerializer(page, many=True, context=context, tree_depth=depth).data
+    more = encode_reply_cursor(next_offset, sort) if next_offset is not None else None
+    return data, more
+
+
+def post_comment_page(post, context, offset=0, sort=None):
+    """
+    ``comment_page`` of ``post``'s top-level comments. Unless the whole tree
+    is already loaded (the feed's ``?expand=comments``), only the page is
+    read: its top-level comments, then their replies down to the depth limit.
+    """
+    if root_comments_loaded(post):
+        return comment_page(get_root_comments(post), context, depth=1, offset=offset, sort=sort)
+    options = tree_options(context)
+    sort = sort if sort in REPLY_SORTS else options['sort']
+    page, next_offset = root_comment_page(post.pk, sort, offset, options['limit'])
+    if field_wanted(context, 'comment', 'replies'):
+        # Nodes at the depth limit only need to know whether they have replies
+        load_reply_trees(page, depth=options['max_depth'])
+    data = CommentSerializer(page, many=True, context=context).data
+    more = encode_reply_cursor(next_offset, sort) if next_offset is not None else None
+    return data, more
+
+
+class SparseFieldsMixin:
+    """
+    Drops the fields a read did not ask for (see field_options), so they
+    are neither serialized nor fetched. ``resource`` names the type.
+    """
+    resource = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = field_options(self.context)[self.resource]
+        if requested is not None:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+    def wants(self, name):
+        return field_wanted(self.context, self.resource, name)
+
+
+class CommentListSerializer(serializers.ListSerializer):
+    """Loads the reply trees of a whole page of comments in one query."""
+    def to_representation(self, data):
+        comments = list(data.all() if isinstance(data, models.Manager) else data)
+        if self.child.wants('replies'):
+            load_reply_trees(comments)
+        return super().to_representation(comments)
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
-    Comment serializer with recursive replies.
-    Optimized to prevent N+1 queries via prefetch_related.
+    Comment serializer with depth-limited, paginated replies.
+    Replies are walked from the tree built by comment_tree, so nesting depth
+    never adds queries. Nodes whose replies were cut off by the depth or
+    per-node limit carry a ``more_replies`` cursor for
+    ``GET /api/comments/{id}/replies/``.
     """
+    resource = 'comment'
     author = UserSerializer(read_only=True)
-    replies = RecursiveField(many=True, read_only=True)
-    like_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Comment
-        fields = ['id', 'author', 'post', 'parent', 'content', 'created_at', 'like_count', 'replies']
-        read_only_fields = ['author', 'created_at']
+        fields = ['id', 'author', 'post', 'parent', 'content', 'created_at', 'like_count']
+        read_only_fields = ['author', 'created_at', 'like_count']
+        list_serializer_class = CommentListSerializer
 
-    def get_like_count(self, obj):
-        return obj.likes.count()
+    def __init__(self, *args, tree_depth=1, **kwargs):
+        self.tree_depth = tree_depth
+        super().__init__(*args, **kwargs)
+
+    def validate_parent(self, parent):
+        if parent is not None and (
+            len(parent.path) + Comment.PATH_SEGMENT_WIDTH + 1 > Comment.PATH_MAX_LENGTH
+        ):
+            raise serializers.ValidationError('This thread is too deep to reply to.')
+        return parent
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if not self.wants('replies'):
+            return data
+        if not replies_loaded(instance):
+            load_reply_trees([instance])
+        data['replies'], data['more_replies'] = comment_page(
+            instance.replies.all(), self.context, depth=self.tree_depth + 1
+        )
+        if getattr(instance, 'has_replies', False):
+            # Feed preview comment: its replies were not fetched
+            data['more_replies'] = encode_reply_cursor(0, tree_options(self.context)['sort'])
+        return data
 
     def create(self, validated_data):
         # Set author from request context
         validated_data['author'] = self.context['request'].user
-        return super().create(validated_data)
+        comment = super().create(validated_data)
+        # A brand new comment has no replies, no need to load the thread
+        set_replies(comment, [])
+        return comment
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostListSerializer(serializers.ListSerializer):
+    """Loads the comments of a whole page of posts in one query."""
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, models.Manager) else data)
+        load_post_comments(posts, self.context, many=True)
+        return super().to_representation(posts)
+
+
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Post serializer with optimized comment fetching.
-    Uses prefetch_related to avoid N+1 queries.
+    Comment trees are loaded in a single query and linked in memory, then
+    serialized down to a limited depth (see comment_page). ``more_comments``
+    continues the top-level comments via ``GET /api/posts/{id}/comments/``.
+
+    In lists (the feed) ``comments`` is only a preview: the top
+    ``FEED_PREVIEW_COMMENTS`` top-level comments by likes, without replies;
+    ``?expand=comments`` gives full trees. ``comment_count`` counts every
+    comment of the post (see post_queryset).
     """
+    resource = 'post'
     author = UserSerializer(read_only=True)
-    comments = serializers.SerializerMethodField()
-    like_count = serializers.SerializerMethodField()
+    comment_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
-        fields = ['id', 'author', 'content', 'created_at', 'like_count', 'comments']
-        read_only_fields = ['author', 'created_at']
+        fields = ['id', 'author', 'content', 'created_at', 'like_count', 'comment_count']
+        read_only_fields = ['author', 'created_at', 'like_count']
+        list_serializer_class = PostListSerializer
 
-    def get_like_count(self, obj):
-        return obj.likes.count()
+    def get_comment_count(self, post):
+        count = getattr(post, 'comment_count', None)
+        return count if count is not None else post.comments.count()
 
-    def get_comments(self, obj):
-        """Get only top-level comments (no parent). Nested replies are handled recursively."""
-        # Filter for top-level comments only
-        top_level_comments = obj.comments.filter(parent__isnull=True)
-        return CommentSerializer(top_level_comments, many=True, context=self.context).data
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        mode = post_comment_mode(self.context, isinstance(self.parent, PostListSerializer))
+        if mode == 'preview':
+            comments, total = get_comment_preview(instance)
+            data['comments'] = CommentSerializer(comments, many=True, context=self.context).data
+            data['more_comments'] = (
+                encode_reply_cursor(len(comments), 'top') if total > len(comments) else None
+            )
+        elif mode == 'tree':
+            # Only top-level comments here, nested replies are handled recursively
+            data['comments'], data['more_comments'] = post_comment_page(instance, self.context)
+        return data
 
     def create(self, validated_data):
         # Set author from request context
         validated_data['author'] = self.context['request'].user
-        return super().create(validated_data)
+        post = super().create(validated_data)
+        post.comment_count = 0
+        set_root_comments(post, [])
+        return post
 
 
 class LikeSerializer(serializers.ModelSerializer):
@@ -88,6 +394,7 @@ class LeaderboardSerializer(serializers.Serializer):
     """Serializer for leaderboard entries."""
     username = serializers.CharField()
     karma = serializers.IntegerField()
+    rank = serializers.IntegerField()
 
 
 # Authentication Serializers
@@ -0,0 +1,59 @@
+"""
+SQLite backend for deployments that run on a single database file.
+
+Stock SQLite under concurrent writes fails with "database is locked": a
+transaction starts as a reader (``BEGIN``) and cannot upgrade to a writer
+while another connection writes, and SQLite gives up at once rather than
+risk a deadlock. This backend adds the two ``OPTIONS`` Django 5.1 ships for
+it (drop the ENGINE override after upgrading):
+
+- ``init_command``: ``;`` separated statements run on every new connection,
+  used for the pragmas (WAL, ``synchronous``, ``busy_timeout``, ...)
+- ``transaction_mode``: ``IMMEDIATE`` makes ``atomic()`` take the write lock
+  up front, so a busy writer waits in ``busy_timeout`` instead of failing
+
+With WAL, readers never wait for the writer and the writer never waits for
+readers. api/writes.py queues the writers of the hot write paths.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Tells api.writes.write_transaction to queue writers of this process
+    serialize_writes = True
+
+    def __init__(self, settings_dict, *args, **kwargs):
+        super().__init__(settings_dict, *args, **kwargs)
+        options = self.settings_dict['OPTIONS']
+        self.init_command = options.get('init_command')
+        self.transaction_mode = options.get('transaction_mode')
+        if self.transaction_mode is not None:
+            self.transaction_mode = self.transaction_mode.upper()
+            if self.transaction_mode not in TRANSACTION_MODES:
+                raise ImproperlyConfigured(
+                    f'settings.DATABASES is improperly configured: transaction_mode '
+                    f'must be one of {", ".join(TRANSACTION_MODES)}.'
+                )
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # Not sqlite3.connect() arguments
+        kwargs.pop('init_command', None)
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for statement in (self.init_command or '').split(';'):
+            if statement.strip():
+                conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
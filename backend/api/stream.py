@@ -0,0 +1,271 @@
+"""
+Server-Sent Events push channel.
+
+Instead of polling, clients open one ``GET /api/stream/`` connection and
+receive:
+
+- ``leaderboard``: the full top-5 rows, whenever they change
+- ``post.like`` / ``comment.like``: like count deltas for a post or comment
+- ``post.comment``: a new comment (comment count delta) on a post
+
+Writers call ``publish()`` (after commit). Events go through a pluggable
+backend to the in-process ``Hub``, which fans them out to the subscribers of
+this process. ``LocalBackend`` delivers in-process only and is the default;
+``RedisBackend`` relays events between processes/hosts via Redis pub/sub.
+Events are best effort: a failing backend is logged, never raised into the
+write that published them, and subscribers simply miss the event.
+
+The endpoint needs an ASGI server (see reddit_clone/asgi.py): each idle
+subscriber is then a suspended coroutine rather than a blocked worker. Under
+WSGI it answers 503 and clients poll instead.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+from .leaderboard import get_leaderboard
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_DIRTY = 'leaderboard.dirty'
+# Longest wait between attempts to resubscribe to Redis
+MAX_RECONNECT_DELAY = 30
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def format_event(event, data):
+    """Encode one SSE frame."""
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+class Hub:
+    """
+    In-process fan-out of events to SSE subscribers.
+
+    ``dispatch()`` may be called from any thread (sync views, backend
+    listener threads); delivery to subscriber queues always happens on the
+    event loop that serves the streams. Leaderboard changes are coalesced: a
+    dirty flag is checked every ``STREAM_LEADERBOARD_INTERVAL`` seconds and
+    the (cached) leaderboard is read once per process, not once per
+    subscriber.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._ticker = None
+        self._leaderboard_dirty = False
+        self.leaderboard = None
+
+    def dispatch(self, event, data):
+        if event == LEADERBOARD_DIRTY:
+            self._leaderboard_dirty = True
+            return
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        try:
+            loop.call_soon_threadsafe(self._fan_out, event, data)
+        except RuntimeError:
+            # Event loop already closed (server shutting down)
+            pass
+
+    def _fan_out(self, event, data):
+        frame = format_event(event, data)
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Slow consumer: drop rather than buffer without bound
+                pass
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=_setting('STREAM_QUEUE_SIZE', 100))
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.add(queue)
+            if self._ticker is None or self._ticker.done():
+                self._ticker = self._loop.create_task(self._watch_leaderboard())
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    async def _watch_leaderboard(self):
+        interval = _setting('STREAM_LEADERBOARD_INTERVAL', 2)
+        while self._subscribers:
+            await asyncio.sleep(interval)
+            if not self._leaderboard_dirty:
+                continue
+            self._leaderboard_dirty = False
+            rows = await sync_to_async(get_leaderboard)()
+            if rows != self.leaderboard:
+                self.leaderboard = rows
+                self._fan_out('leaderboard', rows)
+
+
+class LocalBackend:
+    """Delivers events to subscribers of the current process only."""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, event, data):
+        self.hub.dispatch(event, data)
+
+
+class RedisBackend:
+    """
+    Relays events through a Redis pub/sub channel so every process (and
+    host) sees every like. Requires the ``redis`` package and ``REDIS_URL``.
+    The listener thread resubscribes with a growing delay whenever the
+    connection drops; events published meanwhile are lost.
+    """
+    channel = 'playtopulse:stream'
+
+    def __init__(self, hub):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('RedisBackend requires the "redis" package.')
+        url = _setting('REDIS_URL', None)
+        if not url:
+            raise ImproperlyConfigured('RedisBackend requires the REDIS_URL setting.')
+        self.hub = hub
+        self.client = redis.Redis.from_url(url)
+        self._listener = threading.Thread(target=self._listen, name='stream-redis', daemon=True)
+        self._listener.start()
+
+    def publish(self, event, data):
+        self.client.publish(self.channel, json.dumps({'event': event, 'data': data}))
+
+    def _listen(self):
+        delay = 0
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                if delay:
+                    logger.info('Resubscribed to %s', self.channel)
+                    # Leaderboard changes may have been missed while away
+                    self.hub.dispatch(LEADERBOARD_DIRTY, None)
+                delay = 0
+                for message in pubsub.listen():
+                    self._relay(message)
+            except Exception as exc:
+                delay = min(max(delay * 2, 0.5), MAX_RECONNECT_DELAY)
+                logger.warning('Stream relay lost Redis, retrying in %.1fs: %r', delay, exc)
+            finally:
+                pubsub.close()
+            time.sleep(delay)
+
+    def _relay(self, message):
+        try:
+            payload = json.loads(message['data'])
+            self.hub.dispatch(payload['event'], payload['data'])
+        except (ValueError, KeyError, TypeError):
+            logger.warning('Ignoring malformed stream message %r', message)
+
+
+hub = Hub()
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_class = import_string(
+                    _setting('STREAM_BACKEND', 'api.stream.LocalBackend')
+                )
+                _backend = backend_class(hub)
+    return _backend
+
+
+def publish(event, data=None):
+    """
+    Publish an event to every stream subscriber. Call after commit.
+
+    Never raises: the write it reports has already committed.
+    """
+    try:
+        get_backend().publish(event, data)
+    except Exception:
+        logger.exception('Could not publish %s event', event)
+
+
+def publish_likes(likes):
+    """Publish like count deltas, one event per liked post or comment."""
+    deltas = Counter(
+        ('post', like.post_id) if like.post_id else ('comment', like.comment_id)
+        for like in likes
+    )
+    for (kind, pk), delta in deltas.items():
+        publish(f'{kind}.like', {kind: pk, 'delta': delta})
+    publish(LEADERBOARD_DIRTY)
+
+
+def publish_comment(comment):
+    publish('post.comment', {
+        'post': comment.post_id,
+        'comment': comment.id,
+        'parent': comment.parent_id,
+        'delta': 1,
+    })
+
+
+async def _event_stream():
+    # Make sure events from other processes reach this hub
+    await sync_to_async(get_backend)()
+    queue = hub.subscribe()
+    try:
+        # EventSource reconnects after `retry` ms once the stream ends
+        yield 'retry: 3000\n\n'
+        # Initial snapshot comes from the (cached) leaderboard
+        yield format_event('leaderboard', await sync_to_async(get_leaderboard)())
+
+        loop = asyncio.get_running_loop()
+        # Django 4.2 does not notice client disconnects while streaming, so
+        # streams are recycled periodically instead of living forever.
+        deadline = loop.time() + _setting('STREAM_MAX_SECONDS', 300)
+        keepalive = _setting('STREAM_KEEPALIVE_SECONDS', 15)
+        while loop.time() < deadline:
+            try:
+                yield await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+    finally:
+        hub.unsubscribe(queue)
+
+
+async def stream_view(request):
+    """``GET /api/stream/``: Server-Sent Events feed of live updates."""
+    if not isinstance(request, ASGIRequest):
+        # WSGI (runserver, gunicorn sync workers) buffers an async stream
+        # until it ends, so the client would see nothing for minutes
+        return JsonResponse(
+            {'error': 'Live updates need an ASGI server; poll /api/leaderboard/ instead.'},
+            status=503,
+        )
+    response = StreamingHttpResponse(_event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Disable proxy buffering (nginx) so events are delivered immediately
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,53 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.karma import user_karma
+from api.models import Comment, Like, Post
+from api.thread_cache import local_cache
+
+
+def signed_in_client(user):
+    """A client authenticated the way the frontend is, with a JWT header."""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache().clear()
+        self.author = User.objects.create_user('author', password='pass12345')
+        self.reader = User.objects.create_user('reader', password='pass12345')
+        self.client = signed_in_client(self.reader)
+
+    def make_thread(self, replies=2, content='post'):
+        """A post with one root comment per reply, each with one nested reply."""
+        post = Post.objects.create(author=self.author, content=content)
+        for _ in range(replies):
+            root = Comment.objects.create(post=post, author=self.author, content='root')
+            Comment.objects.create(post=post, author=self.reader, parent=root, content='reply')
+        return post
+
+    def count_queries(self, url, client=None):
+        # Start from cold caches so every read does its full work
+        cache.clear()
+        local_cache().clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = (client or self.client).get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries.captured_queries)
+
+    def assertLikesConsistent(self, post, comment):
+        """like_count and karma agree with the stored likes of a thread by ``author``."""
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual(post.like_count, Like.objects.filter(post=post).count())
+        self.assertEqual(comment.like_count, Like.objects.filter(comment=comment).count())
+        # Likes on the post earn 5 karma, likes on the comment 1
+        self.assertEqual(user_karma(self.author.pk), 5 * post.like_count + comment.like_count)
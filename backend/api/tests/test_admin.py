@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from api.admin import EstimatedCountPaginator
+from api.models import Comment, Like, Post
+
+from .base import APITestCase
+
+
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class AdminTests(APITestCase):
+    """Admin pages cost the same however large the tables grow."""
+
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client.force_login(admin)
+
+    def grow(self, n):
+        for post in [self.make_thread(replies=1) for _ in range(n)]:
+            Like.objects.create(user=self.reader, post=post)
+            Like.objects.create(user=self.author, comment=post.comments.first())
+
+    def test_changelists(self):
+        urls = ['/admin/api/post/', '/admin/api/comment/', '/admin/api/like/']
+
+        def changelist_counts():
+            return [self.count_queries(url, self.client) for url in urls]
+
+        self.grow(3)
+        before = changelist_counts()
+        self.grow(30)
+        self.assertEqual(changelist_counts(), before)
+
+    def test_change_forms(self):
+        def change_form_counts():
+            urls = [
+                f'/admin/api/comment/{Comment.objects.last().pk}/change/',
+                f'/admin/api/like/{Like.objects.last().pk}/change/',
+            ]
+            return [self.count_queries(url, self.client) for url in urls]
+
+        self.grow(1)
+        # Warm Django's in-process content type cache
+        change_form_counts()
+        before = change_form_counts()
+        # Posts and comments are raw ids, never listed as choices
+        self.grow(20)
+        self.assertEqual(change_form_counts(), before)
+
+    @override_settings(ADMIN_COUNT_LIMIT=5)
+    def test_counts_stop_at_the_limit(self):
+        for n in range(8):
+            Post.objects.create(author=self.author, content=f'post {n}')
+        self.assertEqual(EstimatedCountPaginator(Post.objects.order_by('pk'), 2).count, 5)
+        self.assertEqual(EstimatedCountPaginator(Post.objects.filter(pk__lte=3), 2).count, 3)
+        response = self.client.get('/admin/api/post/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '5 posts')
+
+    def test_like_search_is_exact(self):
+        self.grow(2)
+        response = self.client.get('/admin/api/like/', {'q': 'read'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+        response = self.client.get('/admin/api/like/', {'q': 'reader'})
+        self.assertEqual(response.context['cl'].result_count, 2)
@@ -0,0 +1,31 @@
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Post
+
+from .base import APITestCase
+
+
+class ASGIReadTests(APITestCase):
+    """Under ASGI the DRF views answer reads exactly as they do under WSGI."""
+
+    async def test_same_responses(self):
+        post = await sync_to_async(self.make_thread)()
+        await sync_to_async(Post.objects.bulk_create)(
+            [Post(author=self.author, content=f'post {i}') for i in range(25)]
+        )
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.reader)}'}
+        for url in (
+            '/api/posts/', f'/api/posts/{post.pk}/', f'/api/posts/{post.pk}/comments/',
+            '/api/leaderboard/', '/api/posts/0/',
+        ):
+            expected = await sync_to_async(self.client.get)(url)
+            response = await AsyncClient().get(url, headers=headers)
+            self.assertEqual(response.status_code, expected.status_code, url)
+            self.assertEqual(response.content, expected.content, url)
+            self.assertEqual(response.get('ETag'), expected.get('ETag'), url)
+
+            if response.status_code == 200:
+                revalidated = await AsyncClient().get(url, headers={**headers, 'If-None-Match': response['ETag']})
+                self.assertEqual(revalidated.status_code, 304, url)
@@ -0,0 +1,50 @@
+from django.core.cache import cache
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.authentication import CachedJWTAuthentication, user_cache_key
+
+from .base import APITestCase
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    """JWT users are resolved from the cache and dropped from it when saved."""
+
+    def authenticate(self, user):
+        request = APIRequestFactory().get(
+            '/api/posts/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+        )
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_cache_hit_runs_no_query(self):
+        with self.assertNumQueries(1):
+            self.authenticate(self.reader)
+        with self.assertNumQueries(0):
+            user = self.authenticate(self.reader)
+        self.assertEqual(
+            (user.pk, user.username, user.is_active, user.is_staff), (self.reader.pk, 'reader', True, False)
+        )
+        # Only the listed fields are cached; the rest load on first use
+        self.assertNotIn('password', cache.get(user_cache_key(self.reader.pk)))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.date_joined, self.reader.date_joined)
+
+    def test_staff_flag_survives_the_cache(self):
+        self.author.is_staff = True
+        self.author.save()
+        for _ in range(2):
+            self.assertTrue(self.authenticate(self.author).is_staff)
+            self.assertFalse(self.authenticate(self.reader).is_staff)
+
+    def test_save_invalidates(self):
+        self.authenticate(self.reader)
+        self.reader.is_active = False
+        self.reader.save()
+        self.assertIsNone(cache.get(user_cache_key(self.reader.pk)))
+        self.assertEqual(self.client.get('/api/posts/').status_code, 401)
+
+    def test_inactive_cached_user_is_rejected(self):
+        self.authenticate(self.reader)
+        record = cache.get(user_cache_key(self.reader.pk))
+        cache.set(user_cache_key(self.reader.pk), {**record, 'is_active': False})
+        self.assertEqual(self.client.get('/api/posts/').status_code, 401)
@@ -0,0 +1,42 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+
+from api.management.commands.benchmark import Command, percentile
+
+
+class PercentileTests(SimpleTestCase):
+    def test_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 95), 95)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertEqual(percentile([3, 1, 2], 0), 1)
+
+
+class BenchmarkTests(TestCase):
+    """manage.py benchmark reports every endpoint against a seeded dataset."""
+
+    def test_rejects_bad_options(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark', sizes='10,x', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('benchmark', requests=0, stdout=StringIO())
+
+    def test_dataset_results(self):
+        # run_dataset is what handle() runs inside its own test database
+        command = Command(stdout=StringIO())
+        options = {'requests': 3, 'comments_per_post': 4, 'likes_per_post': 3, 'seed': 1, 'cold': True}
+        results = command.run_dataset(10, options)
+
+        self.assertEqual(
+            [result['endpoint'] for result in results],
+            ['post_list', 'post_detail', 'comment_list', 'like_create', 'leaderboard'],
+        )
+        for result in results:
+            self.assertEqual(result['dataset']['posts'], 10)
+            self.assertEqual(sum(result['statuses'].values()), 3)
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+            self.assertGreater(result['queries_p50'], 0)
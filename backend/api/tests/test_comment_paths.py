@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api import comment_tree
+from api.comment_tree import load_reply_trees
+from api.models import Comment, Post
+
+from .base import APITestCase
+
+
+class CommentPathTests(APITestCase):
+    """Comment.path follows moves and deletes take whole subtrees."""
+
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.create(author=self.author, content='post')
+        self.a = Comment.objects.create(post=self.post, author=self.author, content='a')
+        self.b = Comment.objects.create(post=self.post, author=self.author, content='b')
+        self.child = Comment.objects.create(post=self.post, author=self.author, parent=self.a, content='child')
+        self.grandchild = Comment.objects.create(
+            post=self.post, author=self.author, parent=self.child, content='grandchild'
+        )
+
+    def assertPathsMatchParents(self):
+        for comment in Comment.objects.all():
+            parent_path = comment.parent.path if comment.parent_id else ''
+            self.assertEqual(comment.path, parent_path + Comment.path_segment(comment.pk))
+
+    def test_move_rewrites_subtree(self):
+        self.child.parent = self.b
+        self.child.save()
+        self.assertPathsMatchParents()
+        self.assertEqual(list(self.b.subtree()), [self.b, self.child, self.grandchild])
+        self.assertEqual(list(self.a.subtree()), [self.a])
+
+    def test_move_to_root(self):
+        self.child.parent = None
+        self.child.save()
+        self.assertPathsMatchParents()
+        self.assertEqual(list(self.child.subtree()), [self.child, self.grandchild])
+
+    def test_delete_removes_subtree(self):
+        self.a.delete()
+        self.assertEqual(list(Comment.objects.order_by('pk')), [self.b])
+        self.assertPathsMatchParents()
+
+    def test_subtree_query_uses_the_path_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            list(self.a.subtree())
+        sql = queries.captured_queries[0]['sql']
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                self.assertIn('comment_path_idx', ' '.join(str(row) for row in cursor.fetchall()))
+
+
+class ReplyTreeTests(APITestCase):
+    """load_reply_trees and the comment list with many top-level comments."""
+
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.create(author=self.author, content='post')
+
+    def add_roots(self, n):
+        roots = []
+        for i in range(n):
+            root = Comment.objects.create(post=self.post, author=self.author, content=f'root {i}')
+            Comment.objects.create(post=self.post, author=self.reader, parent=root, content='reply')
+            roots.append(root)
+        return roots
+
+    def test_subtrees_split_across_queries(self):
+        roots = self.add_roots(5)
+        with mock.patch.object(comment_tree, 'SUBTREES_PER_QUERY', 2), self.assertNumQueries(3):
+            load_reply_trees(roots)
+        self.assertEqual([len(root.replies.all()) for root in roots], [1] * 5)
+
+    def test_more_roots_than_sqlite_expression_depth(self):
+        # One OR per subtree failed on SQLite from about 1000 roots
+        roots = self.add_roots(1100)
+        load_reply_trees([Comment.objects.get(pk=root.pk) for root in roots])
+
+    def test_comment_list_is_paginated(self):
+        self.add_roots(25)
+        response = self.client.get('/api/comments/')
+        self.assertEqual(response.status_code, 200)
+        ids, page = [], response.json()
+        while True:
+            self.assertLessEqual(len(page['results']), 20)
+            ids += [comment['id'] for comment in page['results']]
+            if not page['next']:
+                break
+            page = self.client.get(page['next']).json()
+        self.assertEqual(ids, sorted(Comment.objects.values_list('id', flat=True), reverse=True))
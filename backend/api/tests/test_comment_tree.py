@@ -0,0 +1,38 @@
+from rest_framework.test import APIClient
+
+from .base import APITestCase
+
+
+class CommentTreeQueryTests(APITestCase):
+    """Reads cost the same number of queries however many comments they return."""
+
+    def test_feed(self):
+        for _ in range(3):
+            self.make_thread()
+        before = self.count_queries('/api/posts/')
+        for _ in range(10):
+            self.make_thread(replies=4)
+        self.assertEqual(self.count_queries('/api/posts/'), before)
+
+    def test_thread_and_comments(self):
+        small, large = self.make_thread(replies=1), self.make_thread(replies=20)
+        for path in ('/api/posts/{}/', '/api/posts/{}/comments/'):
+            with self.subTest(path=path):
+                self.assertEqual(
+                    self.count_queries(path.format(large.pk)),
+                    self.count_queries(path.format(small.pk)),
+                )
+
+    def test_deep_thread(self):
+        post = self.make_thread(replies=1)
+        parent = post.comments.first()
+        shallow = self.count_queries(f'/api/posts/{post.pk}/')
+        for depth in range(8):
+            parent = post.comments.create(author=self.author, parent=parent, content=f'depth {depth}')
+        self.assertEqual(self.count_queries(f'/api/posts/{post.pk}/'), shallow)
+
+    def test_thread_queries(self):
+        post = self.make_thread(replies=5)
+        # The post, its page of top-level comments and their replies; a
+        # signed-in reader adds their likes
+        self.assertEqual(self.count_queries(f'/api/posts/{post.pk}/', APIClient()), 3)
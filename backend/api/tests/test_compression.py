@@ -0,0 +1,62 @@
+import gzip
+from unittest import skipIf
+
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api.middleware import accepted_encodings, brotli
+
+from .base import APITestCase, signed_in_client
+
+
+@override_settings(COMPRESSION_MIN_BYTES=200)
+class CompressionTests(APITestCase):
+    """Large JSON reads are compressed in the coding the client prefers."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = f'/api/posts/{self.make_thread(replies=5).pk}/'
+        self.body = self.client.get(self.url).content
+
+    def get(self, encoding, url=None, **headers):
+        return self.client.get(url or self.url, HTTP_ACCEPT_ENCODING=encoding, **headers)
+
+    def test_gzip(self):
+        response = self.get('gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        # Weak, and still good for a 304
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertEqual(self.get('gzip', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    @skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli_when_preferred(self):
+        response = self.get('gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), self.body)
+        self.assertEqual(self.get('gzip, br;q=0.5')['Content-Encoding'], 'gzip')
+
+    def test_identity(self):
+        for encoding in ('', 'identity', 'gzip;q=0'):
+            with self.subTest(encoding=encoding):
+                response = self.get(encoding)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response.content, self.body)
+
+    def test_small_and_write_responses_pass_through(self):
+        self.assertFalse(self.get('gzip', '/api/posts/0/').has_header('Content-Encoding'))
+        client = signed_in_client(self.reader)
+        response = client.post(
+            '/api/posts/', {'content': 'x' * 500}, format='json', HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            accepted_encodings('gzip;q=0.8, BR, *;q=0, deflate;q=bad'),
+            {'gzip': 0.8, 'br': 1.0, '*': 0.0, 'deflate': 0.0},
+        )
@@ -0,0 +1,49 @@
+from .base import APITestCase, signed_in_client
+
+
+class ConditionalGetTests(APITestCase):
+    """A write changes the ETag of every read it affects."""
+
+    def get(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_comment_invalidates_thread_and_feed(self):
+        post = self.make_thread()
+        urls = ['/api/posts/', f'/api/posts/{post.pk}/', f'/api/posts/{post.pk}/comments/']
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        for url in urls:
+            self.assertEqual(self.get(url, etags[url]).status_code, 304, url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/comments/', {'post': post.pk, 'content': 'new'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        for url in urls:
+            response = self.get(url, etags[url])
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(self.get(url, response['ETag']).status_code, 304, url)
+        self.assertIn(b'"new"', self.client.get(f'/api/posts/{post.pk}/').content)
+
+    def test_like_invalidates_thread_only_for_its_post(self):
+        liked, other = self.make_thread(), self.make_thread()
+        etags = {post.pk: self.client.get(f'/api/posts/{post.pk}/')['ETag'] for post in (liked, other)}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/likes/', {'post': liked.pk}, format='json')
+        self.assertEqual(self.get(f'/api/posts/{liked.pk}/', etags[liked.pk]).status_code, 200)
+        self.assertEqual(self.get(f'/api/posts/{other.pk}/', etags[other.pk]).status_code, 304)
+
+    def test_etag_is_per_user(self):
+        post = self.make_thread()
+        etag = self.client.get(f'/api/posts/{post.pk}/')['ETag']
+        other = signed_in_client(self.author)
+        self.assertEqual(other.get(f'/api/posts/{post.pk}/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_leaderboard_changes_with_karma(self):
+        post = self.make_thread()
+        etag = self.client.get('/api/leaderboard/')['ETag']
+        self.assertEqual(self.get('/api/leaderboard/', etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/likes/', {'post': post.pk}, format='json')
+        response = self.get('/api/leaderboard/', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['username'], 'author')
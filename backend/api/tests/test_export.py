@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+import warnings
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import AsyncClient, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.export import export_rows
+from api.models import Comment, Like, Post
+
+from .base import APITestCase, signed_in_client
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = User.objects.create_user('staff', password='pass12345', is_staff=True)
+        self.posts = [Post.objects.create(author=self.author, content=f'post {i} ü') for i in range(5)]
+        root = Comment.objects.create(post=self.posts[0], author=self.author, content='root')
+        Comment.objects.create(post=self.posts[0], author=self.reader, parent=root, content='reply')
+        Like.objects.create(user=self.reader, post=self.posts[1])
+        # Settled rows; anything newer than EXPORT_SETTLE_SECONDS waits for the next export
+        self.settled = timezone.now() - timedelta(hours=1)
+        for model in (Post, Comment, Like):
+            model.objects.update(created_at=self.settled)
+        self.fresh = Post.objects.create(author=self.author, content='fresh')
+
+    def export(self, client=None, **params):
+        response = (client or signed_in_client(self.staff)).get('/api/export/', params)
+        if response.status_code != 200:
+            return response, None
+        return response, [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_staff_only(self):
+        self.assertEqual(self.export(signed_in_client(self.reader), type='posts')[0].status_code, 403)
+        self.assertEqual(self.export(type='users')[0].status_code, 400)
+        self.assertEqual(self.export(type='posts', after_id='x')[0].status_code, 400)
+        self.assertEqual(self.export(type='posts', since='yesterday')[0].status_code, 400)
+
+    def test_rows(self):
+        response, rows = self.export(type='posts')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([row['id'] for row in rows], [post.pk for post in self.posts])
+        self.assertEqual(rows[0]['author_username'], 'author')
+        self.assertEqual(len(self.export(type='comments')[1]), 2)
+        self.assertEqual(len(self.export(type='likes')[1]), 1)
+
+    def test_after_id(self):
+        rows = self.export(type='posts', after_id=self.posts[2].pk)[1]
+        self.assertEqual([row['id'] for row in rows], [post.pk for post in self.posts[3:]])
+
+    def test_since_keeps_ties(self):
+        # Every row shares the watermark's timestamp; the id decides
+        rows = self.export(type='posts', since=self.settled.isoformat(), after_id=self.posts[1].pk)[1]
+        self.assertEqual([row['id'] for row in rows], [post.pk for post in self.posts[2:]])
+        self.assertEqual(len(self.export(type='posts', since=self.settled.isoformat())[1]), 5)
+        self.assertEqual(len(list(export_rows('posts', since=self.settled + timedelta(seconds=1)))), 0)
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    async def test_streams_chunks_under_asgi(self):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.staff)}'}
+        with warnings.catch_warnings():
+            # Django warns, then buffers, when ASGI gets a synchronous iterator
+            warnings.filterwarnings('error', message='StreamingHttpResponse must consume')
+            response = await AsyncClient().get('/api/export/', {'type': 'posts'}, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual([chunk.count(b'\n') for chunk in chunks], [2, 2, 1])
+
+
+class ExportCommandTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.at = timezone.now() - timedelta(hours=1)
+        self.output = tempfile.mkdtemp()
+        self.state = os.path.join(self.output, 'state.json')
+
+    def run_export(self, *args):
+        call_command(
+            'export_ndjson', 'posts', '--output-dir', self.output, '--state', self.state, *args,
+            stdout=StringIO(),
+        )
+        with open(os.path.join(self.output, 'posts.ndjson')) as lines:
+            return [json.loads(line)['id'] for line in lines]
+
+    def create_posts(self, n):
+        posts = [Post.objects.create(author=self.author, content='post') for _ in range(n)]
+        Post.objects.filter(pk__in=[post.pk for post in posts]).update(created_at=self.at)
+        return [post.pk for post in posts]
+
+    def test_id_state(self):
+        first = self.create_posts(2)
+        self.assertEqual(self.run_export(), first)
+        second = self.create_posts(1)
+        self.assertEqual(self.run_export(), first + second)
+        self.assertEqual(self.run_export(), first + second)
+
+    def test_since_state_keeps_ties(self):
+        first = self.create_posts(2)
+        self.assertEqual(self.run_export('--since', self.at.isoformat()), first)
+        # Created later with the same timestamp as the watermark
+        second = self.create_posts(2)
+        self.assertEqual(self.run_export('--since', self.at.isoformat()), first + second)
+        with self.assertRaises(CommandError):
+            self.run_export()
@@ -0,0 +1,26 @@
+import runpy
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+REDIS = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://'}}
+
+
+class WorkerGuardTests(SimpleTestCase):
+    """gunicorn.conf.py refuses several workers over a per-process cache."""
+
+    def start(self, workers):
+        config = runpy.run_path(str(settings.BASE_DIR / 'gunicorn.conf.py'))
+        config['on_starting'](SimpleNamespace(cfg=SimpleNamespace(workers=workers)))
+
+    @override_settings(CACHES=LOCMEM)
+    def test_local_memory_cache(self):
+        self.start(1)
+        with self.assertRaisesMessage(SystemExit, '2 workers need a cache shared by all of them'):
+            self.start(2)
+
+    @override_settings(CACHES=REDIS)
+    def test_shared_cache(self):
+        self.start(4)
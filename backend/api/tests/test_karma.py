@@ -0,0 +1,65 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.karma import bucket_hour, record_karma, top_users, user_karma
+from api.models import KarmaBucket, Like
+
+from .base import APITestCase
+
+
+class KarmaBucketTests(APITestCase):
+    """Likes are credited to hourly buckets and the leaderboard sums the last 24."""
+
+    def test_likes_fill_the_current_bucket(self):
+        post = self.make_thread(replies=1)
+        comment = post.comments.filter(author=self.author).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/likes/', {'post': post.pk}, format='json')
+            self.client.post('/api/likes/', {'comment': comment.pk}, format='json')
+        [bucket] = KarmaBucket.objects.all()
+        self.assertEqual((bucket.user, bucket.karma), (self.author, 6))
+        self.assertEqual(bucket.hour, bucket_hour(timezone.now()))
+
+    def test_window_is_the_last_24_buckets(self):
+        now = timezone.now()
+        record_karma(self.author.pk, 5, at=now - timedelta(hours=23))
+        record_karma(self.author.pk, 1, at=now)
+        record_karma(self.reader.pk, 100, at=now - timedelta(hours=24))
+        self.assertEqual(user_karma(self.author.pk), 6)
+        self.assertEqual(user_karma(self.reader.pk), 0)
+        self.assertEqual([row['user_id'] for row in top_users()], [self.author.pk])
+
+    def test_leaderboard_ranks(self):
+        third = User.objects.create_user('third', password='pass12345')
+        for user, points in ((self.author, 10), (third, 10), (self.reader, 3)):
+            record_karma(user.pk, points)
+        data = self.client.get('/api/leaderboard/').json()
+        # Ties share the rank of the first of them
+        self.assertEqual(
+            [(row['username'], row['karma'], row['rank']) for row in data['results']],
+            [('author', 10, 1), ('third', 10, 1), ('reader', 3, 3)],
+        )
+        self.assertEqual(data['me'], {'username': 'reader', 'rank': 3, 'karma': 3})
+
+    def test_backfill_rebuilds_buckets_from_likes(self):
+        post = self.make_thread(replies=1)
+        comment = post.comments.filter(author=self.author).first()
+        Like.objects.create(user=self.reader, post=post)
+        old = Like.objects.create(user=self.reader, comment=comment)
+        Like.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(hours=30))
+        KarmaBucket.objects.create(user=self.reader, hour=bucket_hour(timezone.now()), karma=99)
+
+        call_command('backfill_karma', stdout=StringIO())
+        self.assertEqual(
+            sorted(KarmaBucket.objects.values_list('user__username', 'karma')),
+            [('author', 1), ('author', 5)],
+        )
+        self.assertEqual(user_karma(self.author.pk), 5)
+
+        # --hours leaves older buckets alone
+        call_command('backfill_karma', '--hours', '2', stdout=StringIO())
+        self.assertEqual(KarmaBucket.objects.count(), 2)
@@ -0,0 +1,99 @@
+from unittest import mock
+
+from rest_framework.test import APIClient
+
+from api import comment_tree
+from api.models import Comment, Post
+
+from .base import APITestCase
+
+
+class LazyReplyTests(APITestCase):
+    """Threads are serialized to a depth and width limit and read a page at a time."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.post = Post.objects.create(author=self.author, content='post')
+
+    def comment(self, parent=None, likes=0):
+        return Comment.objects.create(
+            post=self.post, author=self.author, parent=parent, content='c', like_count=likes
+        )
+
+    def chain(self, root, length):
+        node = root
+        for _ in range(length):
+            node = self.comment(node)
+        return node
+
+    def test_depth_limit_and_cursor(self):
+        root = self.comment()
+        self.chain(root, 5)
+        data = self.client.get(f'/api/posts/{self.post.pk}/', {'depth': 2}).json()
+        [first] = data['comments']
+        [second] = first['replies']
+        # Cut off below the second level: the cursor continues from there
+        self.assertEqual(second['replies'], [])
+        self.assertIsNotNone(second['more_replies'])
+
+        replies = self.client.get(
+            f"/api/comments/{second['id']}/replies/", {'cursor': second['more_replies'], 'depth': 2}
+        ).json()
+        [third] = replies['results']
+        self.assertEqual(len(third['replies']), 1)
+        self.assertIsNotNone(third['replies'][0]['more_replies'])
+
+    def test_leaf_at_depth_limit_has_no_cursor(self):
+        self.chain(self.comment(), 1)
+        [root] = self.client.get(f'/api/posts/{self.post.pk}/', {'depth': 2}).json()['comments']
+        self.assertIsNone(root['replies'][0]['more_replies'])
+
+    def test_replies_per_node(self):
+        root = self.comment()
+        replies = [self.comment(root, likes=n) for n in range(5)]
+        [data] = self.client.get(
+            f'/api/posts/{self.post.pk}/', {'replies': 2, 'sort': 'top'}
+        ).json()['comments']
+        self.assertEqual([reply['id'] for reply in data['replies']], [replies[4].pk, replies[3].pk])
+        rest = self.client.get(
+            f'/api/comments/{root.pk}/replies/', {'cursor': data['more_replies'], 'replies': 2}
+        ).json()
+        self.assertEqual([reply['id'] for reply in rest['results']], [replies[2].pk, replies[1].pk])
+
+    def test_pages_match_the_in_memory_tree(self):
+        for n in range(7):
+            root = self.comment(likes=n % 3)
+            self.chain(root, n % 4)
+        for sort in ('old', 'new', 'top'):
+            with self.subTest(sort=sort):
+                params = {'replies': 3, 'depth': 2, 'sort': sort}
+                ids, cursor = [], None
+                while True:
+                    page = self.client.get(
+                        f'/api/posts/{self.post.pk}/comments/',
+                        {**params, 'cursor': cursor} if cursor else params,
+                    ).json()
+                    ids += [comment['id'] for comment in page['results']]
+                    cursor = page['more_comments']
+                    if cursor is None:
+                        break
+                roots = Comment.objects.filter(post=self.post, parent=None)
+                expected = comment_tree.sort_comments(roots, sort)
+                self.assertEqual(ids, [comment.pk for comment in expected])
+
+                # The expanded feed pages the whole tree in memory the same way
+                feed = self.client.get('/api/posts/', {**params, 'expand': 'comments'}).json()
+                thread = self.client.get(f'/api/posts/{self.post.pk}/', params).json()
+                self.assertEqual(feed['results'][0]['comments'], thread['comments'])
+
+    def test_page_reads_only_its_own_comments(self):
+        roots = [self.comment() for _ in range(30)]
+        for root in roots:
+            self.chain(root, 6)
+        with mock.patch.object(comment_tree, 'link_comments', wraps=comment_tree.link_comments) as link:
+            data = self.client.get(f'/api/posts/{self.post.pk}/comments/', {'replies': 10, 'depth': 3}).json()
+        self.assertEqual(len(data['results']), 10)
+        # Ten roots, each with the three levels below it that are shown or cut off
+        [(linked,), _] = link.call_args
+        self.assertEqual(len(list(linked)), 10 * 4)
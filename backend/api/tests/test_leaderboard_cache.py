@@ -0,0 +1,59 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from api import leaderboard
+from api.karma import record_karma
+
+from .base import APITestCase
+
+
+class LeaderboardCacheTests(APITestCase):
+    """The leaderboard is cached, marked stale by likes and rebuilt by one request."""
+
+    def setUp(self):
+        super().setUp()
+        record_karma(self.author.pk, 5)
+        self.compute = mock.patch.object(
+            leaderboard, 'compute_leaderboard', wraps=leaderboard.compute_leaderboard
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_served_from_cache(self):
+        first = leaderboard.get_leaderboard()
+        self.assertEqual(leaderboard.get_leaderboard(), first)
+        self.assertEqual(leaderboard.get_leaderboard(limit=1), first[:1])
+        self.assertEqual(self.compute.call_count, 1)
+
+    @override_settings(LEADERBOARD_CACHE_TTL=0)
+    def test_expired_entry_is_rebuilt(self):
+        leaderboard.get_leaderboard()
+        leaderboard.get_leaderboard()
+        self.assertEqual(self.compute.call_count, 2)
+
+    def test_likes_invalidate(self):
+        post = self.make_thread(replies=0)
+        self.assertEqual(leaderboard.get_leaderboard()[0]['karma'], 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/likes/', {'post': post.pk}, format='json')
+        self.assertEqual(leaderboard.get_leaderboard()[0]['karma'], 10)
+        self.assertEqual(self.compute.call_count, 2)
+
+    def test_stale_rows_served_during_rebuild(self):
+        stale = leaderboard.get_leaderboard()
+        record_karma(self.author.pk, 5)
+        leaderboard.invalidate_leaderboard()
+        # Another request holds the rebuild lock
+        cache.add(leaderboard.LOCK_KEY, 1)
+        self.assertEqual(leaderboard.get_leaderboard(), stale)
+        self.assertEqual(self.compute.call_count, 1)
+
+        cache.delete(leaderboard.LOCK_KEY)
+        self.assertEqual(leaderboard.get_leaderboard()[0]['karma'], 10)
+
+    def test_unchanged_rebuild_keeps_the_stamp(self):
+        stamp = leaderboard.get_leaderboard_entry()['changed_at']
+        leaderboard.invalidate_leaderboard()
+        self.assertEqual(leaderboard.get_leaderboard_entry()['changed_at'], stamp)
+        self.assertEqual(self.compute.call_count, 2)
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api import leaderboard
+from api.karma import record_karma
+
+from .base import APITestCase, signed_in_client
+
+
+@override_settings(LEADERBOARD_MAX_LIMIT=3)
+class LeaderboardRankTests(APITestCase):
+    """Callers get their own rank, from the cached rows or one count beyond them."""
+
+    def setUp(self):
+        super().setUp()
+        self.users = [User.objects.create(username=f'user{n}') for n in range(5)]
+        # user0 and user1 tie at the top; user4 has no karma
+        for user, points in zip(self.users, (9, 9, 7, 5)):
+            record_karma(user.pk, points)
+
+    def me(self, user):
+        return signed_in_client(user).get('/api/leaderboard/').json()['me']
+
+    def test_rank_outside_the_cached_rows(self):
+        self.assertEqual(self.me(self.users[3]), {'username': 'user3', 'rank': 4, 'karma': 5})
+        record_karma(self.reader.pk, 8)
+        leaderboard.invalidate_leaderboard()
+        self.assertEqual(self.me(self.reader)['rank'], 3)
+        self.assertEqual(self.me(self.users[3])['rank'], 5)
+
+    def test_rank_in_the_cached_rows_is_free(self):
+        client = signed_in_client(self.users[1])
+        client.get('/api/leaderboard/')
+        with mock.patch.object(leaderboard, 'users_ahead') as users_ahead:
+            # Only the JWT user is looked up, and it is cached too
+            with self.assertNumQueries(0):
+                me = client.get('/api/leaderboard/', {'limit': 1}).json()['me']
+        users_ahead.assert_not_called()
+        self.assertEqual(me, {'username': 'user1', 'rank': 1, 'karma': 9})
+
+    def test_no_karma(self):
+        self.assertEqual(self.me(self.users[4]), {'username': 'user4', 'rank': None, 'karma': 0})
+        anonymous = APIClient().get('/api/leaderboard/').json()
+        self.assertIsNone(anonymous['me'])
+
+    def test_limit(self):
+        def usernames(**params):
+            return [row['username'] for row in self.client.get('/api/leaderboard/', params).json()['results']]
+
+        self.assertEqual(usernames(limit=2), ['user0', 'user1'])
+        # Capped at LEADERBOARD_MAX_LIMIT; bad values fall back to the default
+        self.assertEqual(usernames(limit=50), ['user0', 'user1', 'user2'])
+        self.assertEqual(usernames(limit=0), ['user0'])
+        self.assertEqual(usernames(limit='x'), ['user0', 'user1', 'user2'])
+
+    def test_validator_never_computes_rank(self):
+        client = signed_in_client(self.users[3])
+        etag = client.get('/api/leaderboard/')['ETag']
+        with mock.patch.object(leaderboard, 'compute_user_rank') as compute:
+            self.assertEqual(client.get('/api/leaderboard/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        compute.assert_not_called()
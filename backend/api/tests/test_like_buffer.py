@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, OperationalError
+
+from api import like_buffer
+from api.like_buffer import DEAD_LETTER_NAME, LikeBuffer
+
+from .base import APITestCase
+
+
+def spool_lines(path):
+    return [json.loads(line) for line in Path(path).read_text().splitlines()]
+
+
+class LikeBufferTests(APITestCase):
+    """Write-behind likes: retries, dead letters and replays."""
+
+    def setUp(self):
+        super().setUp()
+        self.post = self.make_thread(replies=1)
+        self.comment = self.post.comments.first()
+        self.spool_dir = tempfile.mkdtemp()
+
+    def make_buffer(self, **options):
+        # The flush thread stays idle; the tests flush from their own thread
+        options = {'max_size': 1000, 'flush_interval': 3600, 'max_attempts': 2, **options}
+        buffer = LikeBuffer(spool_dir=self.spool_dir, **options)
+        self.addCleanup(buffer.close)
+        return buffer
+
+    def write_spool(self, name, intents):
+        Path(self.spool_dir, name).write_text(''.join(json.dumps(intent) + '\n' for intent in intents))
+
+    def test_replayed_likes(self):
+        self.client.post('/api/likes/', {'post': self.post.pk}, format='json')
+        # Left behind by a worker that exited before flushing: one like that
+        # already exists, a duplicate and two new likes
+        self.write_spool('likes-99999-0123456789ab.jsonl', [
+            [self.reader.pk, 'post', self.post.pk],
+            [self.author.pk, 'post', self.post.pk],
+            [self.author.pk, 'post', self.post.pk],
+            [self.reader.pk, 'comment', self.comment.pk],
+        ])
+        call_command('replay_like_spool', '--spool-dir', self.spool_dir, stdout=StringIO())
+
+        self.assertEqual(os.listdir(self.spool_dir), [])
+        self.assertLikesConsistent(self.post, self.comment)
+        self.assertEqual((self.post.like_count, self.comment.like_count), (2, 1))
+
+    def test_outage_is_not_an_attempt(self):
+        buffer = self.make_buffer()
+        buffer.add(self.reader.pk, 'post', self.post.pk)
+        with mock.patch.object(like_buffer, 'write_like_intents', side_effect=OperationalError('down')):
+            for _ in range(5):
+                with self.assertRaises(OperationalError):
+                    buffer.flush()
+        self.assertEqual(len(buffer), 1)
+        self.assertFalse(Path(self.spool_dir, DEAD_LETTER_NAME).exists())
+
+        self.assertEqual(buffer.flush(), 1)
+        self.assertLikesConsistent(self.post, self.comment)
+        self.assertEqual(self.post.like_count, 1)
+
+    def test_flush_loop_backs_off_while_the_database_is_down(self):
+        buffer = self.make_buffer(flush_interval=0.01)
+        down = mock.patch.object(like_buffer, 'write_like_intents', side_effect=OperationalError('down'))
+        with down, mock.patch.object(like_buffer, 'MAX_RETRY_DELAY', 0.04), self.assertLogs(like_buffer.logger):
+            buffer.add(self.reader.pk, 'post', self.post.pk)
+            deadline = time.monotonic() + 5
+            while buffer._retry_delay < 0.04 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(buffer._retry_delay, 0.04)
+            # The flush at exit fails too; the spool keeps the like
+            buffer.close()
+        self.assertEqual(spool_lines(buffer._spool_path), [[self.reader.pk, 'post', self.post.pk]])
+
+    def test_row_errors_are_dead_lettered(self):
+        bad = (self.author.pk, 'post', self.post.pk)
+        write = like_buffer.write_like_intents
+
+        def reject_bad(keys):
+            if bad in keys:
+                raise IntegrityError('rejected')
+            return write(keys)
+
+        buffer = self.make_buffer()
+        buffer.add(*bad)
+        buffer.add(self.reader.pk, 'post', self.post.pk)
+        with mock.patch.object(like_buffer, 'write_like_intents', side_effect=reject_bad):
+            with self.assertLogs(like_buffer.logger, 'WARNING'):
+                self.assertEqual(buffer.flush(), 1)
+            self.assertEqual(len(buffer), 1)
+            with self.assertLogs(like_buffer.logger, 'ERROR'):
+                self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(buffer), 0)
+        dead = spool_lines(Path(self.spool_dir, DEAD_LETTER_NAME))
+        self.assertEqual([line[:3] for line in dead], [list(bad)])
+
+        # Once the cause is fixed, --leftovers writes them
+        call_command('replay_like_spool', '--spool-dir', self.spool_dir, '--leftovers', stdout=StringIO())
+        self.assertFalse(Path(self.spool_dir, DEAD_LETTER_NAME).exists())
+        self.assertLikesConsistent(self.post, self.comment)
+        self.assertEqual(self.post.like_count, 2)
+
+    def test_interrupted_replay_keeps_its_files(self):
+        self.write_spool('likes-99999-0123456789ab.jsonl', [[self.reader.pk, 'post', self.post.pk]])
+        down = mock.patch.object(like_buffer, 'write_like_intents', side_effect=OperationalError('down'))
+        with down, self.assertRaises(CommandError):
+            call_command('replay_like_spool', '--spool-dir', self.spool_dir, stdout=StringIO())
+        [left] = os.listdir(self.spool_dir)
+        self.assertTrue(left.startswith('claimed-'))
+
+        # Without --leftovers a claimed file is taken to belong to a running replay
+        call_command('replay_like_spool', '--spool-dir', self.spool_dir, stdout=StringIO())
+        self.assertEqual(os.listdir(self.spool_dir), [left])
+        call_command('replay_like_spool', '--spool-dir', self.spool_dir, '--leftovers', stdout=StringIO())
+        self.assertEqual(os.listdir(self.spool_dir), [])
+        self.assertLikesConsistent(self.post, self.comment)
+        self.assertEqual(self.post.like_count, 1)
@@ -0,0 +1,72 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.models import Comment, Like
+
+from .base import APITestCase, signed_in_client
+
+
+class LikedByMeTests(APITestCase):
+    """Reads flag what the viewer liked with one Like query per response."""
+
+    def setUp(self):
+        super().setUp()
+        self.post = self.make_thread(replies=3)
+        self.reply = Comment.objects.filter(post=self.post, parent__isnull=False).first()
+        Like.objects.create(user=self.reader, post=self.post)
+        Like.objects.create(user=self.reader, comment=self.reply)
+
+    def flags(self, data, kind='post'):
+        """``{(kind, id): liked_by_me}`` for every object in a rendered thread."""
+        flags = {(kind, data['id']): data['liked_by_me']}
+        for child in data.get('comments' if kind == 'post' else 'replies') or []:
+            flags.update(self.flags(child, 'comment'))
+        return flags
+
+    def like_queries(self, client, url):
+        with CaptureQueriesContext(connection) as queries:
+            data = client.get(url).json()
+        return data, [q for q in queries.captured_queries if 'FROM "api_like"' in q['sql']]
+
+    def test_thread_flags(self):
+        data, queries = self.like_queries(self.client, f'/api/posts/{self.post.pk}/')
+        self.assertEqual(len(queries), 1)
+        liked = {target for target, flag in self.flags(data).items() if flag}
+        self.assertEqual(liked, {('post', self.post.pk), ('comment', self.reply.pk)})
+        self.assertEqual(len(self.flags(data)), 7)
+
+    def test_one_query_for_a_whole_feed(self):
+        for _ in range(5):
+            self.make_thread(replies=2)
+        data, queries = self.like_queries(self.client, '/api/posts/?expand=comments')
+        self.assertEqual(len(queries), 1)
+        flags = {}
+        for post in data['results']:
+            flags.update(self.flags(post))
+        self.assertEqual(sum(flags.values()), 2)
+
+    def test_cached_bodies_are_not_personal(self):
+        url = f'/api/posts/{self.post.pk}/'
+        self.assertTrue(self.client.get(url).json()['liked_by_me'])
+        # Same cached body, other viewers
+        self.assertFalse(any(self.flags(signed_in_client(self.author).get(url).json()).values()))
+        data, queries = self.like_queries(APIClient(), url)
+        self.assertFalse(any(self.flags(data).values()))
+        self.assertEqual(queries, [])
+
+    def test_replies_and_comment_list(self):
+        root = self.reply.parent
+        [reply] = self.client.get(f'/api/comments/{root.pk}/replies/').json()['results']
+        self.assertTrue(reply['liked_by_me'])
+        comments = self.client.get('/api/comments/').json()['results']
+        self.assertEqual(
+            {comment['id'] for comment in comments if comment['liked_by_me']}, {self.reply.pk}
+        )
+
+    def test_not_requested(self):
+        data, queries = self.like_queries(
+            self.client, f'/api/posts/{self.post.pk}/?fields[post]=id,comments&fields[comment]=id'
+        )
+        self.assertEqual(queries, [])
+        self.assertNotIn('liked_by_me', data)
@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Comment, Like, Post
+
+from .base import APITestCase
+
+
+class LikeConsistencyTests(APITestCase):
+    """like_count and karma agree with the stored likes on every write path."""
+
+    def setUp(self):
+        super().setUp()
+        self.post = self.make_thread(replies=1)
+        self.comment = self.post.comments.first()
+
+    def assertConsistent(self):
+        self.assertLikesConsistent(self.post, self.comment)
+
+    def test_single_likes(self):
+        self.assertEqual(self.client.post('/api/likes/', {'post': self.post.pk}, format='json').status_code, 201)
+        self.assertEqual(self.client.post('/api/likes/', {'post': self.post.pk}, format='json').status_code, 200)
+        self.assertEqual(
+            self.client.post('/api/likes/', {'comment': self.comment.pk}, format='json').status_code, 201
+        )
+        self.assertConsistent()
+        self.assertEqual(self.post.like_count, 1)
+
+    def test_batch_likes(self):
+        items = [{'post': self.post.pk}, {'comment': self.comment.pk}, {'post': self.post.pk}]
+        self.assertEqual(self.client.post('/api/likes/batch/', items, format='json').status_code, 201)
+        self.assertEqual(self.client.post('/api/likes/batch/', items, format='json').status_code, 200)
+        self.assertConsistent()
+        self.assertEqual((self.post.like_count, self.comment.like_count), (1, 1))
+
+    def test_recount_fixes_drift(self):
+        Like.objects.create(user=self.reader, post=self.post)
+        Like.objects.create(user=self.author, post=self.post)
+        Post.objects.filter(pk=self.post.pk).update(like_count=7)
+        Comment.objects.filter(pk=self.comment.pk).update(like_count=3)
+
+        out = StringIO()
+        call_command('recount_likes', '--dry-run', stdout=out)
+        self.assertIn('Post: would fix 1', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 7)
+
+        call_command('recount_likes', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.comment.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.comment.like_count), (2, 0))
+
+
+class BatchLikeTests(APITestCase):
+    def test_statuses_per_item(self):
+        post = self.make_thread(replies=1)
+        comment = post.comments.first()
+        Like.objects.create(user=self.reader, comment=comment)
+        items = [
+            {'post': post.pk},
+            {'post': post.pk},
+            {'comment': comment.pk},
+            {'post': 999999},
+            {'post': post.pk, 'comment': comment.pk},
+            'not a like',
+        ]
+        response = self.client.post('/api/likes/batch/', {'likes': items}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result['status'] for result in response.json()['results']], [
+            'created', 'already_liked', 'already_liked', 'not_found', 'invalid', 'invalid',
+        ])
+        self.assertEqual(response.json()['results'][0], {'post': post.pk, 'status': 'created'})
+
+    def test_rejects_bad_batches(self):
+        self.assertEqual(self.client.post('/api/likes/batch/', [], format='json').status_code, 400)
+        too_many = [{'post': 1}] * 101
+        self.assertEqual(self.client.post('/api/likes/batch/', too_many, format='json').status_code, 400)
+
+    def test_one_insert_per_batch(self):
+        posts = [self.make_thread(replies=0) for _ in range(5)]
+        # Warm the cached user and this hour's karma bucket
+        self.client.post('/api/likes/batch/', [{'post': posts[0].pk}], format='json')
+        with CaptureQueriesContext(connection) as single:
+            self.client.post('/api/likes/batch/', [{'post': posts[1].pk}], format='json')
+        with CaptureQueriesContext(connection) as batch:
+            self.client.post('/api/likes/batch/', [{'post': post.pk} for post in posts[2:]], format='json')
+        self.assertEqual(len(batch), len(single))
+        inserts = [q for q in batch.captured_queries if 'INTO "api_like"' in q['sql']]
+        self.assertEqual(len(inserts), 1)
@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import Post
+
+from .base import APITestCase
+
+
+class KeysetPaginationTests(APITestCase):
+    """The post feed pages by (created_at, id), newest first."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        now = timezone.now()
+        self.posts = [Post.objects.create(author=self.author, content=f'post {i}') for i in range(25)]
+        # Pairs of posts share a timestamp, so the id breaks ties
+        for i, post in enumerate(self.posts):
+            Post.objects.filter(pk=post.pk).update(created_at=now - timedelta(minutes=i // 2))
+
+    def expected_ids(self):
+        return list(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def walk(self, url, between_pages=None):
+        ids = []
+        while url:
+            page = self.client.get(url).json()
+            ids += [post['id'] for post in page['results']]
+            url = page['next']
+            if between_pages:
+                between_pages()
+        return ids
+
+    def test_pages_cover_every_post_once(self):
+        self.assertEqual(self.walk('/api/posts/?page_size=4'), self.expected_ids())
+
+    def test_new_posts_do_not_shift_pages(self):
+        expected = self.expected_ids()
+        # Offsets would repeat a post on the next page each time one is added
+        ids = self.walk(
+            '/api/posts/?page_size=4',
+            lambda: Post.objects.create(author=self.author, content='newer'),
+        )
+        self.assertEqual(ids, expected)
+
+    def test_page_size_bounds(self):
+        self.assertEqual(len(self.client.get('/api/posts/').json()['results']), 20)
+        self.assertEqual(len(self.client.get('/api/posts/?page_size=0').json()['results']), 1)
+        self.assertEqual(len(self.client.get('/api/posts/?page_size=1000').json()['results']), 25)
+        self.assertEqual(len(self.client.get('/api/posts/?page_size=x').json()['results']), 20)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/posts/?cursor=not-a-cursor').status_code, 404)
+
+    def test_deep_pages_cost_the_same(self):
+        url = '/api/posts/?page_size=2'
+        for _ in range(10):
+            url = self.client.get(url).json()['next']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertEqual(len(queries), self.count_queries('/api/posts/?page_size=2', self.client))
+        self.assertFalse(any('OFFSET' in query['sql'] for query in queries.captured_queries))
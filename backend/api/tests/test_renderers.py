@@ -0,0 +1,41 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.models import Comment, Like, Post
+from api.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTests(TestCase):
+    """FastJSONRenderer must render the API's payloads exactly like JSONRenderer."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('renderer', password='pass12345')
+        self.post = Post.objects.create(author=self.user, content='Ünïcode   "quoted" </script>')
+        root = Comment.objects.create(post=self.post, author=self.user, content='root  ')
+        Comment.objects.create(post=self.post, author=self.user, parent=root, content='reply 🎉')
+        Like.objects.create(user=self.user, post=self.post)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_api_payloads_match_json_renderer(self):
+        for url in [
+            '/api/posts/?format=json',
+            f'/api/posts/{self.post.pk}/?format=json',
+            f'/api/posts/{self.post.pk}/comments/?format=json',
+            '/api/leaderboard/?format=json',
+        ]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, JSONRenderer().render(json.loads(response.content)))
+
+    def test_floats_decode_to_the_same_values(self):
+        # The API renders no floats; where spellings differ (1e+20 / 1e20) the values do not
+        data = {'values': [0.1, 1e20, 1e-7, -2.5, 123456789.125]}
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
@@ -0,0 +1,58 @@
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.middleware import install_query_recorder
+
+from .base import APITestCase, signed_in_client
+
+
+def timed_queries(response):
+    return int(re.match(r'db;desc="(\d+) queries"', response['Server-Timing']).group(1))
+
+
+class RequestTimingTests(APITestCase):
+    """Every response reports its SQL; slow ones are logged without parameters."""
+
+    def test_server_timing_counts_queries(self):
+        post = self.make_thread()
+        client = APIClient()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/api/posts/{post.pk}/')
+        self.assertEqual(timed_queries(response), len(queries))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;desc="\d+ queries";dur=[\d.]+, app;dur=[\d.]+, timing;dur=[\d.]+$',
+        )
+        # Served from the thread cache
+        self.assertEqual(timed_queries(client.get(f'/api/posts/{post.pk}/')), 0)
+
+    async def test_async_requests_are_counted(self):
+        post = await sync_to_async(self.make_thread)()
+        # The test connection predates the middleware's connection_created
+        # receiver, and views run on it in another thread than install()
+        await sync_to_async(install_query_recorder)(connection)
+        response = await AsyncClient().get(f'/api/posts/{post.pk}/')
+        self.assertEqual(timed_queries(response), 3)
+
+    @override_settings(REQUEST_TIMING_HEADER=False)
+    def test_header_can_be_turned_off(self):
+        self.assertNotIn('Server-Timing', APIClient().get('/api/posts/'))
+
+    @override_settings(REQUEST_TIMING_SLOW_QUERIES=1, REQUEST_TIMING_SLOWEST=2)
+    def test_slow_requests_are_logged(self):
+        client = signed_in_client(self.reader)
+        with self.assertLogs('api.middleware', 'WARNING') as logs:
+            response = client.post('/api/posts/', {'content': 'secret words'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        [line] = logs.output
+        record = json.loads(line.split(':', 2)[2])
+        self.assertEqual((record['method'], record['path'], record['status']), ('POST', '/api/posts/', 201))
+        self.assertEqual(record['queries'], timed_queries(response))
+        self.assertEqual(len(record['slowest']), 2)
+        self.assertNotIn('secret words', line)
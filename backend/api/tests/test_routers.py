@@ -0,0 +1,78 @@
+import time
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve
+
+from api.middleware import ReplicaRoutingMiddleware
+from api.models import Post
+from api.routers import ReplicaRouter, end_route, pin_user, primary_if_fresh, start_route
+
+READER = SimpleNamespace(pk=7, is_authenticated=True)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'], DATABASE_REPLICA_LAG=2)
+class ReplicaRouterTests(SimpleTestCase):
+    """GETs of the read endpoints go to one replica unless they must see fresh writes."""
+
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+
+    def route(self, path='/api/posts/', method='get', user=READER):
+        request = getattr(RequestFactory(), method)(path)
+        request.resolver_match = resolve(path)
+        request.user = user
+        token = start_route(request)
+        self.addCleanup(end_route, token)
+
+    def test_reads_of_a_request_share_one_replica(self):
+        self.route()
+        alias = self.router.db_for_read(Post)
+        self.assertIn(alias, ['replica1', 'replica2'])
+        for _ in range(10):
+            self.assertEqual(self.router.db_for_read(Post), alias)
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_primary_reads(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')  # outside a request
+        for path, method in (('/api/posts/', 'post'), ('/api/export/', 'get')):
+            with self.subTest(path=path, method=method):
+                self.route(path, method)
+                self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_users_read_from_the_primary(self):
+        self.route()
+        self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertNotEqual(self.router.db_for_read(Post), 'default')
+
+    def test_writers_read_their_writes(self):
+        pin_user(READER.pk)
+        self.route()
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_fresh_resources_stay_on_the_primary(self):
+        self.route()
+        primary_if_fresh(time.time_ns() - 1_000_000_000)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+        self.route()
+        primary_if_fresh(time.time_ns() - 3_000_000_000)
+        self.assertNotEqual(self.router.db_for_read(Post), 'default')
+
+    def test_middleware_pins_successful_writers(self):
+        def respond(status):
+            return ReplicaRoutingMiddleware(lambda request: HttpResponse(status=status))
+
+        request = RequestFactory().post('/api/likes/')
+        request.user = READER
+        respond(400)(request)
+        self.route()
+        self.assertNotEqual(self.router.db_for_read(Post), 'default')
+
+        respond(201)(request)
+        self.route()
+        self.assertEqual(self.router.db_for_read(Post), 'default')
@@ -0,0 +1,66 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+
+from api.karma import COMMENT_LIKE_KARMA, POST_LIKE_KARMA, user_karma, window_start
+from api.models import Comment, KarmaBucket, Like, Post
+
+from .base import APITestCase
+
+
+class SeedTests(APITestCase):
+    """manage.py seed writes a consistent dataset in chunks."""
+
+    def seed(self, **options):
+        options = {'users': 20, 'posts': 30, 'comments_per_post': 6, 'likes_per_post': 5, **options}
+        call_command('seed', batch_size=7, stdout=StringIO(), **options)
+
+    def test_dataset_is_consistent(self):
+        self.seed(max_depth=3)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertTrue(Comment.objects.exists() and Like.objects.exists())
+
+        # Stored counters match the likes, as recount_likes would leave them
+        out = StringIO()
+        call_command('recount_likes', '--dry-run', stdout=out)
+        self.assertIn('Post: would fix 0', out.getvalue())
+        self.assertIn('Comment: would fix 0', out.getvalue())
+
+        for comment in Comment.objects.select_related('parent'):
+            parent_path = comment.parent.path if comment.parent else ''
+            self.assertEqual(comment.path, parent_path + Comment.path_segment(comment.pk))
+            if comment.parent:
+                self.assertEqual(comment.parent.post_id, comment.post_id)
+        depths = {comment.path.count('/') for comment in Comment.objects.all()}
+        self.assertLessEqual(max(depths), 3)
+
+        # Karma buckets are rebuilt for the likes in the leaderboard window
+        self.assertTrue(KarmaBucket.objects.exists())
+        recent = Like.objects.filter(created_at__gte=window_start())
+        for user in User.objects.filter(username__startswith='seed_'):
+            expected = (
+                POST_LIKE_KARMA * recent.filter(post__author=user).count()
+                + COMMENT_LIKE_KARMA * recent.filter(comment__author=user).count()
+            )
+            self.assertEqual(user_karma(user.pk), expected, user.username)
+
+    def test_same_seed_same_dataset(self):
+        def snapshot():
+            posts = Post.objects.annotate(comments_count=Count('comments')).order_by('pk')
+            return list(posts.values_list('like_count', 'comments_count'))
+
+        self.seed(prefix='a')
+        first = snapshot()
+        Post.objects.all().delete()
+        self.seed(prefix='b')
+        self.assertEqual(snapshot()[-30:], first)
+
+    def test_rejects_bad_options(self):
+        with self.assertRaises(CommandError):
+            self.seed(max_depth=0)
+        self.seed(posts=0)
+        with self.assertRaisesMessage(CommandError, 'already exist'):
+            self.seed(posts=0)
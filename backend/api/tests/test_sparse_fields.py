@@ -0,0 +1,57 @@
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from .base import APITestCase, signed_in_client
+
+
+class SparseFieldsTests(APITestCase):
+    """Reads render, and fetch, only the fields they ask for."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.post = self.make_thread(replies=4)
+
+    def test_feed_fields(self):
+        [post] = self.client.get('/api/posts/', {'fields': 'id,content'}).json()['results']
+        self.assertEqual(post, {'id': self.post.pk, 'content': 'post'})
+        # No author join, comment count or preview
+        self.assertEqual(self.count_queries('/api/posts/?fields=id,content'), 1)
+        self.assertGreater(self.count_queries('/api/posts/'), 1)
+
+    @override_settings(FEED_PREVIEW_COMMENTS=2)
+    def test_feed_preview(self):
+        [post] = self.client.get('/api/posts/').json()['results']
+        self.assertEqual(len(post['comments']), 2)
+        self.assertIsNotNone(post['more_comments'])
+        # Replies are left to their cursor
+        self.assertEqual(post['comments'][0]['replies'], [])
+        self.assertIsNotNone(post['comments'][0]['more_replies'])
+
+        [post] = self.client.get('/api/posts/', {'expand': 'comments'}).json()['results']
+        self.assertEqual(len(post['comments']), 4)
+        self.assertEqual(len(post['comments'][0]['replies']), 1)
+
+    def test_nested_comment_fields(self):
+        data = self.client.get(
+            f'/api/posts/{self.post.pk}/', {'fields[post]': 'id,comments', 'fields[comment]': 'id,content'}
+        ).json()
+        self.assertEqual(set(data), {'id', 'comments', 'more_comments'})
+        self.assertEqual(set(data['comments'][0]), {'id', 'content'})
+        # Without replies the subtrees are never read
+        self.assertEqual(
+            self.count_queries(f'/api/posts/{self.post.pk}/?fields[comment]=id,content'),
+            self.count_queries(f'/api/posts/{self.post.pk}/') - 1,
+        )
+
+    def test_fieldsets_are_cached_apart(self):
+        url = f'/api/posts/{self.post.pk}/'
+        full = self.client.get(url).json()
+        self.assertEqual(self.client.get(url, {'fields': 'id'}).json(), {'id': self.post.pk})
+        self.assertEqual(self.client.get(url).json(), full)
+
+    def test_writes_return_every_field(self):
+        client = signed_in_client(self.reader)
+        response = client.post('/api/posts/?fields=id', {'content': 'new'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('author', response.json())
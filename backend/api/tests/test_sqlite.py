@@ -0,0 +1,74 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase
+
+from api.sqlite.base import DatabaseWrapper
+
+
+class SQLiteModeTests(SimpleTestCase):
+    """The tuned backend opens connections in WAL mode and writes with BEGIN IMMEDIATE."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'db.sqlite3')
+
+    def open(self, **options):
+        options = {
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': 'PRAGMA journal_mode=WAL;PRAGMA synchronous=NORMAL;PRAGMA busy_timeout=0',
+            **options,
+        }
+        settings_dict = {**connection.settings_dict, 'NAME': self.path, 'OPTIONS': options}
+        wrapper = DatabaseWrapper(settings_dict, 'sqlite_test')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    @contextmanager
+    def transaction(self, wrapper):
+        # What atomic() does on entry and exit, for a connection outside settings
+        wrapper.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        try:
+            yield
+        finally:
+            wrapper.rollback()
+            wrapper.set_autocommit(True)
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_settings_select_the_backend(self):
+        self.assertEqual(settings.DATABASES['default']['ENGINE'], 'api.sqlite')
+        self.assertEqual(settings.DATABASES['default']['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+    def test_init_command_runs_on_connect(self):
+        wrapper = self.open()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 0)
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        first, second = self.open(), self.open()
+        with self.transaction(first):
+            # Nothing written yet, but the lock is already held
+            with self.assertRaisesMessage(OperationalError, 'database is locked'):
+                with self.transaction(second):
+                    pass
+            # Readers are not blocked under WAL
+            self.assertEqual(self.pragma(second, 'user_version'), 0)
+
+    def test_deferred_mode_begins_lazily(self):
+        first, second = self.open(transaction_mode=None), self.open(transaction_mode=None)
+        with self.transaction(first), self.transaction(second):
+            pass
+
+    def test_rejects_unknown_modes(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.open(transaction_mode='later')
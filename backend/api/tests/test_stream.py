@@ -0,0 +1,92 @@
+import asyncio
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, override_settings
+
+from api import stream
+from api.stream import RedisBackend, publish
+
+from .base import APITestCase
+
+
+class FailingBackend:
+    def publish(self, event, data):
+        raise ConnectionError('redis is down')
+
+
+class StreamTests(APITestCase):
+    def tearDown(self):
+        stream._backend = None
+        super().tearDown()
+
+    def test_needs_asgi(self):
+        self.assertEqual(self.client.get('/api/stream/').status_code, 503)
+
+    @override_settings(STREAM_KEEPALIVE_SECONDS=5)
+    async def test_events_reach_subscribers(self):
+        response = await AsyncClient().get('/api/stream/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b'retry: 3000\n\n')
+        self.assertTrue((await anext(events)).startswith(b'event: leaderboard\n'))
+
+        # Published from a sync thread, as the like views do after commit
+        await sync_to_async(publish, thread_sensitive=False)('post.like', {'post': 1, 'delta': 2})
+        frame = await asyncio.wait_for(anext(events), timeout=5)
+        self.assertEqual(frame, b'event: post.like\ndata: {"post":1,"delta":2}\n\n')
+        await events.aclose()
+
+    def test_failing_backend_does_not_fail_the_write(self):
+        stream._backend = FailingBackend()
+        post = self.make_thread(replies=0)
+        with self.assertLogs(stream.logger, 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/likes/', {'post': post.pk}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+class StopListener(BaseException):
+    """Ends the listener loop, which otherwise runs for the process's life."""
+
+
+class FakePubSub:
+    def __init__(self, messages):
+        self.messages = messages
+        self.closed = False
+
+    def subscribe(self, channel):
+        pass
+
+    def listen(self):
+        for message in self.messages:
+            if isinstance(message, BaseException):
+                raise message
+            yield message
+
+    def close(self):
+        self.closed = True
+
+
+class RedisBackendTests(APITestCase):
+    def test_listener_resubscribes_after_a_drop(self):
+        dropped = FakePubSub([ConnectionError('connection reset')])
+        resumed = FakePubSub([
+            {'data': b'not json'},
+            {'data': b'{"event": "post.like", "data": {"post": 1, "delta": 1}}'},
+            StopListener(),
+        ])
+        backend = RedisBackend.__new__(RedisBackend)
+        backend.hub = mock.Mock()
+        backend.client = mock.Mock(**{'pubsub.side_effect': [dropped, resumed]})
+
+        with mock.patch.object(stream.time, 'sleep') as sleep, self.assertLogs(stream.logger) as logs:
+            # The real listener runs in a daemon thread; this one stops at StopListener
+            with self.assertRaises(StopListener):
+                backend._listen()
+        self.assertEqual(sleep.call_args_list, [mock.call(0.5)])
+        self.assertTrue(dropped.closed and resumed.closed)
+        self.assertEqual(backend.hub.dispatch.call_args_list, [
+            mock.call(stream.LEADERBOARD_DIRTY, None),
+            mock.call('post.like', {'post': 1, 'delta': 1}),
+        ])
+        self.assertIn('malformed', '\n'.join(logs.output))
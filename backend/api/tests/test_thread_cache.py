@@ -0,0 +1,84 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.thread_cache import LRUCache, local_cache
+
+from .base import APITestCase
+
+
+class ThreadCacheTests(APITestCase):
+    """Rendered threads are cached per version stamp and representation."""
+
+    def queries_without_clearing(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return len(queries)
+
+    def test_cached_thread_and_not_modified(self):
+        post = self.make_thread()
+        response = self.client.get(f'/api/posts/{post.pk}/')
+        # Cached body; only the viewer's likes are looked up
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(f'/api/posts/{post.pk}/').content, response.content)
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/posts/{post.pk}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_and_representations_miss(self):
+        post = self.make_thread()
+        url = f'/api/posts/{post.pk}/'
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+        # Another representation is another entry
+        self.assertGreater(self.queries_without_clearing(url + '?depth=1'), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/comments/', {'post': post.pk, 'content': 'new'}, format='json')
+        self.assertGreater(self.queries_without_clearing(url), 1)
+        self.assertIn(b'"new"', self.client.get(url).content)
+
+    def test_shared_tier_fills_the_local_one(self):
+        post = self.make_thread()
+        url = f'/api/posts/{post.pk}/'
+        body = self.client.get(url).content
+        # Another process: its own empty LRU, the same shared cache
+        local_cache().clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).content, body)
+        self.assertEqual(len(local_cache()), 1)
+
+
+class LRUCacheTests(SimpleTestCase):
+    """The local tier stays within its byte budget."""
+
+    def test_evicts_least_recently_used(self):
+        lru = LRUCache(max_bytes=40)
+        lru.set('a', b'x' * 10)
+        lru.set('b', b'x' * 10)
+        lru.set('c', b'x' * 10)
+        lru.get('a')
+        lru.set('d', b'x' * 10)
+        lru.set('e', b'x' * 10)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), b'x' * 10)
+        self.assertLessEqual(lru.size, 40)
+
+    def test_skips_oversized_values(self):
+        lru = LRUCache(max_bytes=40)
+        lru.set('a', b'x' * 5)
+        lru.set('huge', b'x' * 11)
+        self.assertEqual((lru.get('huge'), len(lru)), (None, 1))
+
+    def test_entries_expire(self):
+        lru = LRUCache(max_bytes=40, ttl=10)
+        with mock.patch('api.thread_cache.time.monotonic', return_value=100):
+            lru.set('a', b'x')
+        with mock.patch('api.thread_cache.time.monotonic', return_value=109):
+            self.assertEqual(lru.get('a'), b'x')
+        with mock.patch('api.thread_cache.time.monotonic', return_value=110):
+            self.assertIsNone(lru.get('a'))
+        self.assertEqual(lru.size, 0)
@@ -0,0 +1,113 @@
+"""
+Cache of fully rendered post threads.
+
+Serializing a post's comment tree dominates ``GET /api/posts/{id}/``, so the
+rendered JSON bytes are cached. The key holds the post's version stamp (see
+versions.py) plus everything else that selects a representation (a digest
+of tree depth, replies per node, sort order and sparse fieldsets, see
+serializers.representation_key, and the media type). A write to the post, its
+comments or their likes bumps the stamp, so new requests miss and the old
+entries simply age out; nothing is ever invalidated by hand.
+
+Two tiers, both bounded:
+
+- an in-process LRU of at most ``THREAD_CACHE_LOCAL_BYTES`` bytes, which
+  serves hot threads without a network round trip; its entries also expire
+  after ``THREAD_CACHE_TTL`` seconds
+- Django's cache, shared between processes, entries expire after
+  ``THREAD_CACHE_TTL`` seconds (and under the backend's own eviction)
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class LRUCache:
+    """
+    Thread-safe LRU of byte strings, bounded by total size. With ``ttl``
+    (seconds) entries also expire, as a backstop should a key ever outlive
+    the data it was built from.
+    """
+
+    def __init__(self, max_bytes, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        # key: (value, expires at or None)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                self.size -= len(value)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes // 4:
+            # One huge thread must not flush everything else
+            return
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self._entries[key] = (value, expires)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+_local = None
+_local_lock = threading.Lock()
+
+
+def local_cache():
+    """The process-wide LRU tier, created on first use."""
+    global _local
+    if _local is None:
+        with _local_lock:
+            if _local is None:
+                _local = LRUCache(
+                    getattr(settings, 'THREAD_CACHE_LOCAL_BYTES', 32 * 1024 * 1024),
+                    ttl=getattr(settings, 'THREAD_CACHE_TTL', 300),
+                )
+    return _local
+
+
+def thread_key(post_id, stamp, representation, media_type):
+    return f'thread:{post_id}:{stamp}:{representation}:{media_type}'
+
+
+def get_thread(key):
+    """Rendered bytes for ``key`` from the local tier, then the shared one."""
+    body = local_cache().get(key)
+    if body is None:
+        body = cache.get(key)
+        if body is not None:
+            local_cache().set(key, body)
+    return body
+
+
+def set_thread(key, body):
+    local_cache().set(key, body)
+    cache.set(key, body, timeout=getattr(settings, 'THREAD_CACHE_TTL', 300))
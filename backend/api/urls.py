@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    PostViewSet, CommentViewSet, LikeCreateView, LeaderboardView,
+    PostViewSet, CommentViewSet, LikeCreateView, LikeBatchView, LeaderboardView, ExportView,
     RegisterView, LoginView, LogoutView, CurrentUserView
 )
+from .stream import stream_view
 
 router = DefaultRouter()
 router.register(r'posts', PostViewSet, basename='post')
@@ -12,7 +13,10 @@ router.register(r'comments', CommentViewSet, basename='comment')
 urlpatterns = [
     path('', include(router.urls)),
     path('likes/', LikeCreateView.as_view(), name='like-create'),
+    path('likes/batch/', LikeBatchView.as_view(), name='like-batch'),
     path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('stream/', stream_view, name='stream'),
+    path('export/', ExportView.as_view(), name='export'),
     
     # Authentication endpoints
     path('auth/register/', RegisterView.as_view(), name='register'),
@@ -0,0 +1,114 @@
+"""
+Version stamps for conditional GETs.
+
+Polling clients mostly re-fetch data that has not changed. Every post has a
+version stamp in Django's cache (``versions:post:<id>``), bumped after commit
+whenever the post, one of its comments or a like on either is written. The
+feed has one stamp (``versions:posts``) bumped by all of those writes.
+
+A stamp is the ``time.time_ns()`` of the last bump, so it doubles as the
+``Last-Modified`` time. A stamp missing from the cache (evicted, cache
+cleared) is recreated as "now", which only costs clients one full response.
+
+``@conditional`` reads the stamp *before* the view runs and answers a
+matching ``If-None-Match`` / ``If-Modified-Since`` with 304, skipping the
+queries and serialization entirely.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .routers import primary_if_fresh
+
+POSTS_KEY = 'versions:posts'
+# Losing a stamp is harmless, so they need not live forever
+VERSION_TTL = 7 * 24 * 60 * 60
+
+
+def post_key(post_id):
+    return f'versions:post:{post_id}'
+
+
+def get_version(key):
+    stamp = cache.get(key)
+    if stamp is None:
+        stamp = time.time_ns()
+        if not cache.add(key, stamp, timeout=VERSION_TTL):
+            # Another request created it first
+            stamp = cache.get(key, stamp)
+    return stamp
+
+
+def posts_version():
+    """Stamp of the feed as a whole."""
+    return get_version(POSTS_KEY)
+
+
+def post_version(post_id):
+    """Stamp of one post with its comments and likes."""
+    return get_version(post_key(post_id))
+
+
+def bump_posts(post_ids):
+    """Mark ``post_ids`` (and the feed) as changed, right now."""
+    stamp = time.time_ns()
+    stamps = {post_key(post_id): stamp for post_id in post_ids}
+    stamps[POSTS_KEY] = stamp
+    cache.set_many(stamps, timeout=VERSION_TTL)
+
+
+def bump_posts_on_commit(post_ids):
+    """Bump once the current transaction commits, so readers see the new rows."""
+    post_ids = set(post_ids)
+    transaction.on_commit(lambda: bump_posts(post_ids))
+
+
+def validators(request, stamp):
+    """
+    ``(etag, last_modified)`` of the representation ``request`` asks for.
+    Keeps the request off lagging replicas while ``stamp`` is recent.
+    """
+    primary_if_fresh(stamp)
+    user_id = request.user.pk if request.user.is_authenticated else ''
+    digest = hashlib.md5(f'{stamp}:{user_id}:{request.get_full_path()}'.encode()).hexdigest()
+    return f'"{digest}"', stamp // 1_000_000_000
+
+
+def finish_conditional(response, etag, last_modified):
+    """Stamp a fresh 200 with its validators; always ask clients to revalidate."""
+    if response.status_code == 200:
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+    # Let browsers keep the body but always revalidate it
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def conditional(version_func):
+    """
+    Decorate a view method so GET/HEAD answer 304 when the client is current.
+
+    ``version_func(view, request, **kwargs)`` returns the resource's stamp.
+    The ETag also covers the full path, since query parameters (cursor,
+    depth, ...) select different representations of the same resource, and
+    the signed-in user, since parts of a response can be personal.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return method(view, request, *args, **kwargs)
+
+            etag, last_modified = validators(request, version_func(view, request, **kwargs))
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = method(view, request, *args, **kwargs)
+            return finish_conditional(response, etag, last_modified)
+        return wrapper
+    return decorator
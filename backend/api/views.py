@@ -2,72 +2,194 @@ from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.db import transaction
 from django.db.models import Q, Count, F, Value, IntegerField
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
 from datetime import timedelta
 
 from .models import Post, Comment, Like
+from .karma import top_users
+from .leaderboard import (
+    DEFAULT_LIMIT, get_leaderboard, get_leaderboard_stamp, get_user_rank, max_limit
+)
+from .like_buffer import get_like_buffer
+from .likes import apply_new_likes, insert_likes, lock_likers
+from .comment_tree import load_reply_trees
+from .export import EXPORTS, aexport_lines, export_lines, parse_watermarks
+from .pagination import KeysetPagination, decode_reply_cursor
+from .renderers import parse_json
+from .stream import publish_comment
+from .thread_cache import get_thread, set_thread, thread_key
+from .versions import conditional, post_version, posts_version
+from .writes import write_transaction
 from .serializers import (
     PostSerializer, CommentSerializer, LikeSerializer, LeaderboardSerializer,
-    UserRegistrationSerializer, UserLoginSerializer, UserDetailSerializer
+    UserRegistrationSerializer, UserLoginSerializer, UserDetailSerializer,
+    comment_page, mark_liked, post_comment_page, post_queryset, representation_key, tree_options
 )
 
 
-class PostViewSet(viewsets.ModelViewSet):
+def reply_cursor(request):
+    """``(offset, sort)`` from ``?cursor=``; first page in the requested sort otherwise."""
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        return decode_reply_cursor(cursor)
+    return 0, request.query_params.get('sort')
+
+
+class LikedByMeMixin:
+    """
+    Adds the viewer's ``liked_by_me`` flags to successful reads, with one
+    Like query per response (see serializers.mark_liked).
+    """
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (
+            request.method in SAFE_METHODS and isinstance(response, Response)
+            and response.status_code == status.HTTP_200_OK and response.data is not None
+        ):
+            context = self.get_serializer_context()
+            mark_liked(response.data, context, context['resource'], request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class PostViewSet(LikedByMeMixin, viewsets.ModelViewSet):
     """
     ViewSet for Posts with N+1 query optimization.
     Uses select_related and prefetch_related to minimize database hits.
+    Reads carry ETag/Last-Modified from the version stamps in versions.py and
+    answer conditional requests with 304 before any query runs.
     """
     serializer_class = PostSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """
         Optimized queryset to prevent N+1 queries.
-        Prefetches all related data in a minimal number of queries.
+        Comment trees are not prefetched here: PostSerializer loads every
+        comment for the page in one query and links the tree in memory.
+        Joins and annotations follow the requested fields (see post_queryset).
         """
-        return Post.objects.select_related('author').prefetch_related(
-            'likes',
-            'comments__author',
-            'comments__likes',
-            'comments__replies__author',
-            'comments__replies__likes',
-            'comments__replies__replies__author',
-            'comments__replies__replies__likes',
-        )
+        if self.action == 'comments':
+            return Post.objects.all()
+        return post_queryset(self.get_serializer_context())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['resource'] = 'comment' if self.action == 'comments' else 'post'
+        return context
+
+    @conditional(lambda view, request, **kwargs: posts_version())
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional(lambda view, request, pk=None: post_version(pk))
+    def retrieve(self, request, *args, **kwargs):
+        """
+        JSON renderings of a thread are served from thread_cache when current;
+        a signed-in viewer's likes are applied to the cached body.
+        """
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, JSONRenderer):
+            return super().retrieve(request, *args, **kwargs)
+
+        pk = kwargs[self.lookup_field]
+        context = self.get_serializer_context()
+        key = thread_key(pk, post_version(pk), representation_key(context), request.accepted_media_type)
+        body, data = get_thread(key), None
+        if body is None:
+            data = self.get_serializer(self.get_object()).data
+            # Shared by every viewer, so cached without anyone's likes
+            mark_liked(data, context, 'post')
+            body = renderer.render(data, request.accepted_media_type, self.get_renderer_context())
+            set_thread(key, body)
+        if request.user.is_authenticated:
+            data = parse_json(body) if data is None else data
+            if mark_liked(data, context, 'post', request.user):
+                body = renderer.render(data, request.accepted_media_type, self.get_renderer_context())
+        return HttpResponse(body, content_type=renderer.media_type)
 
+    @action(detail=True, methods=['get'])
+    @conditional(lambda view, request, pk=None: post_version(pk))
+    def comments(self, request, pk=None):
+        """Page through a post's top-level comments: ``?cursor=<more_comments>``."""
+        post = self.get_object()
+        offset, sort = reply_cursor(request)
+        data, more = post_comment_page(post, self.get_serializer_context(), offset, sort)
+        return Response({'results': data, 'more_comments': more})
 
-class CommentViewSet(viewsets.ModelViewSet):
-    """ViewSet for Comments with recursive reply support."""
+
+class CommentViewSet(LikedByMeMixin, viewsets.ModelViewSet):
+    """
+    ViewSet for Comments with recursive reply support.
+    retrieve returns the comment's subtree, fetched with one path prefix query.
+    list is keyset paginated, newest first, like the post feed.
+    """
     serializer_class = CommentSerializer
-    queryset = Comment.objects.select_related('author', 'post').prefetch_related(
-        'likes',
-        'replies__author',
-        'replies__likes',
-    )
+    pagination_class = KeysetPagination
+    # Replies are attached by CommentSerializer from a single tree query
+    queryset = Comment.objects.select_related('author', 'post')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['resource'] = 'comment'
+        return context
+
+    def perform_create(self, serializer):
+        # The insert and the path update of Comment.save() commit together
+        with write_transaction():
+            comment = serializer.save()
+            transaction.on_commit(lambda: publish_comment(comment))
+
+    @action(detail=True, methods=['get'])
+    def replies(self, request, pk=None):
+        """Page through a comment's direct replies: ``?cursor=<more_replies>``."""
+        comment = self.get_object()
+        context = self.get_serializer_context()
+        # The replies are serialized from depth 1, one level below the comment
+        load_reply_trees([comment], depth=tree_options(context)['max_depth'] + 1)
+        offset, sort = reply_cursor(request)
+        data, more = comment_page(comment.replies.all(), context, depth=1, offset=offset, sort=sort)
+        return Response({'results': data, 'more_replies': more})
 
 
 class LikeCreateView(generics.CreateAPIView):
     """
     Create a Like with atomic transaction to prevent race conditions.
     Uses get_or_create to prevent duplicate likes.
+    With LIKE_WRITE_BEHIND enabled, likes are queued in the process's
+    LikeBuffer instead and inserted in batches (202 Accepted).
     """
     serializer_class = LikeSerializer
 
-    @transaction.atomic
     def create(self, request, *args, **kwargs):
-        """
-        Atomic like creation - prevents duplicate likes even with concurrent requests.
-        """
         user = request.user
         post_id = request.data.get('post')
         comment_id = request.data.get('comment')
 
+        if settings.LIKE_WRITE_BEHIND and (post_id or comment_id):
+            # No transaction (or SQLite write lock) for a queued like
+            return self.enqueue(user, post_id, comment_id)
+        return self.insert(user, post_id, comment_id)
+
+    @write_transaction()
+    def insert(self, user, post_id, comment_id):
+        """
+        Atomic like creation - prevents duplicate likes even with concurrent requests.
+        The target's like_count and its author's karma are updated in the
+        same transaction (see likes.apply_new_likes).
+        """
+        # Same lock as the batch and write-behind paths (see lock_likers)
+        lock_likers([user.pk])
+
         # Determine what we're liking
         if post_id:
             like, created = Like.objects.get_or_create(
@@ -87,6 +209,9 @@ class LikeCreateView(generics.CreateAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        if created:
+            apply_new_likes([like])
+
         serializer = self.get_serializer(like)
         
         if created:
@@ -97,53 +222,160 @@ class LikeCreateView(generics.CreateAPIView):
                 status=status.HTTP_200_OK
             )
 
+    def enqueue(self, user, post_id, comment_id):
+        """Write-behind mode: accept the like now, insert it with the next buffer flush."""
+        kind, pk = ('post', post_id) if post_id else ('comment', comment_id)
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': f'Invalid {kind} id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queued = get_like_buffer().add(user.id, kind, pk)
+        return Response(
+            {'message': 'Like queued' if queued else 'Already liked', kind: pk},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
+class LikeBatchView(APIView):
+    """
+    Create many likes in one request (offline like queues, imports).
+
+    Body: ``{"likes": [{"post": 1}, {"comment": 7}, ...]}`` (or the bare list).
+    All new likes are inserted with a single bulk INSERT that skips rows
+    conflicting with the unique like constraints. Returns one result per
+    item, in order, with ``status`` one of ``created``, ``already_liked``,
+    ``not_found`` or ``invalid``.
+    """
+    max_batch_size = 100
+
+    def post(self, request):
+        items = request.data.get('likes') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Expected a non-empty list of likes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.max_batch_size:
+            return Response(
+                {'error': f'At most {self.max_batch_size} likes per batch'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user = request.user
+        targets = [self.parse_target(item) for item in items]
+        likes = [
+            Like(user=user, **{f'{kind}_id': pk})
+            for kind, pk in filter(None, targets)
+        ]
+
+        with write_transaction():
+            statuses = insert_likes(likes)
+
+        results = []
+        seen = set()
+        for item, target in zip(items, targets):
+            if target is None:
+                results.append({'item': item, 'status': 'invalid'})
+                continue
+            kind, pk = target
+            result = statuses[(user.id, kind, pk)]
+            if result == 'created' and target in seen:
+                # Repeats of the same target later in the batch
+                result = 'already_liked'
+            seen.add(target)
+            results.append({kind: pk, 'status': result})
+
+        created = sum(1 for result in results if result['status'] == 'created')
+        return Response(
+            {'results': results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    @staticmethod
+    def parse_target(item):
+        """``('post', id)`` / ``('comment', id)``, or None if the item is malformed."""
+        if not isinstance(item, dict):
+            return None
+        post_id, comment_id = item.get('post'), item.get('comment')
+        if bool(post_id) == bool(comment_id):
+            return None
+        kind, value = ('post', post_id) if post_id else ('comment', comment_id)
+        try:
+            return kind, int(value)
+        except (TypeError, ValueError):
+            return None
+
+
+def leaderboard_version(view, request, **kwargs):
+    """The leaderboard's stamp as the caller sees it; never computes their rank."""
+    return get_leaderboard_stamp(request.user)
+
 
 class LeaderboardView(generics.ListAPIView):
     """
     Dynamic 24-hour leaderboard.
-    Calculates karma on-the-fly: post_likes * 5 + comment_likes * 1
-    Only counts likes from the last 24 hours.
+    Karma (post_likes * 5 + comment_likes * 1) is accumulated per user and
+    hour in KarmaBucket when likes are written; this view sums the last 24
+    buckets. Results are cached (see leaderboard.py) and invalidated by likes.
+
+    ``?limit=`` picks how many rows to return (default 5). Signed-in callers
+    also get their own rank and karma in ``me``, even outside the top rows.
     """
     serializer_class = LeaderboardSerializer
 
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        return max(1, min(limit, max_limit()))
+
     def get_queryset(self):
-        """
-        Calculate karma dynamically from likes in the last 24 hours.
-        Post likes are worth 5 points, comment likes are worth 1 point.
-        """
-        now = timezone.now()
-        last_24h = now - timedelta(hours=24)
-
-        # Annotate users with karma calculation
-        queryset = User.objects.annotate(
-            # Count post likes from last 24h
-            post_likes=Count(
-                'posts__likes',
-                filter=Q(posts__likes__created_at__gte=last_24h),
-                distinct=True
-            ),
-            # Count comment likes from last 24h
-            comment_likes=Count(
-                'comments__likes',
-                filter=Q(comments__likes__created_at__gte=last_24h),
-                distinct=True
-            ),
-            # Calculate total karma
-            karma=F('post_likes') * 5 + F('comment_likes') * 1
-        ).filter(
-            karma__gt=0  # Only show users with karma
-        ).order_by('-karma')[:5]  # Top 5 users
-
-        return queryset
+        """Top users by karma over the last 24 hourly buckets."""
+        return top_users(limit=self.get_limit())
 
+    @conditional(leaderboard_version)
     def list(self, request, *args, **kwargs):
         """Return leaderboard data."""
-        queryset = self.get_queryset()
-        data = [
-            {'username': user.username, 'karma': user.karma}
-            for user in queryset
-        ]
-        return Response(data)
+        me = None
+        if request.user.is_authenticated:
+            rank = get_user_rank(request.user)
+            me = {'username': request.user.username, 'rank': rank['rank'], 'karma': rank['karma']}
+        return Response({'results': get_leaderboard(self.get_limit()), 'me': me})
+
+
+class ExportView(APIView):
+    """
+    Staff only NDJSON export of ``?type=posts|comments|likes``, streamed in
+    id order (see export.py). ``?after_id=``, or ``?since=`` (ISO 8601) with
+    ``?after_id=``, continue from the last line of the previous export.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        kind = request.query_params.get('type')
+        if kind not in EXPORTS:
+            return Response(
+                {'error': f'type must be one of: {", ".join(EXPORTS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            after_id, since = parse_watermarks(
+                request.query_params.get('after_id'), request.query_params.get('since')
+            )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        # An ASGI response needs an async iterator to stream chunk by chunk
+        lines = aexport_lines if isinstance(request._request, ASGIRequest) else export_lines
+        response = StreamingHttpResponse(
+            lines(kind, after_id, since), content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{kind}.ndjson"'
+        response['Cache-Control'] = 'no-store'
+        return response
 
 
 # Authentication Views
@@ -228,5 +460,6 @@ class CurrentUserView(generics.RetrieveAPIView):
     
     def get_object(self):
         """Return the current authenticated user."""
-        return self.request.user
+        # request.user may come from the auth cache with only a few fields loaded
+        return User.objects.get(pk=self.request.user.pk)
 
@@ -0,0 +1,62 @@
+"""
+Write transactions for the hot write paths (likes, comments).
+
+SQLite has one writer at a time. With the tuned SQLite backend
+(api/sqlite/base.py) a waiting writer sits in SQLite's busy handler, which
+polls with sleeps of up to 100 ms, so under a burst of likes the lock
+changes hands slowly and late arrivals can time out. ``write_transaction``
+queues writers instead: threads on a process lock, processes on an
+``flock`` of ``<database>-writelock``. A waiter is woken as soon as the
+previous writer commits and then finds the database lock free.
+
+Where ``fcntl`` is missing (Windows) only the threads of a process are
+queued. On other databases it is plain ``transaction.atomic()``.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_write_lock = threading.Lock()
+_lock_files = {}
+
+
+def _lock_file(path):
+    # Opened per process: forked children must not share the parent's lock
+    key = (os.getpid(), path)
+    if key not in _lock_files:
+        _lock_files[key] = open(f'{path}-writelock', 'a')
+    return _lock_files[key]
+
+
+@contextmanager
+def _process_write_lock(connection):
+    if fcntl is None or connection.is_in_memory_db():
+        yield
+        return
+    lock_file = _lock_file(str(connection.settings_dict['NAME']))
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def write_transaction(using=None):
+    """``transaction.atomic()`` that queues behind other SQLite writers first."""
+    connection = transaction.get_connection(using)
+    # Inside an atomic block the transaction may already hold the database
+    # lock; waiting for the queue there could deadlock with its head
+    if not getattr(connection, 'serialize_writes', False) or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+    with _write_lock, _process_write_lock(connection), transaction.atomic(using=using):
+        yield
@@ -0,0 +1,31 @@
+"""
+Gunicorn config, read from the working directory (``backend/``).
+
+Gunicorn takes its worker count from ``WEB_CONCURRENCY`` (1 if unset) or
+``-w``. Version stamps (304s), rendered threads, cached JWT users and replica
+pins live in the default cache and must be seen by every worker: with a
+per-process cache a write handled by one worker never reaches the others,
+which keep answering 304 and serving stale threads. So the master refuses to
+start several workers over ``LocMemCache``; set ``REDIS_URL``.
+"""
+import os
+
+# ASGI, needed for /api/stream/ and async streaming of /api/export/
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+PER_PROCESS_CACHES = {'django.core.cache.backends.locmem.LocMemCache'}
+
+
+def on_starting(server):
+    """Check the final worker count (``-w`` included) against the cache."""
+    if server.cfg.workers <= 1:
+        return
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'reddit_clone.settings')
+    from django.conf import settings
+
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in PER_PROCESS_CACHES:
+        raise SystemExit(
+            f'{server.cfg.workers} workers need a cache shared by all of them, '
+            f'not {backend}; set REDIS_URL or run one worker.'
+        )
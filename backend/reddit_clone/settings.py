@@ -64,9 +64,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestTimingMiddleware',  # Server-Timing + slow request log
+    'api.middleware.CompressionMiddleware',  # brotli/gzip for large JSON reads
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise for static files
+    'api.middleware.AsyncWhiteNoiseMiddleware',  # WhiteNoise static files, ASGI friendly
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -117,6 +119,125 @@ else:
         }
     }
 
+# Read replicas (api/routers.py): GETs of posts, comments and the leaderboard
+# read from one of these unless the caller or the resource changed within
+# DATABASE_REPLICA_LAG seconds. Locally two SQLite files work, kept in sync
+# with manage.py sync_replicas.
+DATABASE_REPLICA_URLS = [url for url in config('DATABASE_REPLICA_URLS', default='', cast=Csv()) if url]
+DATABASE_REPLICA_LAG = config('DATABASE_REPLICA_LAG', default=2, cast=float)
+DATABASE_REPLICAS = []
+for number, url in enumerate(DATABASE_REPLICA_URLS, 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = dj_database_url.parse(url, conn_max_age=600, conn_health_checks=True)
+    # Tests read and write the test copy of the primary
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+    MIDDLEWARE.insert(1, 'api.middleware.ReplicaRoutingMiddleware')
+
+# SQLite under concurrent writes (api/sqlite/base.py): WAL so readers and the
+# writer never block each other, writers take the lock up front (BEGIN
+# IMMEDIATE) and wait up to SQLITE_BUSY_TIMEOUT ms for it, connections are
+# kept open across requests
+for database in DATABASES.values():
+    if database['ENGINE'] != 'django.db.backends.sqlite3' or not config(
+        'SQLITE_TUNING', default=True, cast=bool
+    ):
+        continue
+    database.update({
+        'ENGINE': 'api.sqlite',
+        'CONN_MAX_AGE': config('SQLITE_CONN_MAX_AGE', default=600, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+    })
+    database.setdefault('OPTIONS', {}).update({
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': ';'.join([
+            'PRAGMA journal_mode=WAL',
+            # Durable at checkpoints; a power loss can drop only the last commits
+            'PRAGMA synchronous=NORMAL',
+            'PRAGMA busy_timeout={}'.format(config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int)),
+            # Negative: KiB, so 64 MB of page cache per connection
+            'PRAGMA cache_size=-65536',
+            'PRAGMA mmap_size={}'.format(config('SQLITE_MMAP_SIZE', default=268435456, cast=int)),
+            'PRAGMA temp_store=MEMORY',
+        ]),
+    })
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+REDIS_URL = config('REDIS_URL', default=None)
+
+# Use Redis when available so all workers share one cache, local memory otherwise
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Version stamps (304s), rendered threads, cached JWT users and replica pins
+# live in this cache and must be seen by every worker. gunicorn.conf.py
+# refuses to start more than one worker over the local-memory fallback;
+# other servers must be run with a single process unless REDIS_URL is set.
+
+# Comment trees: levels serialized under a post and replies per node before
+# the rest is left to GET /api/comments/{id}/replies/ (``more_replies`` cursor)
+COMMENT_TREE_DEPTH = config('COMMENT_TREE_DEPTH', default=4, cast=int)
+COMMENT_REPLIES_PER_NODE = config('COMMENT_REPLIES_PER_NODE', default=10, cast=int)
+# Top-level comments previewed per post in the feed (``?expand=comments``
+# returns full trees instead)
+FEED_PREVIEW_COMMENTS = config('FEED_PREVIEW_COMMENTS', default=3, cast=int)
+
+# Leaderboard cache: fresh for TTL seconds, stale rows kept for STALE_TTL
+# seconds so they can be served while a single request rebuilds the entry
+LEADERBOARD_CACHE_TTL = config('LEADERBOARD_CACHE_TTL', default=30, cast=int)
+LEADERBOARD_CACHE_STALE_TTL = config('LEADERBOARD_CACHE_STALE_TTL', default=300, cast=int)
+# Rows kept in the cached leaderboard; also the largest ?limit= accepted
+LEADERBOARD_MAX_LIMIT = config('LEADERBOARD_MAX_LIMIT', default=50, cast=int)
+
+# Rendered post threads (GET /api/posts/{id}/): an in-process LRU bounded to
+# LOCAL_BYTES in front of the shared cache, where entries live TTL seconds
+THREAD_CACHE_LOCAL_BYTES = config('THREAD_CACHE_LOCAL_BYTES', default=32 * 1024 * 1024, cast=int)
+THREAD_CACHE_TTL = config('THREAD_CACHE_TTL', default=300, cast=int)
+
+# Admin changelists count at most this many rows (api/admin.py); past it the
+# total is PostgreSQL's estimate for unfiltered lists, the limit otherwise
+ADMIN_COUNT_LIMIT = config('ADMIN_COUNT_LIMIT', default=10000, cast=int)
+
+# Server-Sent Events (/api/stream/, ASGI only). The local backend only reaches
+# subscribers in the same process; Redis pub/sub relays across workers.
+STREAM_BACKEND = 'api.stream.RedisBackend' if REDIS_URL else 'api.stream.LocalBackend'
+STREAM_LEADERBOARD_INTERVAL = config('STREAM_LEADERBOARD_INTERVAL', default=2, cast=int)
+STREAM_MAX_SECONDS = config('STREAM_MAX_SECONDS', default=300, cast=int)
+
+# Write-behind likes: LikeCreateView queues likes in a per-process buffer that
+# is flushed as one bulk insert every FLUSH_INTERVAL seconds or MAX_SIZE likes.
+# Queued likes are spooled to LIKE_BUFFER_SPOOL_DIR so none are lost on exit.
+LIKE_WRITE_BEHIND = config('LIKE_WRITE_BEHIND', default=False, cast=bool)
+LIKE_BUFFER_MAX_SIZE = config('LIKE_BUFFER_MAX_SIZE', default=500, cast=int)
+LIKE_BUFFER_FLUSH_INTERVAL = config('LIKE_BUFFER_FLUSH_INTERVAL', default=1.0, cast=float)
+LIKE_BUFFER_SPOOL_DIR = config('LIKE_BUFFER_SPOOL_DIR', default=str(BASE_DIR / 'like_spool'))
+# Failed writes of one like before it is set aside in <spool dir>/dead-likes.jsonl
+LIKE_BUFFER_MAX_ATTEMPTS = config('LIKE_BUFFER_MAX_ATTEMPTS', default=5, cast=int)
+
+# Request instrumentation (api.middleware.RequestTimingMiddleware): a
+# Server-Timing header on every response, and a JSON log line with the slowest
+# statements for requests above either threshold
+REQUEST_TIMING_HEADER = config('REQUEST_TIMING_HEADER', default=True, cast=bool)
+REQUEST_TIMING_SLOW_MS = config('REQUEST_TIMING_SLOW_MS', default=500, cast=int)
+REQUEST_TIMING_SLOW_QUERIES = config('REQUEST_TIMING_SLOW_QUERIES', default=50, cast=int)
+REQUEST_TIMING_SLOWEST = config('REQUEST_TIMING_SLOWEST', default=3, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -183,10 +304,24 @@ CSRF_TRUSTED_ORIGINS = [
     "http://127.0.0.1:3000",
 ]
 
+# Compress JSON reads of at least this many bytes (api.middleware.CompressionMiddleware)
+COMPRESSION_MIN_BYTES = config('COMPRESSION_MIN_BYTES', default=1024, cast=int)
+
+# NDJSON exports (api/export.py): rows fetched per round trip, and how old a
+# row must be before an export includes it
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+EXPORT_SETTLE_SECONDS = config('EXPORT_SETTLE_SECONDS', default=30, cast=float)
+
 # REST Framework settings
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        # orjson when installed, DRF's encoder otherwise (api/renderers.py)
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication with the user lookup cached (api/authentication.py)
+        'api.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -196,6 +331,9 @@ REST_FRAMEWORK = {
 # JWT Settings
 from datetime import timedelta
 
+# Seconds a JWT-authenticated user stays cached; saving the user clears it
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=60, cast=int)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
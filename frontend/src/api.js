@@ -39,14 +39,19 @@ api.interceptors.response.use(
 );
 
 export const postsAPI = {
-    getAll: () => api.get('/posts/'),
+    // Pass the `next` URL from a previous page to continue the feed
+    getAll: (nextUrl = null) => api.get(nextUrl || '/posts/'),
     getOne: (id) => api.get(`/posts/${id}/`),
     create: (content) => api.post('/posts/', { content }),
+    // Next page of top-level comments, from a post's `more_comments` cursor
+    comments: (id, cursor) => api.get(`/posts/${id}/comments/`, { params: { cursor } }),
 };
 
 export const commentsAPI = {
     create: (postId, content, parentId = null) =>
         api.post('/comments/', { post: postId, content, parent: parentId }),
+    // Next page of replies, from a comment's `more_replies` cursor
+    replies: (id, cursor) => api.get(`/comments/${id}/replies/`, { params: { cursor } }),
 };
 
 export const likesAPI = {
@@ -58,4 +63,10 @@ export const leaderboardAPI = {
     get: () => api.get('/leaderboard/'),
 };
 
+// Server-Sent Events: live leaderboard and like/comment count updates
+export const streamAPI = {
+    supported: () => typeof EventSource !== 'undefined',
+    connect: () => new EventSource(`${API_BASE_URL}/stream/`),
+};
+
 export default api;
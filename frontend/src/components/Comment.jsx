@@ -1,11 +1,34 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import { likesAPI, commentsAPI } from '../api';
 
 const Comment = ({ comment, depth = 0, onLike, onReply }) => {
     const [showReplyForm, setShowReplyForm] = useState(false);
     const [replyContent, setReplyContent] = useState('');
-    const [isLiked, setIsLiked] = useState(false);
+    const [isLiked, setIsLiked] = useState(Boolean(comment.liked_by_me));
     const [likeCount, setLikeCount] = useState(comment.like_count || 0);
+    const [replies, setReplies] = useState(comment.replies || []);
+    const [moreReplies, setMoreReplies] = useState(comment.more_replies);
+
+    // Reset when the parent refetches the thread
+    useEffect(() => {
+        setReplies(comment.replies || []);
+        setMoreReplies(comment.more_replies);
+    }, [comment.replies, comment.more_replies]);
+
+    const loadMoreReplies = async () => {
+        try {
+            const response = await commentsAPI.replies(comment.id, moreReplies);
+            setReplies(prev => [...prev, ...response.data.results]);
+            setMoreReplies(response.data.more_replies);
+        } catch (error) {
+            console.error('Error loading replies:', error);
+        }
+    };
+
+    // The server knows about likes made in other tabs and sessions
+    useEffect(() => {
+        if (comment.liked_by_me) setIsLiked(true);
+    }, [comment.liked_by_me]);
 
     const handleLike = async () => {
         if (isLiked) return; // Prevent double-liking
@@ -100,9 +123,9 @@ const Comment = ({ comment, depth = 0, onLike, onReply }) => {
             </div>
 
             {/* Recursive rendering of replies */}
-            {comment.replies && comment.replies.length > 0 && (
+            {replies.length > 0 && (
                 <div className="mt-2">
-                    {comment.replies.map((reply) => (
+                    {replies.map((reply) => (
                         <Comment
                             key={reply.id}
                             comment={reply}
@@ -113,6 +136,16 @@ const Comment = ({ comment, depth = 0, onLike, onReply }) => {
                     ))}
                 </div>
             )}
+
+            {moreReplies && (
+                <button
+                    onClick={loadMoreReplies}
+                    className="mt-2 text-sm text-primary-300 hover:text-primary-400 transition-colors"
+                    style={{ marginLeft: '20px' }}
+                >
+                    Load more replies
+                </button>
+            )}
         </div>
     );
 };
@@ -7,13 +7,16 @@ const Feed = () => {
     const { isAuthenticated } = useAuth();
     const [posts, setPosts] = useState([]);
     const [loading, setLoading] = useState(true);
+    const [nextUrl, setNextUrl] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [showCreateForm, setShowCreateForm] = useState(false);
     const [newPostContent, setNewPostContent] = useState('');
 
     const fetchPosts = async () => {
         try {
             const response = await postsAPI.getAll();
-            setPosts(response.data);
+            setPosts(response.data.results);
+            setNextUrl(response.data.next);
             setLoading(false);
         } catch (error) {
             console.error('Error fetching posts:', error);
@@ -21,6 +24,19 @@ const Feed = () => {
         }
     };
 
+    const fetchMorePosts = async () => {
+        if (!nextUrl) return;
+        setLoadingMore(true);
+        try {
+            const response = await postsAPI.getAll(nextUrl);
+            setPosts((current) => [...current, ...response.data.results]);
+            setNextUrl(response.data.next);
+        } catch (error) {
+            console.error('Error fetching more posts:', error);
+        }
+        setLoadingMore(false);
+    };
+
     useEffect(() => {
         fetchPosts();
     }, []);
@@ -95,9 +111,22 @@ const Feed = () => {
                     <p className="text-white/50 text-lg">No posts yet. Be the first to post!</p>
                 </div>
             ) : (
-                posts.map((post) => (
-                    <Post key={post.id} post={post} onUpdate={fetchPosts} />
-                ))
+                <>
+                    {posts.map((post) => (
+                        <Post key={post.id} post={post} onUpdate={fetchPosts} />
+                    ))}
+                    {nextUrl && (
+                        <div className="flex justify-center">
+                            <button
+                                onClick={fetchMorePosts}
+                                disabled={loadingMore}
+                                className="btn-secondary"
+                            >
+                                {loadingMore ? 'Loading...' : 'Load more'}
+                            </button>
+                        </div>
+                    )}
+                </>
             )}
         </div>
     );
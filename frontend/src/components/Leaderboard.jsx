@@ -1,14 +1,16 @@
 import React, { useState, useEffect } from 'react';
-import { leaderboardAPI } from '../api';
+import { leaderboardAPI, streamAPI } from '../api';
 
 const Leaderboard = () => {
     const [leaders, setLeaders] = useState([]);
+    const [me, setMe] = useState(null);
     const [loading, setLoading] = useState(true);
 
     const fetchLeaderboard = async () => {
         try {
             const response = await leaderboardAPI.get();
-            setLeaders(response.data);
+            setLeaders(response.data.results);
+            setMe(response.data.me);
             setLoading(false);
         } catch (error) {
             console.error('Error fetching leaderboard:', error);
@@ -17,11 +19,47 @@ const Leaderboard = () => {
     };
 
     useEffect(() => {
+        let interval = null;
+        const startPolling = () => {
+            if (interval) return;
+            fetchLeaderboard();
+            // Auto-refresh every 30 seconds
+            interval = setInterval(fetchLeaderboard, 30000);
+        };
+
+        if (!streamAPI.supported()) {
+            startPolling();
+            return () => clearInterval(interval);
+        }
+
+        // Push updates over one long-lived connection instead of polling;
+        // one request up front for the caller's own rank
         fetchLeaderboard();
+        const source = streamAPI.connect();
+        // The stream starts with a snapshot; without one (a proxy or server
+        // buffering the response) fall back to polling
+        const snapshotTimeout = setTimeout(() => {
+            source.close();
+            startPolling();
+        }, 5000);
+        source.addEventListener('leaderboard', (event) => {
+            clearTimeout(snapshotTimeout);
+            setLeaders(JSON.parse(event.data));
+            setLoading(false);
+        });
+        source.onerror = () => {
+            // EventSource reconnects on its own; fall back to polling only if it gave up
+            if (source.readyState === EventSource.CLOSED) {
+                clearTimeout(snapshotTimeout);
+                startPolling();
+            }
+        };
 
-        // Auto-refresh every 30 seconds
-        const interval = setInterval(fetchLeaderboard, 30000);
-        return () => clearInterval(interval);
+        return () => {
+            source.close();
+            clearTimeout(snapshotTimeout);
+            clearInterval(interval);
+        };
     }, []);
 
     return (
@@ -57,7 +95,7 @@ const Leaderboard = () => {
                   ${index === 2 ? 'bg-gradient-to-br from-orange-400 to-orange-600 text-orange-900' : ''}
                   ${index > 2 ? 'bg-gradient-to-br from-primary-500 to-accent-500 text-white' : ''}
                 `}>
-                                    {index + 1}
+                                    {leader.rank ?? index + 1}
                                 </div>
                                 <span className="font-semibold text-white/90">
                                     {leader.username}
@@ -76,6 +114,15 @@ const Leaderboard = () => {
                 </div>
             )}
 
+            {me && me.rank && !leaders.some((leader) => leader.username === me.username) && (
+                <div className="mt-4 flex items-center justify-between p-3 rounded-lg bg-primary-500/10">
+                    <span className="text-sm text-white/70">
+                        Your rank: <span className="font-bold text-white/90">#{me.rank}</span>
+                    </span>
+                    <span className="text-sm font-bold text-gradient">{me.karma}</span>
+                </div>
+            )}
+
             <div className="mt-6 pt-4 border-t border-white/10">
                 <p className="text-xs text-white/40 text-center">
                     Karma = Post Likes × 5 + Comment Likes × 1
@@ -1,13 +1,18 @@
-import React, { useState } from 'react';
-import { likesAPI, commentsAPI } from '../api';
+import React, { useState, useEffect } from 'react';
+import { likesAPI, commentsAPI, postsAPI } from '../api';
 import Comment from './Comment';
 
 const Post = ({ post, onUpdate }) => {
     const [showCommentForm, setShowCommentForm] = useState(false);
     const [commentContent, setCommentContent] = useState('');
-    const [isLiked, setIsLiked] = useState(false);
+    const [isLiked, setIsLiked] = useState(Boolean(post.liked_by_me));
     const [likeCount, setLikeCount] = useState(post.like_count || 0);
 
+    // The server knows about likes made in other tabs and sessions
+    useEffect(() => {
+        if (post.liked_by_me) setIsLiked(true);
+    }, [post.liked_by_me]);
+
     const handleLike = async () => {
         if (isLiked) return; // Prevent double-liking
 
@@ -35,8 +40,25 @@ const Post = ({ post, onUpdate }) => {
         }
     };
 
-    // Get top-level comments (no parent)
-    const topLevelComments = post.comments || [];
+    // Top-level comments (no parent); further pages are loaded on demand
+    const [topLevelComments, setTopLevelComments] = useState(post.comments || []);
+    const [moreComments, setMoreComments] = useState(post.more_comments);
+
+    // Reset when the parent refetches the thread
+    useEffect(() => {
+        setTopLevelComments(post.comments || []);
+        setMoreComments(post.more_comments);
+    }, [post.comments, post.more_comments]);
+
+    const loadMoreComments = async () => {
+        try {
+            const response = await postsAPI.comments(post.id, moreComments);
+            setTopLevelComments(prev => [...prev, ...response.data.results]);
+            setMoreComments(response.data.more_comments);
+        } catch (error) {
+            console.error('Error loading comments:', error);
+        }
+    };
 
     return (
         <div className="card animate-fade-in">
@@ -79,7 +101,7 @@ const Post = ({ post, onUpdate }) => {
                             <svg className="w-6 h-6" fill="none" stroke="currentColor" viewBox="0 0 24 24">
                                 <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M8 12h.01M12 12h.01M16 12h.01M21 12c0 4.418-4.03 8-9 8a9.863 9.863 0 01-4.255-.949L3 20l1.395-3.72C3.512 15.042 3 13.574 3 12c0-4.418 4.03-8 9-8s9 3.582 9 8z" />
                             </svg>
-                            <span className="font-semibold">{topLevelComments.length} Comments</span>
+                            <span className="font-semibold">{post.comment_count ?? topLevelComments.length} Comments</span>
                         </button>
                     </div>
                 </div>
@@ -122,6 +144,14 @@ const Post = ({ post, onUpdate }) => {
                             onReply={onUpdate}
                         />
                     ))}
+                    {moreComments && (
+                        <button
+                            onClick={loadMoreComments}
+                            className="mt-4 text-sm text-primary-300 hover:text-primary-400 transition-colors"
+                        >
+                            Load more comments
+                        </button>
+                    )}
                 </div>
             )}
         </div>